@@ -1,35 +1,251 @@
+import asyncio
 import os
-from autogen_ext.models.openai import OpenAIChatCompletionClient, AzureOpenAIChatCompletionClient
-from autogen_core.models import ModelInfo, ModelFamily
+import weakref
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from autogen_core import CacheStore
+from autogen_core.models import ChatCompletionClient, CreateResult, ModelInfo, ModelFamily
+from client_wrappers import DelegatingChatCompletionClient
+from metrics import MetricsChatCompletionClient
+from model_router import ROUTED_PROVIDERS, ModelRouter
+from provider_leaderboard import ProviderLeaderboard
+from resilience import ProviderGuard, ResilienceSettings, ResilientChatCompletionClient
+from response_cache import CacheStats, CachedChatCompletionClient
+from tool_registry import ToolRegistry
+
+# The client configuration entries that change a model's answers, so cached responses are kept apart by them.
+SAMPLING_SETTINGS = ("temperature", "seed")
+
+# The environment variables each provider needs; Grok is reached with the Azure key.
+PROVIDER_ENV_VARS: Dict[str, Tuple[str, ...]] = {
+    "azure": ("AZURE_API_KEY", "AZURE_API_VERSION", "AZURE_API_ENDPOINT", "AZURE_DEPLOYMENT_NAME"),
+    "grok": ("GROK_DEPLOYMENT_NAME", "GROK_ENDPOINT", "AZURE_API_KEY"),
+    "openai": ("OPENAI_API_KEY",),
+}
+
+# Pool key: the client type plus the sorted configuration the client was built from.
+PoolKey = Tuple[str, Tuple[Tuple[str, str], ...]]
 
 class AgentsFactory:
-    """A factory for creating different AI clients."""
+    """A factory for creating different AI clients.
+
+    Clients are pooled: asking twice for the same client type with the same configuration returns
+    the same client, so agents and sessions share its HTTP connection pool and keep-alive connections.
+    When a cache store is given, clients answer repeated requests from it instead of the model.
+    The 'auto' client type routes between the configured providers by their recent latency and errors.
+    The 'mock' client type, and every provider when the factory is offline, serves local completions
+    from a MockChatCompletionClient, so sessions run and can be timed without any endpoint.
+    Every client is wrapped in a ResilientChatCompletionClient: the clients of a provider share its
+    concurrency limit, rate limit and circuit breaker, and every call gets a timeout and jittered retries.
+    The factory also holds the tool registry whose tools the agents of each session are given, and optionally
+    a provider leaderboard that assigns each member the provider evaluated best for its persona.
+    """
+
+    def __init__(
+        self,
+        max_pool_size: int = 8,
+        cache_store: Optional[CacheStore[CreateResult]] = None,
+        router: Optional[ModelRouter] = None,
+        offline: bool = False,
+        mock_settings: Optional[Dict[str, str]] = None,
+        resilience: Optional[ResilienceSettings] = None,
+        tools: Optional[ToolRegistry] = None,
+        leaderboard: Optional[ProviderLeaderboard] = None,
+    ):
+        """
+        Initializes the factory with an empty client pool.
+
+        Args:
+            max_pool_size (int): The maximum number of pooled clients. When exceeded, the least recently
+                                 used client leaves the pool. It is closed once nothing uses it any more, or
+                                 by `close()` if an agent still holds it then.
+            cache_store (Optional[CacheStore[CreateResult]]): Where to cache model responses, e.g. an
+                                 LRUCacheStore or SQLiteCacheStore. None disables caching.
+            router (Optional[ModelRouter]): The router used for 'auto' clients. A new one is created if omitted.
+            offline (bool): Whether 'azure', 'grok' and 'openai' are served by mock clients instead of the
+                            providers. Each provider keeps its own mock client, so routing still works.
+            mock_settings (Optional[Dict[str, str]]): Mock client settings that take precedence over the
+                            MOCK_* environment variables, e.g. {"latency_ms": "250"}.
+            resilience (Optional[ResilienceSettings]): Timeouts, retries, limits and circuit breaking of the
+                            provider calls. Defaults to ResilienceSettings(); pass enabled=False to call
+                            the providers directly.
+            tools (Optional[ToolRegistry]): The tools the agents can call. An empty registry is created if
+                            omitted; register tools with `factory.tools.register(func)`.
+            leaderboard (Optional[ProviderLeaderboard]): The per-persona provider rankings written by
+                            provider_eval, used by member_client_types(). None leaves every member to the router.
+
+        Raises:
+            ValueError: If max_pool_size is less than one.
+        """
+        if max_pool_size < 1:
+            raise ValueError(f"max_pool_size must be at least 1, got {max_pool_size}")
+        self.max_pool_size = max_pool_size
+        self._pool: "OrderedDict[PoolKey, ChatCompletionClient]" = OrderedDict()
+        # Evicted clients that may still be held by agents, and the closing of those that no longer are.
+        self._retired: List[weakref.finalize] = []
+        self._closing: Set["asyncio.Task[None]"] = set()
+        self.cache_store = cache_store
+        self.cache_stats = CacheStats()
+        self.offline = offline
+        self.mock_settings = dict(mock_settings or {})
+        self.resilience = resilience or ResilienceSettings()
+        # The resilient clients own the timeouts, so the router's budget doesn't cut their retries short.
+        self.router = router or ModelRouter(timeout=None if self.resilience.enabled else self.resilience.timeout)
+        self._guards: Dict[str, ProviderGuard] = {}
+        self.tools = tools if tools is not None else ToolRegistry()
+        self.leaderboard = leaderboard
 
-    def get_client(self, client_type: str = "grok"):
+    def get_client(self, client_type: str = "grok") -> Optional[ChatCompletionClient]:
         """
-        Gets a concrete client instance based on the client_type.
+        Gets a concrete client instance based on the client_type, reusing a pooled one when possible.
 
         Args:
-            client_type (str): The type of client to create ('azure', 'grok', or 'openai'). 
-                               Defaults to 'grok'.
+            client_type (str): The type of client to create ('azure', 'grok', 'openai', 'mock', or 'auto'
+                               to route between the providers). Defaults to 'grok'.
 
         Returns:
             An instance of the requested client, or None if configuration is missing.
-        
+
         Raises:
             ValueError: If the client_type is unknown.
         """
-        if client_type == "azure":
-            return self._create_azure_client()
+        if client_type == "auto":
+            return self.router.route(self.get_client)
+        use_mock = client_type == "mock" or (self.offline and client_type in ("azure", "grok", "openai"))
+        if use_mock:
+            config = self._get_mock_config(client_type)
+        elif client_type == "azure":
+            config = self._get_azure_config()
         elif client_type == "grok":
-            return self._create_grok_client()
+            config = self._get_grok_config()
         elif client_type == "openai":
-            return self._create_openai_client()
+            config = self._get_openai_config()
         else:
             raise ValueError(f"Unknown client type: {client_type}")
 
-    def _create_azure_client(self):
-        """Creates an Azure OpenAI client."""
+        if config is None:
+            return None
+
+        key: PoolKey = (client_type, tuple(sorted(config.items())))
+        client = self._pool.get(key)
+        if client is not None:
+            self._pool.move_to_end(key)
+            return client
+
+        if use_mock:
+            client = self._create_mock_client(config)
+        elif client_type == "azure":
+            client = self._create_azure_client(config)
+        elif client_type == "grok":
+            client = self._create_grok_client(config)
+        else:
+            client = self._create_openai_client(config)
+        # Metrics see every attempt, so the latency histograms describe the provider, not the retries.
+        client = MetricsChatCompletionClient(client, client_type)
+        if self.resilience.enabled:
+            client = ResilientChatCompletionClient(client, self._get_guard(client_type))
+        if self.cache_store is not None:
+            namespace = self._cache_namespace(client_type, config)
+            client = CachedChatCompletionClient(client, self.cache_store, namespace, self.cache_stats)
+
+        self._pool[key] = client
+        while len(self._pool) > self.max_pool_size:
+            _, evicted = self._pool.popitem(last=False)
+            self._retire(evicted)
+        return client
+
+    def _retire(self, client: ChatCompletionClient) -> None:
+        # An agent may still hold the evicted client, so it is closed when the last reference to it goes.
+        # The wrappers only pass close() on, so closing the provider client underneath is closing all of them.
+        inner = client
+        while isinstance(inner, DelegatingChatCompletionClient):
+            inner = inner.inner
+        self._retired = [finalizer for finalizer in self._retired if finalizer.alive]
+        self._retired.append(weakref.finalize(client, self._close_unused, inner))
+
+    def _close_unused(self, client: ChatCompletionClient) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # Collected outside the event loop, e.g. at exit; its connections go with it.
+        task = loop.create_task(client.close())
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    @staticmethod
+    def _cache_namespace(client_type: str, config: Dict[str, str]) -> str:
+        """The model and the default sampling settings of its cached responses, e.g. 'grok:grok-3:temperature=0.7'."""
+        sampling = "".join(f":{name}={config[name]}" for name in SAMPLING_SETTINGS if name in config)
+        return f"{client_type}:{config['model']}{sampling}"
+
+    def member_client_types(self, personas: Iterable[str]) -> Dict[str, str]:
+        """
+        Chooses each member's provider from the leaderboard, among the configured providers.
+
+        Args:
+            personas (Iterable[str]): The member names.
+
+        Returns:
+            The best configured provider of every member the leaderboard ranks. Members it doesn't rank are left
+            out, so they keep the client type they would get otherwise.
+        """
+        if self.leaderboard is None:
+            return {}
+        # Only the environment is read here: the clients are built when the members are, for the providers assigned.
+        configured = [provider for provider in ROUTED_PROVIDERS if self._is_configured(provider)]
+        return dict(self.leaderboard.assignments(personas, configured))
+
+    def _is_configured(self, provider: str) -> bool:
+        """Whether get_client() can build a client for the provider, without building one or warning."""
+        return self.offline or all(os.getenv(name) for name in PROVIDER_ENV_VARS[provider])
+
+    def _get_guard(self, client_type: str) -> ProviderGuard:
+        guard = self._guards.get(client_type)
+        if guard is None:
+            guard = self._guards[client_type] = ProviderGuard(client_type, self.resilience)
+        return guard
+
+    def resilience_snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Reports what the resilience layer did for each provider used so far.
+
+        Returns:
+            For each provider, its calls, successes, failures, retries, timeouts, rejected calls, circuit
+            openings, in-flight requests, time spent waiting for a slot and the circuit state.
+        """
+        return {provider: guard.snapshot() for provider, guard in self._guards.items()}
+
+    def _sdk_options(self) -> Dict[str, Any]:
+        # With the resilience layer on, it does the retrying; SDK retries would multiply the attempts.
+        return {"max_retries": 0} if self.resilience.enabled else {}
+
+    @property
+    def pool_size(self) -> int:
+        """The number of clients currently pooled."""
+        return len(self._pool)
+
+    async def close(self) -> None:
+        """Closes every client created by this factory and empties the pool."""
+        clients = list(self._pool.values())
+        for finalizer in self._retired:
+            detached = finalizer.detach()
+            if detached is not None:
+                clients.append(detached[0])
+        self._pool.clear()
+        self._retired = []
+        for client in clients:
+            await client.close()
+        if self._closing:
+            await asyncio.gather(*self._closing)
+
+    async def __aenter__(self) -> "AgentsFactory":
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.close()
+
+    def _get_azure_config(self) -> Optional[Dict[str, str]]:
+        """Reads the Azure OpenAI configuration from the environment."""
         azure_api_key = os.getenv("AZURE_API_KEY")
         azure_api_version = os.getenv("AZURE_API_VERSION")
         azure_endpoint = os.getenv("AZURE_API_ENDPOINT")
@@ -38,14 +254,25 @@ class AgentsFactory:
         if not all([azure_api_key, azure_api_version, azure_endpoint, azure_deployment_name]):
             print("Azure credentials are not fully configured. Skipping Azure agent.")
             return None
-        
+
         assert azure_deployment_name is not None and azure_api_key is not None and azure_api_version is not None and azure_endpoint is not None
-        
+        return {
+            "model": azure_deployment_name,
+            "api_key": azure_api_key,
+            "api_version": azure_api_version,
+            "azure_endpoint": azure_endpoint,
+        }
+
+    def _create_azure_client(self, config: Dict[str, str]) -> ChatCompletionClient:
+        """Creates an Azure OpenAI client."""
+        # Imported here so the OpenAI SDK is only loaded once a client is actually needed.
+        from autogen_ext.models.openai import AzureOpenAIChatCompletionClient
         return AzureOpenAIChatCompletionClient(
-            model=azure_deployment_name,
-            api_key=azure_api_key,
-            api_version=azure_api_version,
-            azure_endpoint=azure_endpoint,
+            model=config["model"],
+            api_key=config["api_key"],
+            api_version=config["api_version"],
+            azure_endpoint=config["azure_endpoint"],
+            **self._sdk_options(),
             model_info=ModelInfo(
                 vision=False,
                 function_calling=True,
@@ -55,8 +282,8 @@ class AgentsFactory:
             )
         )
 
-    def _create_grok_client(self):
-        """Creates a Grok client."""
+    def _get_grok_config(self) -> Optional[Dict[str, str]]:
+        """Reads the Grok configuration from the environment."""
         grok_deployment_name = os.getenv("GROK_DEPLOYMENT_NAME")
         grok_endpoint = os.getenv("GROK_ENDPOINT")
         azure_api_key = os.getenv("AZURE_API_KEY") # Re-using for Grok as per original main.py
@@ -67,11 +294,22 @@ class AgentsFactory:
 
         # Ensure all variables are not None
         assert grok_deployment_name is not None and grok_endpoint is not None and azure_api_key is not None
+        return {
+            "model": grok_deployment_name,
+            "base_url": grok_endpoint,
+            "api_key": azure_api_key,
+            "temperature": "0.7",
+        }
+
+    def _create_grok_client(self, config: Dict[str, str]) -> ChatCompletionClient:
+        """Creates a Grok client."""
+        from autogen_ext.models.openai import OpenAIChatCompletionClient
         return OpenAIChatCompletionClient(
-            model=grok_deployment_name,
-            base_url=grok_endpoint,
-            api_key=azure_api_key,
-            temperature=0.7,
+            model=config["model"],
+            base_url=config["base_url"],
+            api_key=config["api_key"],
+            temperature=float(config["temperature"]),
+            **self._sdk_options(),
             model_info=ModelInfo(
                 vision=False,
                 function_calling=True,
@@ -81,16 +319,21 @@ class AgentsFactory:
             )
         )
 
-    def _create_openai_client(self):
-        """Creates an OpenAI client."""
+    def _get_openai_config(self) -> Optional[Dict[str, str]]:
+        """Reads the OpenAI configuration from the environment."""
         openai_api_key = os.getenv("OPENAI_API_KEY")
         if not openai_api_key:
             print("OPENAI_API_KEY is not set in environment variables. Skipping OpenAI agent.")
             return None
+        return {"model": "gpt-4", "api_key": openai_api_key}
 
+    def _create_openai_client(self, config: Dict[str, str]) -> ChatCompletionClient:
+        """Creates an OpenAI client."""
+        from autogen_ext.models.openai import OpenAIChatCompletionClient
         return OpenAIChatCompletionClient(
-            model="gpt-4",
-            api_key=openai_api_key,
+            model=config["model"],
+            api_key=config["api_key"],
+            **self._sdk_options(),
             model_info=ModelInfo(
                 vision=False,
                 function_calling=True,
@@ -99,3 +342,35 @@ class AgentsFactory:
                 family="openai",
             )
         )
+
+    def _get_mock_config(self, client_type: str) -> Dict[str, str]:
+        """Reads the mock client settings from the MOCK_* environment variables and mock_settings."""
+        config = {
+            "model": f"mock-{client_type}",
+            "latency_ms": os.getenv("MOCK_LATENCY_MS", "0"),
+            "jitter_ms": os.getenv("MOCK_JITTER_MS", "0"),
+            "completion_tokens": os.getenv("MOCK_COMPLETION_TOKENS", "40"),
+            "responses_path": os.getenv("MOCK_RESPONSES", ""),
+            "seed": os.getenv("MOCK_SEED", "0"),
+            "speakers": os.getenv("MOCK_SPEAKERS", ""),
+            "cache_min_tokens": os.getenv("MOCK_CACHE_MIN_TOKENS", "1024"),
+            # Mock members call the session's tools, if it has any, so offline runs exercise them too.
+            "function_calling": os.getenv("MOCK_FUNCTION_CALLING", "1"),
+        }
+        config.update(self.mock_settings)
+        return config
+
+    def _create_mock_client(self, config: Dict[str, str]) -> ChatCompletionClient:
+        """Creates a mock client, replaying the recorded JSONL script at responses_path if one is set."""
+        from mock_client import MockChatCompletionClient, load_recorded_responses
+        responses = load_recorded_responses(config["responses_path"]) if config["responses_path"] else None
+        return MockChatCompletionClient(
+            responses=responses,
+            speakers=[name.strip() for name in config["speakers"].split(",") if name.strip()] or None,
+            latency_ms=float(config["latency_ms"]),
+            jitter_ms=float(config["jitter_ms"]),
+            completion_tokens=int(config["completion_tokens"]),
+            seed=int(config["seed"]),
+            cache_min_tokens=int(config["cache_min_tokens"]),
+            function_calling=config["function_calling"] == "1",
+        )
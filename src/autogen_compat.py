@@ -0,0 +1,61 @@
+from typing import Any, List, Sequence
+
+from autogen_agentchat.agents import AssistantAgent
+from autogen_agentchat.utils import remove_images
+from autogen_core.models import ChatCompletionClient, LLMMessage
+
+# The AutoGen version the private attributes below were read from; requirements.txt pins it.
+AUTOGEN_VERSION = "0.7.5"
+
+# The state AssistantAgent builds its model call from, which it does not expose publicly.
+_AGENT_ATTRIBUTES = ("_system_messages", "_workbench", "_handoff_tools")
+
+
+def check_agent(agent: AssistantAgent) -> None:
+    """
+    Checks that an agent still keeps the private state model_call_messages() and model_call_tools() read.
+
+    Args:
+        agent (AssistantAgent): The agent.
+
+    Raises:
+        RuntimeError: If the installed AutoGen keeps it elsewhere, e.g. after an upgrade.
+    """
+    missing = [name for name in _AGENT_ATTRIBUTES if not hasattr(agent, name)]
+    if missing:
+        raise RuntimeError(
+            f"AssistantAgent no longer has {', '.join(missing)}; the speculative prefetcher was written for "
+            f"autogen-agentchat {AUTOGEN_VERSION}"
+        )
+
+
+def model_call_messages(
+    agent: AssistantAgent, client: ChatCompletionClient, history: Sequence[LLMMessage]
+) -> List[LLMMessage]:
+    """
+    The messages the agent sends its model for a context holding `history`, as AssistantAgent._call_llm builds them.
+
+    Args:
+        agent (AssistantAgent): The agent.
+        client (ChatCompletionClient): The agent's model client.
+        history (Sequence[LLMMessage]): The messages of the agent's model context.
+
+    Returns:
+        The system messages followed by the history, without images if the model can't see them.
+    """
+    messages = list(agent._system_messages) + list(history)
+    return messages if client.model_info["vision"] else remove_images(messages)
+
+
+async def model_call_tools(agent: AssistantAgent) -> List[Any]:
+    """
+    The tools the agent offers its model, as AssistantAgent._call_llm lists them.
+
+    Args:
+        agent (AssistantAgent): The agent.
+
+    Returns:
+        The tools of its workbenches, then its handoff tools.
+    """
+    tools = [tool for workbench in agent._workbench for tool in await workbench.list_tools()]
+    return tools + list(agent._handoff_tools)
@@ -0,0 +1,410 @@
+import argparse
+import asyncio
+import os
+import re
+import sys
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, TextIO
+
+from dotenv import load_dotenv
+
+from agents_factory import AgentsFactory
+from context_policy import CONTEXT_MODES, ContextPolicy
+from metrics import MetricsExporters
+from parliament import run_parliament_session
+from personas_util import PersonasUtil
+from resilience import ResilienceSettings
+from response_cache import LRUCacheStore, SQLiteCacheStore
+from session_store import SessionStore
+from speaker_selection import SELECTION_MODES, SelectionStats
+from speculation import SpeculationStats
+from token_budget import SessionUsage, prices_from_settings, track_prompt_cache
+from tracing import TRACING_MODES, setup_tracing
+from transcript import TranscriptStore
+from translation import TranslationStats, translated_script_path
+
+
+@dataclass
+class SessionOutcome:
+    """The outcome of one parliament session in a batch."""
+    index: int
+    topic: str
+    output_path: str
+    duration_seconds: float
+    message_count: int = 0
+    total_tokens: int = 0
+    cost: float = 0.0
+    error: Optional[str] = None
+
+
+def read_topics(stream: TextIO) -> List[str]:
+    """
+    Reads one topic per line, skipping blank lines and '#' comments.
+
+    Args:
+        stream (TextIO): The stream to read topics from.
+
+    Returns:
+        The list of topics, in order.
+    """
+    topics: List[str] = []
+    for line in stream:
+        topic = line.strip()
+        if topic and not topic.startswith('#'):
+            topics.append(topic)
+    return topics
+
+
+def slugify(topic: str, max_length: int = 40) -> str:
+    """
+    Turns a topic into a file-name friendly slug.
+
+    Args:
+        topic (str): The topic.
+        max_length (int): The maximum slug length.
+
+    Returns:
+        The slug, or 'topic' if nothing usable remains.
+    """
+    slug = re.sub(r'[^\w]+', '_', topic.lower(), flags=re.UNICODE).strip('_')
+    return slug[:max_length] or 'topic'
+
+
+def script_path(output_dir: str, index: int, topic: str) -> str:
+    """The script file of the topic at `index` of a batch, e.g. 'output_scripts/0003_weather.txt'."""
+    return os.path.join(output_dir, f"{index:04d}_{slugify(topic)}.txt")
+
+
+class BatchRunner:
+    """Runs many parliament sessions concurrently.
+
+    The providers' rate limits, like their timeouts and retries, are the factory's ResilienceSettings.
+    """
+
+    def __init__(
+        self,
+        output_dir: str = 'output_scripts',
+        concurrency: int = 4,
+        max_messages: int = 5,
+        factory: Optional[AgentsFactory] = None,
+        personas_util: Optional[PersonasUtil] = None,
+        write_jsonl: bool = False,
+        max_total_tokens: Optional[int] = None,
+        max_cost: Optional[float] = None,
+        context_policy: Optional[ContextPolicy] = None,
+        speaker_selection: str = 'llm',
+        deadline_seconds: Optional[float] = None,
+        session_store: Optional[SessionStore] = None,
+        resume: bool = True,
+        translate: bool = False,
+        speculate: int = 0,
+        transcript_store: Optional[TranscriptStore] = None,
+    ):
+        """
+        Args:
+            output_dir (str): The directory the scripts are written to.
+            concurrency (int): The maximum number of sessions running at once.
+            max_messages (int): The number of messages after which each discussion ends.
+            factory (Optional[AgentsFactory]): The factory used to create model clients. Its resilience
+                settings bound and rate limit the calls to each provider.
+            personas_util (Optional[PersonasUtil]): The personas, loaded once and shared by all sessions.
+            write_jsonl (bool): Whether to write a JSONL record per turn next to each script.
+            max_total_tokens (Optional[int]): The token budget of each session.
+            max_cost (Optional[float]): The cost budget of each session in USD.
+            context_policy (Optional[ContextPolicy]): How much history the agents send. None sends all of it.
+            speaker_selection (str): How the next speaker is picked, one of SELECTION_MODES.
+            deadline_seconds (Optional[float]): The time each session may take, once it has started.
+            session_store (Optional[SessionStore]): Where to checkpoint every session after each turn.
+            resume (bool): Whether sessions continue an unfinished checkpointed session on the same topic.
+            translate (bool): Whether to translate each script with the translator persona while it is written.
+            speculate (int): How many likely next speakers start their turn while the selector model chooses.
+            transcript_store (Optional[TranscriptStore]): Where to keep every session's structured transcript.
+
+        Raises:
+            ValueError: If concurrency is less than one.
+        """
+        if concurrency < 1:
+            raise ValueError(f"concurrency must be at least 1, got {concurrency}")
+        self.output_dir = output_dir
+        self.concurrency = concurrency
+        self.max_messages = max_messages
+        self.write_jsonl = write_jsonl
+        self.max_total_tokens = max_total_tokens
+        self.max_cost = max_cost
+        self.context_policy = context_policy
+        self.speaker_selection = speaker_selection
+        self.deadline_seconds = deadline_seconds
+        self.session_store = session_store
+        self.resume = resume
+        self.translate = translate
+        self.speculate = speculate
+        self.transcript_store = transcript_store
+        # Shared by every session, so the reports cover the whole batch.
+        self.selection_stats = SelectionStats()
+        self.translation_stats = TranslationStats()
+        self.speculation_stats = SpeculationStats()
+        self.factory = factory or AgentsFactory()
+        self.personas_util = personas_util or PersonasUtil()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def run_one(self, index: int, topic: str) -> SessionOutcome:
+        """
+        Runs the session of one topic, waiting while `concurrency` sessions are already running.
+
+        Args:
+            index (int): The topic's position in the batch, used in the script file name.
+            topic (str): The topic to discuss.
+
+        Returns:
+            The session's outcome. Failures are reported in it rather than raised.
+        """
+        output_path = script_path(self.output_dir, index, topic)
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        async with self._semaphore:
+            start = time.perf_counter()
+            usage = SessionUsage(prices_from_settings(self.personas_util.get_all_personas()))
+            try:
+                result = await run_parliament_session(
+                    topic,
+                    self.personas_util,
+                    self.factory.get_client,
+                    output_path=output_path,
+                    max_messages=self.max_messages,
+                    jsonl_path=os.path.splitext(output_path)[0] + '.jsonl' if self.write_jsonl else None,
+                    usage=usage,
+                    max_total_tokens=self.max_total_tokens,
+                    max_cost=self.max_cost,
+                    context_policy=self.context_policy,
+                    speaker_selection=self.speaker_selection,
+                    selection_stats=self.selection_stats,
+                    deadline_seconds=self.deadline_seconds,
+                    session_store=self.session_store,
+                    resume=self.resume,
+                    translation_path=translated_script_path(output_path) if self.translate else None,
+                    translation_stats=self.translation_stats,
+                    speculate=self.speculate,
+                    speculation_stats=self.speculation_stats,
+                    transcript_store=self.transcript_store,
+                )
+            except Exception as e:
+                print(f"Session {index} ('{topic}') failed: {e}")
+                return SessionOutcome(index, topic, output_path, time.perf_counter() - start, error=str(e))
+            duration = time.perf_counter() - start
+            if result is None:
+                return SessionOutcome(index, topic, output_path, duration, error="group chat could not be created")
+            print(f"Session {index} ('{topic}') finished in {duration:.1f}s ({result.message_count} messages, "
+                  f"{usage.total_tokens} tokens, ${usage.total_cost:.4f}).")
+            return SessionOutcome(
+                index,
+                topic,
+                output_path,
+                duration,
+                message_count=result.message_count,
+                total_tokens=usage.total_tokens,
+                cost=usage.total_cost,
+            )
+
+    async def run(self, topics: Iterable[str]) -> List[SessionOutcome]:
+        """
+        Runs a session for every topic, at most `concurrency` at a time.
+
+        Args:
+            topics (Iterable[str]): The topics to discuss.
+
+        Returns:
+            One SessionOutcome per topic, in input order. A failing session does not stop the others.
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        return await asyncio.gather(*(self.run_one(index, topic) for index, topic in enumerate(topics)))
+
+    async def close(self) -> None:
+        """Closes the pooled model clients, and the SQLite response cache, session store and transcripts if any."""
+        await self.factory.close()
+        if isinstance(self.factory.cache_store, SQLiteCacheStore):
+            self.factory.cache_store.close()
+        if self.session_store is not None:
+            self.session_store.close()
+        if self.transcript_store is not None:
+            self.transcript_store.close()
+
+
+def parse_rate_limits(values: List[str]) -> Dict[str, float]:
+    """
+    Parses 'provider=requests_per_minute' pairs.
+
+    Args:
+        values (List[str]): The pairs, e.g. ['azure=60', 'grok=30'].
+
+    Returns:
+        A dictionary of provider name to requests per minute.
+
+    Raises:
+        ValueError: If a pair is malformed.
+    """
+    limits: Dict[str, float] = {}
+    for value in values:
+        provider, sep, rate = value.partition('=')
+        if not sep or not provider:
+            raise ValueError(f"Invalid rate limit '{value}', expected provider=requests_per_minute")
+        limits[provider.strip()] = float(rate)
+    return limits
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Builds the batch CLI's argument parser."""
+    parser = argparse.ArgumentParser(description="Run many parliament sessions concurrently.")
+    parser.add_argument('topics', help="File with one topic per line, or '-' for stdin.")
+    parser.add_argument('--output-dir', default='output_scripts', help="Directory for the generated scripts.")
+    parser.add_argument('--concurrency', type=int, default=4, help="Maximum number of concurrent sessions.")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Worker processes; each runs up to --concurrency sessions. 1 runs in this process.")
+    parser.add_argument('--timeout', type=float, default=60.0, help="Seconds before a model call is retried.")
+    parser.add_argument('--max-retries', type=int, default=3, help="Retries of a failed model call.")
+    parser.add_argument('--provider-concurrency', type=int, default=8,
+                        help="Maximum in-flight requests per provider.")
+    parser.add_argument('--deadline', type=float, default=None, help="Seconds each session may take.")
+    parser.add_argument('--rate-limit', action='append', default=[], metavar='PROVIDER=RPM',
+                        help="Requests per minute for a provider, e.g. azure=60. May be repeated.")
+    parser.add_argument('--max-messages', type=int, default=5, help="Messages per session.")
+    parser.add_argument('--config', default='src/config.toml', help="Path to the personas TOML file.")
+    parser.add_argument('--max-tokens', type=int, default=None, help="Token budget per session.")
+    parser.add_argument('--max-cost', type=float, default=None, help="Cost budget per session in USD.")
+    parser.add_argument('--jsonl', action='store_true', help="Also write a JSONL record per turn for each session.")
+    parser.add_argument('--cache', choices=['none', 'memory', 'sqlite'], default='none',
+                        help="Cache model responses in memory or in a SQLite file.")
+    parser.add_argument('--cache-path', default='response_cache.sqlite', help="SQLite file for --cache sqlite.")
+    parser.add_argument('--cache-ttl', type=float, default=None, help="Seconds a cached response stays valid.")
+    parser.add_argument('--context', choices=CONTEXT_MODES, default='unbounded',
+                        help="How much history each agent sends to the model.")
+    parser.add_argument('--context-window', type=int, default=6, help="Recent messages kept verbatim.")
+    parser.add_argument('--context-token-limit', type=int, default=None, help="Token cap on each agent's history.")
+    parser.add_argument('--selection', choices=SELECTION_MODES, default='llm',
+                        help="How the next speaker is picked.")
+    parser.add_argument('--speculate', type=int, default=0,
+                        help="Start the turns of this many likely next speakers while the selector model chooses.")
+    parser.add_argument('--session-store', default=None,
+                        help="SQLite file to checkpoint every session in, so a rerun resumes unfinished topics.")
+    parser.add_argument('--no-resume', action='store_true', help="Start every topic over, even if checkpointed.")
+    parser.add_argument('--transcripts', default=None,
+                        help="Directory to keep compressed, indexed transcripts of every session in.")
+    parser.add_argument('--translate', action='store_true',
+                        help="Translate each script with the translator persona, next to the script.")
+    parser.add_argument('--offline', action='store_true',
+                        help="Serve every provider from local mock clients (see the MOCK_* variables).")
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help="Serve Prometheus metrics on this local port (worker i of a pool uses port + i).")
+    parser.add_argument('--metrics-file', default=None,
+                        help="Write a JSON metrics snapshot to this file (one file per worker in a pool).")
+    parser.add_argument('--metrics-interval', type=float, default=5.0, help="Seconds between metrics snapshots.")
+    parser.add_argument('--tracing', choices=TRACING_MODES, default='off', help="Tracing mode.")
+    parser.add_argument('--trace-sample-ratio', type=float, default=1.0, help="Fraction of sessions to trace.")
+    parser.add_argument('--trace-file', default='traces.jsonl', help="Span file for --tracing file.")
+    return parser
+
+
+def create_runner(args: argparse.Namespace, workers: int = 1) -> BatchRunner:
+    """
+    Creates a BatchRunner, with its own factory and personas, from the parsed CLI arguments.
+
+    Args:
+        args (argparse.Namespace): The arguments parsed by build_parser().
+        workers (int): The number of processes sharing the rate limits, which are split evenly between them.
+
+    Returns:
+        The runner.
+    """
+    if args.cache == 'memory':
+        cache_store = LRUCacheStore(ttl_seconds=args.cache_ttl)
+    elif args.cache == 'sqlite':
+        cache_store = SQLiteCacheStore(args.cache_path, ttl_seconds=args.cache_ttl)
+    else:
+        cache_store = None
+
+    # Rate limits are applied by the factory's resilience layer, after the response cache.
+    resilience = ResilienceSettings(
+        timeout=args.timeout,
+        max_retries=args.max_retries,
+        max_concurrency=args.provider_concurrency,
+        rate_limits={provider: rate / workers for provider, rate in parse_rate_limits(args.rate_limit).items()},
+    )
+    return BatchRunner(
+        output_dir=args.output_dir,
+        concurrency=args.concurrency,
+        max_messages=args.max_messages,
+        factory=AgentsFactory(cache_store=cache_store, offline=args.offline, resilience=resilience),
+        write_jsonl=args.jsonl,
+        max_total_tokens=args.max_tokens,
+        max_cost=args.max_cost,
+        personas_util=PersonasUtil(config_path=args.config),
+        context_policy=ContextPolicy(args.context, window=args.context_window, token_limit=args.context_token_limit),
+        speaker_selection=args.selection,
+        deadline_seconds=args.deadline,
+        session_store=SessionStore(args.session_store) if args.session_store else None,
+        resume=not args.no_resume,
+        translate=args.translate,
+        speculate=args.speculate,
+        transcript_store=TranscriptStore(args.transcripts) if args.transcripts else None,
+    )
+
+
+async def main(argv: Optional[List[str]] = None) -> None:
+    """Runs the batch parliament CLI."""
+    args = build_parser().parse_args(argv)
+
+    load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '.env'), override=True)
+    track_prompt_cache()
+
+    if args.topics == '-':
+        topics = read_topics(sys.stdin)
+    else:
+        with open(args.topics, 'r', encoding='utf-8') as f:
+            topics = read_topics(f)
+
+    if args.workers > 1:
+        from worker_pool import run_worker_pool
+        start = time.perf_counter()
+        outcomes, metrics = run_worker_pool(topics, args, args.workers)
+        failed = [outcome for outcome in outcomes if outcome.error]
+        print(f"Ran {len(outcomes)} sessions on {args.workers} workers in {time.perf_counter() - start:.1f}s "
+              f"({len(failed)} failed), {sum(outcome.total_tokens for outcome in outcomes)} tokens, "
+              f"${sum(outcome.cost for outcome in outcomes):.4f}.")
+        for worker in metrics:
+            status = "crashed" if worker.crashed else f"{worker.sessions_per_second:.2f} sessions/s"
+            print(f"  - worker {worker.worker_id} (pid {worker.pid}): {worker.sessions} sessions, {worker.failed} failed, "
+                  f"{status}, p50 {worker.latency_p50:.1f}s, p95 {worker.latency_p95:.1f}s")
+        return
+
+    setup_tracing(
+        args.tracing,
+        sample_ratio=args.trace_sample_ratio,
+        file_path=args.trace_file,
+        otlp_endpoint=os.getenv("OTEL_EXPORTER_OTLP_TRACES_ENDPOINT"),
+    )
+    runner = create_runner(args)
+    exporters = await MetricsExporters(args.metrics_port, args.metrics_file, args.metrics_interval).start()
+    start = time.perf_counter()
+    try:
+        outcomes = await runner.run(topics)
+    finally:
+        await runner.close()
+        await exporters.close()
+    failed = [outcome for outcome in outcomes if outcome.error]
+    print(f"Ran {len(outcomes)} sessions in {time.perf_counter() - start:.1f}s ({len(failed)} failed), "
+          f"{sum(outcome.total_tokens for outcome in outcomes)} tokens, ${sum(outcome.cost for outcome in outcomes):.4f}.")
+    print(runner.selection_stats.report())
+    if runner.speculate:
+        print(runner.speculation_stats.report())
+    if runner.translate:
+        print(runner.translation_stats.report())
+    for provider, counters in runner.factory.resilience_snapshot().items():
+        print(f"  - {provider}: {counters['calls']} calls, {counters['retries']} retries, "
+              f"{counters['timeouts']} timeouts, {counters['rejected']} rejected, circuit {counters['circuit']}")
+    if runner.factory.cache_store is not None:
+        stats = runner.factory.cache_stats
+        print(f"Response cache: {stats.hits} hits, {stats.misses} misses ({stats.hit_rate:.0%} hit rate).")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
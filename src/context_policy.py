@@ -0,0 +1,214 @@
+from dataclasses import dataclass
+from typing import Any, List, Mapping, Optional
+
+from autogen_core import CancellationToken
+from autogen_core.model_context import (
+    BufferedChatCompletionContext,
+    ChatCompletionContext,
+    HeadAndTailChatCompletionContext,
+    UnboundedChatCompletionContext,
+)
+from autogen_core.models import (
+    ChatCompletionClient,
+    FunctionExecutionResultMessage,
+    LLMMessage,
+    SystemMessage,
+    UserMessage,
+)
+
+# 'unbounded': the whole transcript every turn (the AutoGen default). 'window': the last `window` messages.
+# 'head_tail': the first `head` and last `tail` messages. 'summary': a rolling summary of older messages
+# followed by the last `window` messages.
+CONTEXT_MODES = ['unbounded', 'window', 'head_tail', 'summary']
+
+SUMMARY_PROMPT = (
+    "You keep the minutes of a group discussion. Update the running summary with the new messages. "
+    "Keep who said what, the jokes worth calling back to and any open questions. "
+    "Answer with the updated summary only, in at most {max_words} words."
+)
+
+
+def _message_text(message: LLMMessage) -> str:
+    source = getattr(message, 'source', type(message).__name__)
+    content = message.content if isinstance(message.content, str) else str(message.content)
+    return f"{source}: {content}"
+
+
+def _drop_leading_tool_results(messages: List[LLMMessage]) -> List[LLMMessage]:
+    # A tool result without the call that produced it is rejected by the providers.
+    while messages and isinstance(messages[0], FunctionExecutionResultMessage):
+        messages = messages[1:]
+    return messages
+
+
+class TokenCappedChatCompletionContext(ChatCompletionContext):
+    """Wraps another context and drops its oldest messages until the rest fits in `token_limit` tokens."""
+
+    def __init__(self, inner: ChatCompletionContext, model_client: ChatCompletionClient, token_limit: int):
+        """
+        Args:
+            inner (ChatCompletionContext): The context that picks the messages.
+            model_client (ChatCompletionClient): The client used to count tokens.
+            token_limit (int): The maximum number of prompt tokens taken by the context.
+
+        Raises:
+            ValueError: If token_limit is not positive.
+        """
+        super().__init__()
+        if token_limit <= 0:
+            raise ValueError("token_limit must be greater than 0.")
+        self.inner = inner
+        self.model_client = model_client
+        self.token_limit = token_limit
+
+    async def add_message(self, message: LLMMessage) -> None:
+        await self.inner.add_message(message)
+
+    async def get_messages(self) -> List[LLMMessage]:
+        messages = await self.inner.get_messages()
+        keep_first = 1 if messages and getattr(messages[0], 'source', None) == SummarizingChatCompletionContext.SUMMARY_SOURCE else 0
+        while len(messages) > keep_first and self.model_client.count_tokens(messages) > self.token_limit:
+            messages = messages[:keep_first] + _drop_leading_tool_results(messages[keep_first + 1:])
+        return messages
+
+    async def clear(self) -> None:
+        await self.inner.clear()
+
+    async def save_state(self) -> Mapping[str, Any]:
+        return await self.inner.save_state()
+
+    async def load_state(self, state: Mapping[str, Any]) -> None:
+        await self.inner.load_state(state)
+
+
+class SummarizingChatCompletionContext(ChatCompletionContext):
+    """Keeps the last `window` messages verbatim and folds older ones into a rolling summary.
+
+    Older messages are summarised in batches of `summary_batch`, with one model call that updates the
+    previous summary, so prompt size stays flat as the discussion grows instead of resending the transcript.
+    """
+
+    SUMMARY_SOURCE = "summary"
+
+    def __init__(
+        self,
+        model_client: ChatCompletionClient,
+        window: int = 6,
+        summary_batch: int = 4,
+        max_summary_words: int = 150,
+        initial_messages: Optional[List[LLMMessage]] = None,
+        cancellation_token: Optional[CancellationToken] = None,
+    ):
+        """
+        Args:
+            model_client (ChatCompletionClient): The client used to write the summary.
+            window (int): The number of recent messages kept verbatim.
+            summary_batch (int): How many older messages accumulate before the summary is updated.
+            max_summary_words (int): The length the summary is asked to stay under.
+            initial_messages (Optional[List[LLMMessage]]): The initial messages.
+            cancellation_token (Optional[CancellationToken]): Cancels the summary calls, e.g. the session's token.
+
+        Raises:
+            ValueError: If window or summary_batch is not positive.
+        """
+        super().__init__(initial_messages)
+        if window <= 0 or summary_batch <= 0:
+            raise ValueError("window and summary_batch must be greater than 0.")
+        self.model_client = model_client
+        self.window = window
+        self.summary_batch = summary_batch
+        self.max_summary_words = max_summary_words
+        self.summary = ""
+        self.summarized_count = 0
+        self.cancellation_token = cancellation_token
+
+    async def _update_summary(self, messages: List[LLMMessage]) -> None:
+        transcript = "\n".join(_message_text(message) for message in messages)
+        prompt: List[LLMMessage] = [
+            SystemMessage(content=SUMMARY_PROMPT.format(max_words=self.max_summary_words)),
+            UserMessage(
+                content=f"Running summary:\n{self.summary or '(none yet)'}\n\nNew messages:\n{transcript}",
+                source="user",
+            ),
+        ]
+        result = await self.model_client.create(prompt, cancellation_token=self.cancellation_token)
+        if isinstance(result.content, str):
+            self.summary = result.content.strip()
+
+    async def get_messages(self) -> List[LLMMessage]:
+        older_count = max(len(self._messages) - self.window, 0)
+        if older_count - self.summarized_count >= self.summary_batch:
+            await self._update_summary(self._messages[self.summarized_count:older_count])
+            self.summarized_count = older_count
+
+        messages = _drop_leading_tool_results(list(self._messages[self.summarized_count:]))
+        if self.summary:
+            summary_message = UserMessage(
+                content=f"Summary of the earlier discussion: {self.summary}", source=self.SUMMARY_SOURCE
+            )
+            return [summary_message] + messages
+        return messages
+
+    async def clear(self) -> None:
+        await super().clear()
+        self.summary = ""
+        self.summarized_count = 0
+
+    async def save_state(self) -> Mapping[str, Any]:
+        state = dict(await super().save_state())
+        state["summary"] = self.summary
+        state["summarized_count"] = self.summarized_count
+        return state
+
+    async def load_state(self, state: Mapping[str, Any]) -> None:
+        await super().load_state({"messages": state.get("messages", [])})
+        self.summary = state.get("summary", "")
+        self.summarized_count = state.get("summarized_count", 0)
+
+
+@dataclass
+class ContextPolicy:
+    """How much of the discussion each parliament agent and the selector send to the model."""
+    mode: str = 'unbounded'
+    window: int = 6
+    head: int = 2
+    summary_batch: int = 4
+    token_limit: Optional[int] = None
+
+    def __post_init__(self) -> None:
+        if self.mode not in CONTEXT_MODES:
+            raise ValueError(f"Unknown context mode: {self.mode}. Expected one of {CONTEXT_MODES}")
+
+    def create(
+        self, model_client: ChatCompletionClient, cancellation_token: Optional[CancellationToken] = None
+    ) -> Optional[ChatCompletionContext]:
+        """
+        Creates a fresh model context for one agent.
+
+        Args:
+            model_client (ChatCompletionClient): The agent's client, used to summarise and count tokens.
+            cancellation_token (Optional[CancellationToken]): Cancels the summary calls, e.g. the session's token.
+
+        Returns:
+            The context, or None to keep AutoGen's unbounded default.
+        """
+        context: Optional[ChatCompletionContext]
+        if self.mode == 'window':
+            context = BufferedChatCompletionContext(buffer_size=self.window)
+        elif self.mode == 'head_tail':
+            context = HeadAndTailChatCompletionContext(head_size=self.head, tail_size=self.window)
+        elif self.mode == 'summary':
+            context = SummarizingChatCompletionContext(
+                model_client,
+                window=self.window,
+                summary_batch=self.summary_batch,
+                cancellation_token=cancellation_token,
+            )
+        else:
+            context = None
+
+        if self.token_limit is None:
+            return context
+        if context is None:
+            context = UnboundedChatCompletionContext()
+        return TokenCappedChatCompletionContext(context, model_client, self.token_limit)
@@ -1,36 +1,21 @@
 from dotenv import load_dotenv
 import asyncio
 import os
-import random
-from autogen_agentchat.agents import AssistantAgent
-from autogen_agentchat.teams import SelectorGroupChat
-from autogen_agentchat.conditions import MaxMessageTermination
-from autogen_agentchat.messages import TextMessage # type: ignore
+from typing import Optional
 from autogen_core import CancellationToken
-from openai import OpenAI # type: ignore
 from agents_factory import AgentsFactory
-
-
-
-# for tracing
-from opentelemetry import trace
-from opentelemetry.sdk.trace import TracerProvider
-from opentelemetry.sdk.trace.export import ConsoleSpanExporter, SimpleSpanProcessor
-from opentelemetry.instrumentation.openai_v2 import OpenAIInstrumentor # type: ignore
-
+from parliament import run_parliament_session
+from context_policy import ContextPolicy
+from metrics import MetricsExporters
+from session_store import SessionStore
+from speaker_selection import SelectionStats
+from speculation import SpeculationStats
+from token_budget import SessionUsage, prices_from_settings, track_prompt_cache
+from transcript import TranscriptStore
+from translation import TranslationStats, translated_script_path
 from personas_util import PersonasUtil # type: ignore
-
-# setup tracing
-# 1. Set up the "Console Tracer"
-tracer_provider = TracerProvider()
-trace.set_tracer_provider(tracer_provider)
-tracer = trace.get_tracer_provider().get_tracer(__name__)
-tracer_provider.add_span_processor(
-    SimpleSpanProcessor(ConsoleSpanExporter())  # <--- This prints to your terminal
-)
-
-# 2. Enable automatic instrumentation
-OpenAIInstrumentor().instrument()
+from provider_leaderboard import DEFAULT_LEADERBOARD_PATH, ProviderLeaderboard
+from tracing import setup_tracing_from_env
 
 # Load environment variables from .env file with override
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '.env'), override=True)
@@ -42,29 +27,38 @@ async def get_weather(city:str) -> str:
 
 async def main() -> None:
     """Initialize and run the AutoGen Lab application.
-    
-    Sets up the OpenAI model client for agent interactions.
+
+    Loads the personas, asks for a topic and runs one parliament session on it, streaming the script to
+    pub_script.txt. The environment variables described below turn on the optional features.
     """
+    # setup tracing - TRACING_MODE selects off / console / batch / file / otlp
+    setup_tracing_from_env()
+
     # Load and display personas
     personas_util = PersonasUtil()
     parliament_members = personas_util.get_parliament_members()
     print("--- Parliament Members ---")
     for name, persona in parliament_members.items():
         print(f"  - {name.capitalize()}: {persona.get('description')}")
-    
-    scripter = personas_util.get_persona('scripter')
-    if scripter:
-        print("\n--- Scripter ---")
-        print(f"  - Name: {scripter.get('name')}")
-        print(f"  - Role: {scripter.get('role')}")
     print("-" * 20)
     
     # message = TextMessage(content="Hello, AutoGen Lab!, I'd like to go to Tel-Aviv", source="user")
 
     print(f"Welcome to AutoGen Lab :)")
 
-    # Create the AgentsFactory instance
-    factory = AgentsFactory()
+    # Create the AgentsFactory instance - PARLIAMENT_OFFLINE=1 serves every provider from local mock clients.
+    # PROVIDER_LEADERBOARD=1 gives members the provider `python src/provider_eval.py <topic>` ranked best for
+    # them (or set it to another leaderboard file); otherwise every member is routed randomly.
+    leaderboard_setting = os.getenv("PROVIDER_LEADERBOARD", "")
+    leaderboard_path = DEFAULT_LEADERBOARD_PATH if leaderboard_setting == "1" else leaderboard_setting
+    factory = AgentsFactory(
+        offline=os.getenv("PARLIAMENT_OFFLINE") == "1",
+        leaderboard=ProviderLeaderboard.load(leaderboard_path) if leaderboard_path else None,
+    )
+    # TOOLS=1 lets the members look up the weather; lookups are memoised per session.
+    use_tools = os.getenv("TOOLS", "0") == "1"
+    if use_tools:
+        factory.tools.register(get_weather)
 
     # get the topic from the user input (trtminal or other source
     # print("What would you like to cover today?  (Press Enter for default topic 'weather')")
@@ -73,16 +67,6 @@ async def main() -> None:
     #     topic = "weather"
     # print(f"Topic selected: {topic}")
 
-    # now, use the personas util to load the personas, instructions (that should be the system message) and the description
-
-    personas_util = PersonasUtil()
-    parliament_members = personas_util.get_parliament_members()
-    print("--- Parliament Members ---")
-    for name, persona in parliament_members.items():
-        print(f"  - {name.capitalize()}: {persona.get('description')}")
-    print("-" * 20)    
-    # -------------------------------------------------------
-
     # lets get the scripter persona and the translator persona too - print them out
     scripter = personas_util.get_persona('scripter')
     if scripter:
@@ -104,66 +88,102 @@ async def main() -> None:
     if not topic:
         topic = "weather"
     print(f"Topic selected: {topic}")
-    # great, now that we have the personas loaded, let's create the agents using the factory
-    # add both sysytem message and description from the persona
-    parliament_agents: list[AssistantAgent] = []
-
-    # select a random model for each member from the available ones    
-    for parliament_member in parliament_members.values():
-        # select different client - use rand for variety
-        print(f"current parliament member: {parliament_member}")
-        client_name = random.choice(["grok", "azure", "openai"])
-        model_client = factory.get_client(client_name)
-        if model_client is None:
-            print(f"Warning: Could not create client '{client_name}', skipping agent creation")
-            continue
-        
-        agent = AssistantAgent(
-            name = parliament_member.get('name', 'Agent'),
-            model_client=model_client,
-            system_message=parliament_member.get('instructions', 'You are a helpful assistant.'),
-            description=parliament_member.get('description', '')
+    # great, now that we have the personas loaded, run the parliament - the agents and the group chat
+    # moderated by the scripter persona are created by the factory.
+    # --- SAVE (The Middleware): each turn is appended to the script as soon as it arrives ---
+    print("\n💾 Streaming Script to pub_script.txt...")
+    usage = SessionUsage(prices_from_settings(personas_util.get_all_personas()))
+    track_prompt_cache()
+    max_tokens = os.getenv("MAX_SESSION_TOKENS")
+    max_cost = os.getenv("MAX_SESSION_COST")
+    deadline = os.getenv("SESSION_DEADLINE_SECONDS")
+    selection_stats = SelectionStats()
+    speculation_stats = SpeculationStats()
+    # SESSION_STORE=sessions.sqlite checkpoints every turn, so rerunning an interrupted topic resumes it.
+    store_path = os.getenv("SESSION_STORE", "")
+    session_store = SessionStore(store_path) if store_path else None
+    # TRANSCRIPT_DIR=transcripts keeps a structured transcript of the run, indexed by topic and speaker;
+    # `python src/transcript.py render <session id>` renders its script.
+    transcript_dir = os.getenv("TRANSCRIPT_DIR", "")
+    transcript_store = TranscriptStore(transcript_dir) if transcript_dir else None
+    # METRICS_PORT serves Prometheus metrics on localhost; METRICS_FILE writes periodic JSON snapshots.
+    metrics_port = os.getenv("METRICS_PORT")
+    exporters: Optional[MetricsExporters] = None
+    # TRANSLATE=1 has the translator persona translate the script while the debate runs.
+    translate = bool(translator) and os.getenv("TRANSLATE", "0") == "1"
+    translation_stats = TranslationStats()
+    if translate:
+        print(f"🌐 Translating to {translated_script_path('pub_script.txt')} as the debate runs...")
+    # From here on everything that can fail runs inside the try, so the stores and clients above are closed.
+    try:
+        # SPECULATE=N starts the N likely next speakers' turns while the selector model is still choosing.
+        speculate = int(os.getenv("SPECULATE", "0"))
+        exporters = await MetricsExporters(
+            int(metrics_port) if metrics_port else None,
+            os.getenv("METRICS_FILE") or None,
+            float(os.getenv("METRICS_INTERVAL", "5")),
+        ).start()
+        member_client_types = factory.member_client_types(
+            m.get('name', 'Agent') for m in parliament_members.values()
         )
-        parliament_agents.append(agent)
-    # -------------------------------------------------------
-    # get instructions and description for the group chat moderator (scripter persona)
-    scripter_instructions = scripter.get('instructions', 'You are moderating the discussion.').format(topic)
-    scripter_description = scripter.get('description', 'A skilled moderator.')
-
-    # Get the group chat model client and ensure it's not None
-    groupchat_model_client = factory.get_client("azure")
-    if groupchat_model_client is None:
-        print("Error: Could not create Azure client for group chat management")
+        for member, provider in member_client_types.items():
+            print(f"  - {member} speaks through {provider} (provider leaderboard)")
+        result = await run_parliament_session(
+            topic,
+            personas_util,
+            factory.get_client,
+            output_path="pub_script.txt",
+            jsonl_path=os.getenv("PUB_SCRIPT_JSONL"),
+            cancellation_token=CancellationToken(),
+            echo=True,
+            usage=usage,
+            max_total_tokens=int(max_tokens) if max_tokens else None,
+            max_cost=float(max_cost) if max_cost else None,
+            context_policy=ContextPolicy(os.getenv("CONTEXT_MODE", "unbounded")),
+            speaker_selection=os.getenv("SPEAKER_SELECTION", "llm"),
+            selection_stats=selection_stats,
+            deadline_seconds=float(deadline) if deadline else None,
+            session_store=session_store,
+            translation_path=translated_script_path("pub_script.txt") if translate else None,
+            translation_stats=translation_stats,
+            tool_registry=factory.tools if use_tools else None,
+            speculate=speculate,
+            speculation_stats=speculation_stats,
+            transcript_store=transcript_store,
+            member_client_types=member_client_types,
+        )
+    finally:
+        await factory.close()
+        if exporters is not None:
+            await exporters.close()
+        if session_store is not None:
+            session_store.close()
+        if transcript_store is not None:
+            transcript_store.close()
+    if result is None:
         return
 
-    groupchat = SelectorGroupChat(
-        name="ParliamentChat",
-        participants=parliament_agents,  # type: ignore
-        model_client=groupchat_model_client,  # Using Azure for group chat management
-        termination_condition=MaxMessageTermination(max_messages=5),
-        allow_repeated_speaker=True,
-        selector_prompt=scripter_instructions,
-        description=scripter_description
-    )
-
-    result = await groupchat.run(task=f"You are discussing today's topic: {topic}.", cancellation_token=CancellationToken())
-
-    # --- PHASE 2: SAVE (The Middleware) ---
-    script_text = ""
-    print("\n💾 Saving Script...")
-    
-    for msg in result.messages:
-        # Filter out system events, keep only text messages
-        if hasattr(msg, 'content') and msg.source != "user":
-            script_text += f"{msg.source}: {msg.content}\n\n" # type: ignore
-
-    print("Script Content:")
-    print(script_text)
-
-    with open("pub_script.txt", "w", encoding="utf-8") as f:
-        f.write(script_text)
-        
-    print(f"Script saved ({len(result.messages)} messages).")
+    print(f"Script saved ({result.turns} turns).")
+    print(usage.report())
+    print(selection_stats.report())
+    if speculate:
+        print(speculation_stats.report())
+    if translate:
+        print(translation_stats.report())
+    if use_tools:
+        print(factory.tools.stats.report())
+    router_stats = factory.router.snapshot()
+    if router_stats:
+        print("--- Model Router ---")
+    for provider, stats in router_stats.items():
+        latency = f"{stats['mean_latency']:.2f}s" if stats['mean_latency'] is not None else "n/a"
+        print(f"  - {provider}: {stats['calls']} calls, {stats['error_rate']:.0%} errors, mean latency {latency}")
+    resilience = factory.resilience_snapshot()
+    if resilience:
+        print("--- Resilience ---")
+    for provider, counters in resilience.items():
+        print(f"  - {provider}: {counters['retries']} retries, {counters['timeouts']} timeouts, "
+              f"{counters['rejected']} rejected, circuit {counters['circuit']}")
 
     print("\n Here is the final response from the group chat:")
     # # Initialize Azure OpenAI model client
@@ -0,0 +1,402 @@
+import asyncio
+import bisect
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncGenerator, Deque, Dict, List, Optional, Sequence, Tuple, Union
+
+from autogen_core.models import ChatCompletionClient, CreateResult, LLMMessage
+
+from client_wrappers import DelegatingChatCompletionClient
+
+# Upper bounds, in seconds, of the latency histogram buckets: from a fast heuristic pick to a slow completion.
+DEFAULT_BUCKETS = (0.005, 0.025, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# The window, in seconds, of the rates in JSON snapshots.
+RATE_WINDOW_SECONDS = 60.0
+
+_HELP = {
+    "parliament_sessions_in_flight": ("gauge", "Sessions currently running."),
+    "parliament_sessions_total": ("counter", "Sessions finished, by status."),
+    "parliament_turns_total": ("counter", "Speaker turns produced."),
+    "parliament_model_call_seconds": ("histogram", "Latency of each model call attempt, by provider."),
+    "parliament_model_calls_total": ("counter", "Model call attempts, by provider and outcome."),
+    "parliament_model_errors_total": ("counter", "Failed model call attempts, by provider and error type."),
+    "parliament_tokens_total": ("counter", "Tokens used, by provider and kind."),
+    "parliament_selector_decision_seconds": ("histogram", "Time to pick the next speaker, by method."),
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Sequence[Tuple[str, str]] = ()) -> str:
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Histogram:
+    """Counts observations into cumulative buckets, Prometheus style."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self) -> List[Tuple[float, int]]:
+        """The (upper bound, observations at or below it) of every bucket, ending with +Inf."""
+        total = 0
+        result: List[Tuple[float, int]] = []
+        for bound, count in zip(self.buckets + (math.inf,), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def quantile(self, q: float) -> float:
+        """Estimates a quantile as the upper bound of the bucket it falls in (the largest finite one for +Inf)."""
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        for bound, total in self.cumulative():
+            if total >= rank:
+                return bound if not math.isinf(bound) else self.buckets[-1]
+        return self.buckets[-1]
+
+
+class MetricsRegistry:
+    """Counters, gauges and histograms of a running parliament, readable as Prometheus text or as JSON.
+
+    Updates are cheap enough to stay on in every run; nothing is exported unless a MetricsServer or a
+    SnapshotWriter reads the registry.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        """
+        Args:
+            buckets (Sequence[float]): The upper bounds of the histogram buckets, in seconds.
+        """
+        self.buckets = tuple(buckets)
+        self.started_at = time.time()
+        self._counters: Dict[Tuple[str, LabelKey], float] = {}
+        self._gauges: Dict[Tuple[str, LabelKey], float] = {}
+        self._histograms: Dict[Tuple[str, LabelKey], Histogram] = {}
+        # Recent counter increments, for the rates in snapshots.
+        self._recent: Dict[str, Deque[Tuple[float, float]]] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1.0, **labels: Any) -> None:
+        """Adds to a counter."""
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+            self._recent.setdefault(name, deque(maxlen=10000)).append((time.monotonic(), value))
+
+    def add(self, name: str, delta: float, **labels: Any) -> None:
+        """Moves a gauge up or down."""
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._gauges[key] = self._gauges.get(key, 0.0) + delta
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        """Adds an observation to a histogram."""
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def value(self, name: str, **labels: Any) -> float:
+        """The current value of a counter or gauge, 0 if it was never set."""
+        key = (name, _label_key(labels))
+        with self._lock:
+            return self._counters.get(key, self._gauges.get(key, 0.0))
+
+    def rate(self, name: str, window: float = RATE_WINDOW_SECONDS) -> float:
+        """The per-second increase of a counter, summed over its labels, in the last `window` seconds."""
+        since = time.monotonic() - window
+        with self._lock:
+            recent = self._recent.get(name, ())
+            total = sum(value for at, value in recent if at >= since)
+        elapsed = min(window, time.time() - self.started_at)
+        return total / elapsed if elapsed > 0 else 0.0
+
+    def render_prometheus(self) -> str:
+        """
+        Renders every metric in the Prometheus text exposition format.
+
+        Returns:
+            The text, served as 'text/plain; version=0.0.4'.
+        """
+        with self._lock:
+            samples: Dict[str, List[str]] = {}
+            for (name, key), value in sorted(self._counters.items()) + sorted(self._gauges.items()):
+                samples.setdefault(name, []).append(f"{name}{_format_labels(key)} {_format_value(value)}")
+            for (name, key), histogram in sorted(self._histograms.items()):
+                lines = samples.setdefault(name, [])
+                for bound, total in histogram.cumulative():
+                    lines.append(f"{name}_bucket{_format_labels(key, [('le', _format_value(bound))])} {total}")
+                lines.append(f"{name}_sum{_format_labels(key)} {_format_value(histogram.sum)}")
+                lines.append(f"{name}_count{_format_labels(key)} {histogram.count}")
+        output: List[str] = []
+        for name in sorted(samples):
+            kind, help_text = _HELP.get(name, ("untyped", name))
+            output.append(f"# HELP {name} {help_text}")
+            output.append(f"# TYPE {name} {kind}")
+            output.extend(samples[name])
+        return "\n".join(output) + "\n"
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Takes a JSON-serializable snapshot for dashboards.
+
+        Returns:
+            The counters and gauges, histogram counts with p50/p95 estimates, and the turn and token rates
+            over the last RATE_WINDOW_SECONDS.
+        """
+        with self._lock:
+            counters = [
+                {"name": name, "labels": dict(key), "value": value} for (name, key), value in sorted(self._counters.items())
+            ]
+            gauges = [
+                {"name": name, "labels": dict(key), "value": value} for (name, key), value in sorted(self._gauges.items())
+            ]
+            histograms = [
+                {
+                    "name": name,
+                    "labels": dict(key),
+                    "count": histogram.count,
+                    "sum": histogram.sum,
+                    "p50": histogram.quantile(0.5),
+                    "p95": histogram.quantile(0.95),
+                }
+                for (name, key), histogram in sorted(self._histograms.items())
+            ]
+        return {
+            "timestamp": time.time(),
+            "uptime_seconds": time.time() - self.started_at,
+            "rates": {
+                "turns_per_second": self.rate("parliament_turns_total"),
+                "tokens_per_second": self.rate("parliament_tokens_total"),
+                "model_errors_per_second": self.rate("parliament_model_errors_total"),
+            },
+            "counters": counters,
+            "gauges": gauges,
+            "histograms": histograms,
+        }
+
+
+# The process-wide registry every component reports to.
+registry = MetricsRegistry()
+
+
+class MetricsChatCompletionClient(DelegatingChatCompletionClient):
+    """A model client that reports the latency, outcome and tokens of every call to a provider."""
+
+    def __init__(self, inner: ChatCompletionClient, provider: str, metrics: Optional[MetricsRegistry] = None):
+        """
+        Args:
+            inner (ChatCompletionClient): The provider client.
+            provider (str): The provider label.
+            metrics (Optional[MetricsRegistry]): The registry to report to. Defaults to the process-wide one.
+        """
+        super().__init__(inner)
+        self.provider = provider
+        self.metrics = metrics or registry
+
+    def _record(self, start: float, result: Optional[CreateResult], error: Optional[BaseException]) -> None:
+        self.metrics.observe("parliament_model_call_seconds", time.perf_counter() - start, provider=self.provider)
+        self.metrics.inc("parliament_model_calls_total", provider=self.provider, outcome="ok" if error is None else "error")
+        if error is not None:
+            self.metrics.inc("parliament_model_errors_total", provider=self.provider, error=type(error).__name__)
+        elif result is not None:
+            self.metrics.inc("parliament_tokens_total", result.usage.prompt_tokens, provider=self.provider, kind="prompt")
+            self.metrics.inc(
+                "parliament_tokens_total", result.usage.completion_tokens, provider=self.provider, kind="completion"
+            )
+
+    async def create(self, messages: Sequence[LLMMessage], **kwargs: Any) -> CreateResult:  # type: ignore[override]
+        start = time.perf_counter()
+        try:
+            result = await super().create(messages, **kwargs)
+        except Exception as e:
+            self._record(start, None, e)
+            raise
+        self._record(start, result, None)
+        return result
+
+    async def create_stream(  # type: ignore[override]
+        self, messages: Sequence[LLMMessage], **kwargs: Any
+    ) -> AsyncGenerator[Union[str, CreateResult], None]:
+        start = time.perf_counter()
+        try:
+            async for chunk in super().create_stream(messages, **kwargs):
+                if isinstance(chunk, CreateResult):
+                    self._record(start, chunk, None)
+                yield chunk
+        except Exception as e:
+            self._record(start, None, e)
+            raise
+
+
+class MetricsServer:
+    """Serves a registry over HTTP: Prometheus text at /metrics and a JSON snapshot at /metrics.json."""
+
+    def __init__(self, metrics: Optional[MetricsRegistry] = None, host: str = '127.0.0.1', port: int = 9464):
+        """
+        Args:
+            metrics (Optional[MetricsRegistry]): The registry to serve. Defaults to the process-wide one.
+            host (str): The interface to listen on. Defaults to localhost only.
+            port (int): The port. 0 picks a free one, available as `port` once started.
+        """
+        self.metrics = metrics or registry
+        self.host = host
+        self.port = port
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> "MetricsServer":
+        """Starts listening."""
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request = (await reader.readline()).decode('latin-1').split()
+            while (await reader.readline()).strip():
+                pass  # Headers are not needed.
+            path = request[1].split('?')[0] if len(request) > 1 else '/'
+            if path == '/metrics':
+                status, content_type = "200 OK", "text/plain; version=0.0.4; charset=utf-8"
+                body = self.metrics.render_prometheus().encode('utf-8')
+            elif path == '/metrics.json':
+                status, content_type = "200 OK", "application/json"
+                body = json.dumps(self.metrics.snapshot()).encode('utf-8')
+            else:
+                status, content_type, body = "404 Not Found", "text/plain", b"Not found\n"
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\nContent-Length: {len(body)}\r\n"
+                f"Connection: close\r\n\r\n".encode('latin-1') + body
+            )
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def close(self) -> None:
+        """Stops listening."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+
+class SnapshotWriter:
+    """Writes a registry's JSON snapshot to a file every `interval` seconds, replacing it atomically."""
+
+    def __init__(self, path: str, interval: float = 5.0, metrics: Optional[MetricsRegistry] = None):
+        """
+        Args:
+            path (str): The snapshot file.
+            interval (float): Seconds between snapshots.
+            metrics (Optional[MetricsRegistry]): The registry to snapshot. Defaults to the process-wide one.
+
+        Raises:
+            ValueError: If interval is not positive.
+        """
+        if interval <= 0:
+            raise ValueError(f"interval must be positive, got {interval}")
+        self.path = path
+        self.interval = interval
+        self.metrics = metrics or registry
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    def write(self) -> None:
+        """Writes one snapshot now."""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.metrics.snapshot(), f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def start(self) -> "SnapshotWriter":
+        """Starts writing in the background."""
+        self._task = asyncio.ensure_future(self._run())
+        return self
+
+    async def _run(self) -> None:
+        while True:
+            self.write()
+            await asyncio.sleep(self.interval)
+
+    async def close(self) -> None:
+        """Stops writing, after a final snapshot."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.write()
+
+
+class MetricsExporters:
+    """The metrics server and snapshot writer of a run, started and closed together."""
+
+    def __init__(
+        self,
+        port: Optional[int] = None,
+        snapshot_path: Optional[str] = None,
+        interval: float = 5.0,
+        host: str = '127.0.0.1',
+        metrics: Optional[MetricsRegistry] = None,
+    ):
+        """
+        Args:
+            port (Optional[int]): The port to serve /metrics and /metrics.json on. None serves nothing.
+            snapshot_path (Optional[str]): The JSON snapshot file. None writes none.
+            interval (float): Seconds between snapshots.
+            host (str): The interface the server listens on.
+            metrics (Optional[MetricsRegistry]): The registry to export. Defaults to the process-wide one.
+        """
+        self.server = MetricsServer(metrics, host=host, port=port) if port is not None else None
+        self.writer = SnapshotWriter(snapshot_path, interval, metrics) if snapshot_path else None
+
+    async def start(self) -> "MetricsExporters":
+        """Starts the configured exporters and prints where to find them."""
+        if self.server is not None:
+            await self.server.start()
+            print(f"📈 Metrics at http://{self.server.host}:{self.server.port}/metrics (JSON at /metrics.json)")
+        if self.writer is not None:
+            self.writer.start()
+            print(f"📈 Metrics snapshot every {self.writer.interval:g}s in {self.writer.path}")
+        return self
+
+    async def close(self) -> None:
+        """Stops the exporters, writing a final snapshot."""
+        if self.server is not None:
+            await self.server.close()
+        if self.writer is not None:
+            await self.writer.close()
@@ -0,0 +1,284 @@
+import asyncio
+import itertools
+import json
+import logging
+import random
+from collections import OrderedDict
+from typing import Any, AsyncGenerator, Dict, Iterator, List, Literal, Mapping, Optional, Sequence, Union
+
+from autogen_core import EVENT_LOGGER_NAME, CancellationToken
+from autogen_core.logging import LLMCallEvent
+from autogen_core import FunctionCall
+from autogen_core.models import (
+    ChatCompletionClient,
+    CreateResult,
+    FunctionExecutionResultMessage,
+    LLMMessage,
+    ModelCapabilities,  # type: ignore
+    ModelFamily,
+    ModelInfo,
+    RequestUsage,
+)
+from autogen_core.tools import Tool, ToolSchema
+from pydantic import BaseModel
+
+from personas_util import PARLIAMENT_MEMBER_NAMES
+
+# Filler for synthetic completions. None of these words is a parliament member's name, so the selector
+# only ever sees the one name a synthetic completion starts with.
+_FILLER_WORDS = (
+    "well", "listen", "the", "pub", "is", "full", "tonight", "and", "nobody", "agrees", "about", "anything",
+    "another", "round", "please", "honestly", "that", "was", "funnier", "last", "week",
+)
+
+# The value a synthetic tool call passes for each required parameter, by JSON schema type.
+_SAMPLE_ARGUMENTS: Dict[str, Any] = {"string": "Tel Aviv", "integer": 1, "number": 1.0, "boolean": True}
+
+logger = logging.getLogger(EVENT_LOGGER_NAME)
+
+
+def load_recorded_responses(path: str) -> List[str]:
+    """
+    Reads the completions recorded in a session's JSONL script, as written by ScriptWriter.
+
+    Args:
+        path (str): The JSONL file. Lines that are not JSON objects with a 'content' string are skipped.
+
+    Returns:
+        The recorded contents, in order.
+    """
+    responses: List[str] = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(record, dict) and isinstance(record.get('content'), str):
+                responses.append(record['content'])
+    return responses
+
+
+class MockChatCompletionClient(ChatCompletionClient):
+    """An offline model client that serves recorded or synthetic completions.
+
+    Recorded responses are replayed in order and cycled. Without them, each completion is `completion_tokens`
+    words starting with a speaker name picked by a seeded random generator, so the same seed always produces
+    the same session and the selector always finds exactly one valid name. Every call waits `latency_ms`
+    (plus up to `jitter_ms`) to stand in for the network.
+
+    Like OpenAI, the client caches prompt prefixes of at least `cache_min_tokens` in blocks of
+    `cache_block_tokens`, and `create` logs an LLMCallEvent whose usage reports the cached tokens. The cache
+    keeps the `cache_max_blocks` most recently used blocks.
+
+    With `function_calling`, a call offered tools answers with a call to one of them, picked by the seeded
+    generator, and the call that follows its result answers with text, so offline sessions go through the
+    agents' tool path.
+    """
+
+    def __init__(
+        self,
+        responses: Optional[Sequence[str]] = None,
+        speakers: Optional[Sequence[str]] = None,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        completion_tokens: int = 40,
+        seed: int = 0,
+        token_limit: int = 128000,
+        cache_min_tokens: int = 1024,
+        cache_block_tokens: int = 128,
+        cache_max_blocks: int = 4096,
+        function_calling: bool = False,
+    ):
+        """
+        Args:
+            responses (Optional[Sequence[str]]): Recorded completions to replay. None or empty generates them.
+            speakers (Optional[Sequence[str]]): The names synthetic completions start with. Defaults to the
+                                                parliament members.
+            latency_ms (float): The delay of every call in milliseconds.
+            jitter_ms (float): The maximum random delay added to latency_ms.
+            completion_tokens (int): The length of synthetic completions, in words.
+            seed (int): The seed for speaker picks and jitter.
+            token_limit (int): The context size reported by remaining_tokens.
+            cache_min_tokens (int): The shortest prompt prefix the simulated prompt cache serves.
+            cache_block_tokens (int): The granularity of the simulated prompt cache.
+            cache_max_blocks (int): How many prefix blocks the simulated prompt cache keeps.
+            function_calling (bool): Whether the model supports function calling and calls the tools it is offered.
+
+        Raises:
+            ValueError: If a latency is negative, or completion_tokens or a cache size is less than one.
+        """
+        if latency_ms < 0 or jitter_ms < 0:
+            raise ValueError("latency_ms and jitter_ms must not be negative")
+        if completion_tokens < 1:
+            raise ValueError(f"completion_tokens must be at least 1, got {completion_tokens}")
+        if cache_min_tokens < 1 or cache_block_tokens < 1 or cache_max_blocks < 1:
+            raise ValueError("cache_min_tokens, cache_block_tokens and cache_max_blocks must be at least 1")
+        self.responses = list(responses or [])
+        self.speakers = list(speakers or [name.capitalize() for name in PARLIAMENT_MEMBER_NAMES])
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.completion_tokens = completion_tokens
+        self.token_limit = token_limit
+        self.cache_min_tokens = cache_min_tokens
+        self.cache_block_tokens = cache_block_tokens
+        self.cache_max_blocks = cache_max_blocks
+        self.calls = 0
+        self.tool_calls = 0
+        # The hashes of the cached prefixes, least recently used first.
+        self._cached_prefixes: "OrderedDict[int, None]" = OrderedDict()
+        self._random = random.Random(seed)
+        self._recorded: Optional[Iterator[str]] = itertools.cycle(self.responses) if self.responses else None
+        self._actual_usage = RequestUsage(prompt_tokens=0, completion_tokens=0)
+        self._total_usage = RequestUsage(prompt_tokens=0, completion_tokens=0)
+        self._model_info = ModelInfo(
+            vision=False,
+            function_calling=function_calling,
+            json_output=False,
+            structured_output=False,
+            family=ModelFamily.UNKNOWN,
+        )
+
+    def _next_content(self) -> str:
+        if self._recorded is not None:
+            return next(self._recorded)
+        words = [self._random.choice(self.speakers)]
+        words += [self._random.choice(_FILLER_WORDS) for _ in range(self.completion_tokens - 1)]
+        return " ".join(words)
+
+    async def _wait(self, cancellation_token: Optional[CancellationToken]) -> None:
+        delay = (self.latency_ms + self._random.uniform(0, self.jitter_ms)) / 1000
+        if delay <= 0:
+            # Still yield to the event loop, like a real request would.
+            await asyncio.sleep(0)
+            return
+        sleep = asyncio.ensure_future(asyncio.sleep(delay))
+        if cancellation_token is not None:
+            cancellation_token.link_future(sleep)
+        await sleep
+
+    def _cached_prefix_tokens(self, messages: Sequence[LLMMessage]) -> int:
+        """Returns the longest cached prefix of the prompt, and caches the prompt's own prefixes."""
+        words = [word for message in messages for word in str(message.content).split()]
+        cached = 0
+        start = 0
+        key = 0
+        for end in range(self.cache_min_tokens, len(words) + 1, self.cache_block_tokens):
+            # Each prefix's hash extends the previous one's by the block in between.
+            key = hash((key, tuple(words[start:end])))
+            start = end
+            if key in self._cached_prefixes:
+                self._cached_prefixes.move_to_end(key)
+                cached = end
+            else:
+                self._cached_prefixes[key] = None
+                if len(self._cached_prefixes) > self.cache_max_blocks:
+                    self._cached_prefixes.popitem(last=False)
+        return cached
+
+    def _tool_call(
+        self, messages: Sequence[LLMMessage], tools: Sequence[Tool | ToolSchema], tool_choice: Any
+    ) -> Optional[FunctionCall]:
+        """The call to answer with, or None to answer with text."""
+        if not self._model_info["function_calling"] or not tools or tool_choice == "none":
+            return None
+        if messages and isinstance(messages[-1], FunctionExecutionResultMessage):
+            return None  # The model is reflecting on the tool's result.
+        tool = self._random.choice(list(tools))
+        schema = tool.schema if isinstance(tool, Tool) else tool
+        parameters = schema.get("parameters") or {}
+        properties: Dict[str, Any] = parameters.get("properties", {})
+        arguments = {
+            name: _SAMPLE_ARGUMENTS.get(properties.get(name, {}).get("type", "string"), "pub")
+            for name in parameters.get("required", [])
+        }
+        self.tool_calls += 1
+        return FunctionCall(id=f"call_{self.tool_calls}", name=schema["name"], arguments=json.dumps(arguments))
+
+    def _complete(
+        self, messages: Sequence[LLMMessage], tools: Sequence[Tool | ToolSchema] = (), tool_choice: Any = "auto"
+    ) -> CreateResult:
+        call = self._tool_call(messages, tools, tool_choice)
+        content: Union[str, List[FunctionCall]] = [call] if call is not None else self._next_content()
+        completion = call.arguments if call is not None else str(content)
+        usage = RequestUsage(prompt_tokens=self.count_tokens(messages), completion_tokens=len(completion.split()))
+        self.calls += 1
+        self._actual_usage = usage
+        self._total_usage = RequestUsage(
+            prompt_tokens=self._total_usage.prompt_tokens + usage.prompt_tokens,
+            completion_tokens=self._total_usage.completion_tokens + usage.completion_tokens,
+        )
+        finish_reason = "function_calls" if call is not None else "stop"
+        return CreateResult(finish_reason=finish_reason, content=content, usage=usage, cached=False)
+
+    async def create(
+        self,
+        messages: Sequence[LLMMessage],
+        *,
+        tools: Sequence[Tool | ToolSchema] = [],
+        tool_choice: Tool | Literal["auto", "required", "none"] = "auto",
+        json_output: Optional[bool | type[BaseModel]] = None,
+        extra_create_args: Mapping[str, Any] = {},
+        cancellation_token: Optional[CancellationToken] = None,
+    ) -> CreateResult:
+        await self._wait(cancellation_token)
+        cached_tokens = self._cached_prefix_tokens(messages)
+        result = self._complete(messages, tools, tool_choice)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                LLMCallEvent(
+                    messages=[{"role": message.type, "content": str(message.content)} for message in messages],
+                    response={
+                        "content": str(result.content),
+                        "usage": {
+                            "prompt_tokens": result.usage.prompt_tokens,
+                            "completion_tokens": result.usage.completion_tokens,
+                            "prompt_tokens_details": {"cached_tokens": cached_tokens},
+                        },
+                    },
+                    prompt_tokens=result.usage.prompt_tokens,
+                    completion_tokens=result.usage.completion_tokens,
+                )
+            )
+        return result
+
+    async def create_stream(  # type: ignore[override]
+        self,
+        messages: Sequence[LLMMessage],
+        *,
+        tools: Sequence[Tool | ToolSchema] = [],
+        tool_choice: Tool | Literal["auto", "required", "none"] = "auto",
+        json_output: Optional[bool | type[BaseModel]] = None,
+        extra_create_args: Mapping[str, Any] = {},
+        cancellation_token: Optional[CancellationToken] = None,
+    ) -> AsyncGenerator[Union[str, CreateResult], None]:
+        await self._wait(cancellation_token)
+        result = self._complete(messages, tools, tool_choice)
+        if isinstance(result.content, str):
+            for index, word in enumerate(result.content.split(" ")):
+                yield word if index == 0 else " " + word
+        yield result
+
+    async def close(self) -> None:
+        pass
+
+    def actual_usage(self) -> RequestUsage:
+        return self._actual_usage
+
+    def total_usage(self) -> RequestUsage:
+        return self._total_usage
+
+    def count_tokens(self, messages: Sequence[LLMMessage], *, tools: Sequence[Tool | ToolSchema] = []) -> int:
+        # One token per whitespace-separated word, like AutoGen's ReplayChatCompletionClient.
+        return sum(len(str(message.content).split()) for message in messages)
+
+    def remaining_tokens(self, messages: Sequence[LLMMessage], *, tools: Sequence[Tool | ToolSchema] = []) -> int:
+        return max(self.token_limit - self.count_tokens(messages), 0)
+
+    @property
+    def capabilities(self) -> ModelCapabilities:  # type: ignore
+        return {"vision": False, "function_calling": self._model_info["function_calling"], "json_output": False}  # type: ignore
+
+    @property
+    def model_info(self) -> ModelInfo:
+        return self._model_info
@@ -0,0 +1,269 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, AsyncGenerator, Callable, Deque, Dict, List, Optional, Sequence, Tuple, Union
+
+from autogen_core.models import ChatCompletionClient, CreateResult, LLMMessage
+
+from client_wrappers import DelegatingChatCompletionClient
+from resilience import CircuitOpenError, DeadlineExceededError, is_retryable
+
+ROUTED_PROVIDERS = ["grok", "azure", "openai"]
+
+logger = logging.getLogger(__name__)
+
+
+def should_fail_over(error: BaseException) -> bool:
+    """
+    Tells whether another provider may succeed where one failed.
+
+    Transient failures and open circuits fail over. Permanent errors, like a malformed request, would fail
+    on every provider, and a passed session deadline leaves no time for another one.
+
+    Args:
+        error (BaseException): The error raised by the provider's client.
+
+    Returns:
+        True if the call should be tried on the next provider.
+    """
+    if isinstance(error, DeadlineExceededError):
+        return False
+    return isinstance(error, CircuitOpenError) or is_retryable(error)
+
+
+@dataclass
+class CallSample:
+    """One model call as seen by the router."""
+    latency: float
+    ok: bool
+    completion_tokens: int = 0
+
+
+class ProviderStats:
+    """Rolling latency, error rate and token throughput of one provider over its last `window` calls."""
+
+    def __init__(self, window: int = 50):
+        """
+        Args:
+            window (int): The number of recent calls to keep.
+        """
+        self.samples: Deque[CallSample] = deque(maxlen=window)
+
+    def record(self, latency: float, ok: bool, completion_tokens: int = 0) -> None:
+        """Adds a call to the window."""
+        self.samples.append(CallSample(latency, ok, completion_tokens))
+
+    @property
+    def calls(self) -> int:
+        """The number of calls in the window."""
+        return len(self.samples)
+
+    @property
+    def error_rate(self) -> float:
+        """The fraction of failed calls in the window, or 0.0 without samples."""
+        if not self.samples:
+            return 0.0
+        return sum(1 for sample in self.samples if not sample.ok) / len(self.samples)
+
+    @property
+    def mean_latency(self) -> Optional[float]:
+        """The mean latency of successful calls in seconds, or None if there are none."""
+        latencies = [sample.latency for sample in self.samples if sample.ok]
+        return sum(latencies) / len(latencies) if latencies else None
+
+    @property
+    def tokens_per_second(self) -> Optional[float]:
+        """The completion token throughput of successful calls, or None if unknown."""
+        ok = [sample for sample in self.samples if sample.ok]
+        total_time = sum(sample.latency for sample in ok)
+        total_tokens = sum(sample.completion_tokens for sample in ok)
+        if not ok or total_time <= 0 or total_tokens == 0:
+            return None
+        return total_tokens / total_time
+
+
+class ModelRouter:
+    """Chooses a provider for each agent from the providers' recent latency and error rate.
+
+    Providers are picked at random, weighted by `(1 - error_rate)^2 / mean_latency`, so a slow or failing
+    provider still gets the occasional call and can recover. Providers without samples get the best known
+    score, so new providers are tried.
+    """
+
+    def __init__(self, window: int = 50, timeout: Optional[float] = None):
+        """
+        Args:
+            window (int): The number of recent calls kept per provider.
+            timeout (Optional[float]): Seconds before a call is abandoned and counted as a failure. None leaves
+                                       timeouts to the clients; AgentsFactory's resilient clients time out and
+                                       retry each attempt themselves.
+        """
+        self.window = window
+        self.timeout = timeout
+        self.stats: Dict[str, ProviderStats] = {}
+
+    def record(self, provider: str, latency: float, ok: bool, completion_tokens: int = 0) -> None:
+        """Records the outcome of a call to a provider."""
+        self.stats.setdefault(provider, ProviderStats(self.window)).record(latency, ok, completion_tokens)
+
+    def score(self, provider: str) -> Optional[float]:
+        """
+        Scores a provider; higher is better.
+
+        Returns:
+            The score, or None if the provider has no samples yet.
+        """
+        stats = self.stats.get(provider)
+        if stats is None or stats.calls == 0:
+            return None
+        health = (1.0 - stats.error_rate) ** 2
+        latency = stats.mean_latency
+        if latency is None:
+            # Every call in the window failed; keep a small chance so the provider can recover.
+            return 0.01
+        return max(health / max(latency, 0.001), 0.01)
+
+    def _weights(self, providers: Sequence[str]) -> List[float]:
+        scores = [self.score(provider) for provider in providers]
+        known = [score for score in scores if score is not None]
+        default = max(known) if known else 1.0
+        return [default if score is None else score for score in scores]
+
+    def rank(self, providers: Sequence[str]) -> List[str]:
+        """
+        Orders providers for an agent: a weighted random pick first, then the rest best score first.
+
+        Args:
+            providers (Sequence[str]): The available providers.
+
+        Returns:
+            The providers in the order they should be tried.
+        """
+        if not providers:
+            return []
+        weights = self._weights(providers)
+        primary = random.choices(list(providers), weights=weights)[0]
+        fallbacks = sorted(
+            (provider for provider in providers if provider != primary),
+            key=lambda provider: weights[list(providers).index(provider)],
+            reverse=True,
+        )
+        return [primary] + fallbacks
+
+    def route(
+        self,
+        client_provider: Callable[[str], Optional[ChatCompletionClient]],
+        providers: Sequence[str] = ROUTED_PROVIDERS,
+    ) -> Optional["RoutedChatCompletionClient"]:
+        """
+        Builds a client that calls the chosen provider and fails over to the others.
+
+        Args:
+            client_provider (Callable[[str], Optional[ChatCompletionClient]]): Returns a client for a provider name.
+            providers (Sequence[str]): The providers to route between. Unconfigured ones are left out.
+
+        Returns:
+            The routed client, or None if no provider is configured.
+        """
+        clients = {provider: client_provider(provider) for provider in providers}
+        available = [provider for provider, client in clients.items() if client is not None]
+        if not available:
+            return None
+        ordered: List[Tuple[str, ChatCompletionClient]] = [
+            (provider, clients[provider]) for provider in self.rank(available)  # type: ignore
+        ]
+        return RoutedChatCompletionClient(self, ordered)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Returns the current statistics of every provider, for reporting."""
+        return {
+            provider: {
+                "calls": stats.calls,
+                "error_rate": stats.error_rate,
+                "mean_latency": stats.mean_latency,
+                "tokens_per_second": stats.tokens_per_second,
+                "score": self.score(provider),
+            }
+            for provider, stats in self.stats.items()
+        }
+
+
+class RoutedChatCompletionClient(DelegatingChatCompletionClient):
+    """A model client that tries providers in order, failing over on transient errors, timeouts and open circuits.
+
+    Every attempt is reported to the router, which uses it for the next routing decisions.
+    """
+
+    def __init__(self, router: ModelRouter, clients: Sequence[Tuple[str, ChatCompletionClient]]):
+        """
+        Args:
+            router (ModelRouter): The router to report calls to.
+            clients (Sequence[Tuple[str, ChatCompletionClient]]): (provider, client) pairs in the order to try them.
+
+        Raises:
+            ValueError: If no client is given.
+        """
+        if not clients:
+            raise ValueError("RoutedChatCompletionClient needs at least one client")
+        super().__init__(clients[0][1])
+        self.router = router
+        self.clients = list(clients)
+
+    @property
+    def provider(self) -> str:
+        """The preferred provider."""
+        return self.clients[0][0]
+
+    async def close(self) -> None:
+        # The clients are shared through the AgentsFactory pool, which closes them.
+        pass
+
+    async def create(self, messages: Sequence[LLMMessage], **kwargs: Any) -> CreateResult:  # type: ignore[override]
+        last_error: Optional[BaseException] = None
+        for provider, client in self.clients:
+            start = time.perf_counter()
+            try:
+                result = await asyncio.wait_for(client.create(messages, **kwargs), timeout=self.router.timeout)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.router.record(provider, time.perf_counter() - start, ok=False)
+                if not should_fail_over(e):
+                    raise
+                logger.warning("Provider '%s' failed (%s: %s), failing over.", provider, type(e).__name__, e)
+                last_error = e
+                continue
+            self.router.record(provider, time.perf_counter() - start, ok=True, completion_tokens=result.usage.completion_tokens)
+            return result
+        assert last_error is not None
+        raise last_error
+
+    async def create_stream(  # type: ignore[override]
+        self, messages: Sequence[LLMMessage], **kwargs: Any
+    ) -> AsyncGenerator[Union[str, CreateResult], None]:
+        last_error: Optional[BaseException] = None
+        for provider, client in self.clients:
+            start = time.perf_counter()
+            started = False
+            try:
+                async for chunk in client.create_stream(messages, **kwargs):
+                    started = True
+                    if isinstance(chunk, CreateResult):
+                        self.router.record(provider, time.perf_counter() - start, ok=True,
+                                           completion_tokens=chunk.usage.completion_tokens)
+                    yield chunk
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.router.record(provider, time.perf_counter() - start, ok=False)
+                if started or not should_fail_over(e):
+                    # Part of the answer was already yielded, or no other provider would do better.
+                    raise
+                logger.warning("Provider '%s' failed (%s: %s), failing over.", provider, type(e).__name__, e)
+                last_error = e
+        assert last_error is not None
+        raise last_error
@@ -0,0 +1,538 @@
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Union
+
+from autogen_agentchat.agents import AssistantAgent
+from autogen_agentchat.base import TaskResult, TerminationCondition
+from autogen_agentchat.conditions import MaxMessageTermination
+from autogen_agentchat.messages import BaseAgentEvent, BaseChatMessage, MessageFactory
+from autogen_agentchat.teams import SelectorGroupChat
+from autogen_core import CancellationToken
+from autogen_core.models import ChatCompletionClient
+from autogen_core.tools import Tool
+
+from context_policy import ContextPolicy
+from metrics import registry
+from personas_util import PersonasUtil
+from prompt_layout import build_selector_prompt
+from resilience import deadline_scope
+from script_writer import ScriptWriter, format_turn
+from session_store import COMPLETED, FAILED, SessionRecord, SessionStore, persona_set_key
+from speaker_selection import (
+    SELECTION_MODES,
+    Participant,
+    SelectionStats,
+    SelectionStatsChatCompletionClient,
+    create_speaker_selector,
+)
+from speculation import SpeculationStats, SpeculativePrefetcher
+from tool_registry import ToolRegistry
+from transcript import TranscriptStore
+from tracing import TracingChatCompletionClient, TurnTracer, tracer
+from token_budget import SessionUsage, TokenBudgetTermination, UsageTrackingChatCompletionClient
+from translation import TranslationPipeline, TranslationStats
+
+# A callable that returns a model client for a provider name ('grok', 'azure', 'openai', 'auto'), or None.
+ClientProvider = Callable[[str], Optional[ChatCompletionClient]]
+
+
+@dataclass
+class SessionResult:
+    """How a parliament session went. Its messages are not kept: they went to the script, transcript and store."""
+    message_count: int  # The chat messages of the session, the task included.
+    turns: int  # The members' messages.
+    stop_reason: Optional[str]
+
+
+def session_task(topic: str) -> str:
+    """The task message a session on a topic starts with."""
+    return f"You are discussing today's topic: {topic}."
+
+
+def build_parliament_agents(
+    parliament_members: Dict[str, Dict[str, Any]],
+    client_provider: ClientProvider,
+    client_type: str = "auto",
+    usage: Optional[SessionUsage] = None,
+    context_policy: Optional[ContextPolicy] = None,
+    tools: Optional[Sequence[Tool]] = None,
+    prefetcher: Optional[SpeculativePrefetcher] = None,
+    member_client_types: Optional[Mapping[str, str]] = None,
+    cancellation_token: Optional[CancellationToken] = None,
+) -> List[AssistantAgent]:
+    """
+    Creates an AssistantAgent for each parliament member.
+
+    Args:
+        parliament_members (Dict[str, Dict[str, Any]]): The member personas, as returned by PersonasUtil.
+        client_provider (ClientProvider): Returns a model client for a provider name.
+        client_type (str): The client type requested for each member. The default, 'auto', lets the
+                           factory's router pick a healthy provider per member.
+        usage (Optional[SessionUsage]): The session accounting to report each member's calls to.
+        context_policy (Optional[ContextPolicy]): How much history each member sends. None sends all of it.
+        tools (Optional[Sequence[Tool]]): The tools each member can call, e.g. from ToolRegistry.create_tools().
+                                          Members whose model does not support function calling get none.
+        prefetcher (Optional[SpeculativePrefetcher]): Starts the members' turns while the selector is choosing.
+        member_client_types (Optional[Mapping[str, str]]): Client types by member name that replace
+                                                           `client_type` for those members.
+        cancellation_token (Optional[CancellationToken]): The session's token, which also cancels the summary
+                                                          calls of the members' contexts.
+
+    Returns:
+        The list of created agents. Members whose client could not be created are skipped.
+    """
+    parliament_agents: List[AssistantAgent] = []
+    for parliament_member in parliament_members.values():
+        name = parliament_member.get('name', 'Agent')
+        member_client_type = (member_client_types or {}).get(name, client_type)
+        model_client = client_provider(member_client_type)
+        if model_client is None:
+            print(f"Warning: Could not create client '{member_client_type}', skipping agent creation")
+            continue
+        if usage is not None:
+            # Routed clients expose the provider they prefer; a concrete client type names it directly.
+            provider = "" if member_client_type == "auto" else member_client_type
+            model_client = UsageTrackingChatCompletionClient(model_client, usage, name, provider)
+        member_tools = list(tools) if tools and model_client.model_info["function_calling"] else None
+        # Summaries are not turns, so the context calls the client before the prefetcher can take them for one.
+        model_context = context_policy.create(model_client, cancellation_token) if context_policy is not None else None
+        if prefetcher is not None:
+            model_client = prefetcher.wrap_client(model_client, name)
+
+        agent = AssistantAgent(
+            name=name,
+            model_client=model_client,
+            system_message=parliament_member.get('instructions', 'You are a helpful assistant.'),
+            description=parliament_member.get('description', ''),
+            model_context=model_context,
+            tools=member_tools,
+            # The member speaks after its tool calls, so the script gets a turn rather than the raw results.
+            reflect_on_tool_use=bool(member_tools),
+        )
+        if prefetcher is not None:
+            prefetcher.add_member(agent, Participant(
+                name, parliament_member.get('description', ''), parliament_member.get('instructions', '')
+            ))
+        parliament_agents.append(agent)
+    return parliament_agents
+
+
+def build_groupchat(
+    topic: str,
+    personas_util: PersonasUtil,
+    client_provider: ClientProvider,
+    max_messages: int = 5,
+    usage: Optional[SessionUsage] = None,
+    max_total_tokens: Optional[int] = None,
+    max_cost: Optional[float] = None,
+    context_policy: Optional[ContextPolicy] = None,
+    speaker_selection: str = 'llm',
+    selection_stats: Optional[SelectionStats] = None,
+    max_turns: Optional[int] = None,
+    tool_registry: Optional[ToolRegistry] = None,
+    prefetcher: Optional[SpeculativePrefetcher] = None,
+    member_client_types: Optional[Mapping[str, str]] = None,
+    cancellation_token: Optional[CancellationToken] = None,
+) -> Optional[SelectorGroupChat]:
+    """
+    Builds the parliament SelectorGroupChat for a topic, moderated by the scripter persona.
+
+    Args:
+        topic (str): The topic to discuss.
+        personas_util (PersonasUtil): The loaded personas.
+        client_provider (ClientProvider): Returns a model client for a provider name.
+        max_messages (int): The number of messages after which the discussion ends.
+        usage (Optional[SessionUsage]): The session accounting for the members and the selector.
+        max_total_tokens (Optional[int]): Ends the discussion once the session used this many tokens.
+        max_cost (Optional[float]): Ends the discussion once the session cost this many USD.
+        context_policy (Optional[ContextPolicy]): How much history the members and the selector send.
+                                                  None sends all of it.
+        speaker_selection (str): One of SELECTION_MODES. Modes other than 'llm' pick some or all speakers
+                                 without calling the selector model.
+        selection_stats (Optional[SelectionStats]): Where to record the picks and the selector model calls.
+        max_turns (Optional[int]): Speaker turns after which each run of the team returns. The team can be
+                                   run again to continue.
+        tool_registry (Optional[ToolRegistry]): The tools the members can call. The members share one
+                                                memoisation cache, so they don't repeat each other's lookups.
+        prefetcher (Optional[SpeculativePrefetcher]): Starts the likely next speakers' turns whenever the
+                                                      selector model is called.
+        member_client_types (Optional[Mapping[str, str]]): The client type of each member by name. Members not
+                                                           in it get an 'auto' client.
+        cancellation_token (Optional[CancellationToken]): The session's token, which also cancels the summary
+                                                          calls of the members' and the selector's contexts.
+
+    Returns:
+        The group chat, or None if the Azure client for the selector could not be created.
+
+    Raises:
+        ValueError: If a budget is given without a SessionUsage to track it, or the selection mode is unknown.
+    """
+    if (max_total_tokens is not None or max_cost is not None) and usage is None:
+        raise ValueError("A token or cost budget needs a SessionUsage")
+    if speaker_selection not in SELECTION_MODES:
+        raise ValueError(f"Unknown speaker selection mode: {speaker_selection}. Expected one of {SELECTION_MODES}")
+    parliament_members = personas_util.get_parliament_members()
+    tools = tool_registry.create_tools() if tool_registry else None
+    parliament_agents = build_parliament_agents(
+        parliament_members, client_provider, usage=usage, context_policy=context_policy, tools=tools,
+        prefetcher=prefetcher, member_client_types=member_client_types, cancellation_token=cancellation_token,
+    )
+
+    scripter = personas_util.get_persona('scripter')
+    selector_prompt = build_selector_prompt(scripter.get('instructions', 'You are moderating the discussion.'), topic)
+    scripter_description = scripter.get('description', 'A skilled moderator.')
+
+    groupchat_model_client = client_provider("azure")
+    if groupchat_model_client is None:
+        print("Error: Could not create Azure client for group chat management")
+        return None
+    if usage is not None:
+        groupchat_model_client = UsageTrackingChatCompletionClient(groupchat_model_client, usage, "selector", "azure")
+    # The selector's summaries are counted in the usage, but not as selector decisions.
+    model_context = (
+        context_policy.create(groupchat_model_client, cancellation_token) if context_policy is not None else None
+    )
+    # Without stats of its own the wrapper still reports the selector's decision times to the metrics.
+    groupchat_model_client = SelectionStatsChatCompletionClient(groupchat_model_client, selection_stats or SelectionStats())
+    groupchat_model_client = TracingChatCompletionClient(
+        groupchat_model_client, "parliament.selector_decision", {"parliament.topic": topic}
+    )
+
+    agent_names = {agent.name for agent in parliament_agents}
+    participants = [
+        Participant(member.get('name', 'Agent'), member.get('description', ''), member.get('instructions', ''))
+        for member in parliament_members.values()
+        if member.get('name', 'Agent') in agent_names
+    ]
+    selector_func = create_speaker_selector(
+        speaker_selection, participants, selection_stats, groupchat_model_client, selector_prompt
+    )
+    if prefetcher is not None:
+        selector_func = prefetcher.wrap_selector(selector_func)
+
+    termination_condition: TerminationCondition = MaxMessageTermination(max_messages=max_messages)
+    if usage is not None and (max_total_tokens is not None or max_cost is not None):
+        termination_condition = termination_condition | TokenBudgetTermination(usage, max_total_tokens, max_cost)
+
+    return SelectorGroupChat(
+        name="ParliamentChat",
+        participants=parliament_agents,  # type: ignore
+        model_client=groupchat_model_client,  # Using Azure for group chat management
+        termination_condition=termination_condition,
+        max_turns=max_turns,
+        allow_repeated_speaker=True,
+        selector_prompt=selector_prompt,
+        selector_func=selector_func,
+        description=scripter_description,
+        model_context=model_context,
+    )
+
+
+def format_script(messages: Sequence[Any]) -> str:
+    """
+    Renders the messages of a finished session as a "source: content" script.
+
+    Args:
+        messages (Sequence[Any]): The messages of the session's TaskResult.
+
+    Returns:
+        The script text. User and non-text messages are left out.
+    """
+    return "".join(line for line in map(format_turn, messages) if line is not None)
+
+
+def build_translation_pipeline(
+    personas_util: PersonasUtil,
+    client_provider: ClientProvider,
+    output_path: str,
+    client_type: str = "auto",
+    usage: Optional[SessionUsage] = None,
+    stats: Optional[TranslationStats] = None,
+    cancellation_token: Optional[CancellationToken] = None,
+) -> Optional[TranslationPipeline]:
+    """
+    Creates the translation stage for a session from the translator persona.
+
+    Args:
+        personas_util (PersonasUtil): The loaded personas.
+        client_provider (ClientProvider): Returns a model client for a provider name.
+        output_path (str): The translated script file.
+        client_type (str): The client type requested for the translator.
+        usage (Optional[SessionUsage]): The session accounting to report the translator's calls to.
+        stats (Optional[TranslationStats]): Where to record the translation's chunks, tokens and timings.
+        cancellation_token (Optional[CancellationToken]): The session's token.
+
+    Returns:
+        The pipeline, not yet started, or None if there is no translator persona or client.
+    """
+    translator = personas_util.get_translator()
+    if not translator:
+        print("Warning: No translator persona configured, skipping translation")
+        return None
+    model_client = client_provider(client_type)
+    if model_client is None:
+        print(f"Warning: Could not create client '{client_type}', skipping translation")
+        return None
+    if usage is not None:
+        provider = "" if client_type == "auto" else client_type
+        model_client = UsageTrackingChatCompletionClient(model_client, usage, translator.get('name', 'Translator'), provider)
+    return TranslationPipeline(
+        model_client,
+        translator.get('instructions', 'You are a professional translator.'),
+        output_path,
+        stats=stats,
+        cancellation_token=cancellation_token,
+    )
+
+
+async def run_parliament_session(
+    topic: str,
+    personas_util: PersonasUtil,
+    client_provider: ClientProvider,
+    output_path: Optional[str] = "pub_script.txt",
+    max_messages: int = 5,
+    cancellation_token: Optional[CancellationToken] = None,
+    jsonl_path: Optional[str] = None,
+    echo: bool = False,
+    usage: Optional[SessionUsage] = None,
+    max_total_tokens: Optional[int] = None,
+    max_cost: Optional[float] = None,
+    context_policy: Optional[ContextPolicy] = None,
+    speaker_selection: str = 'llm',
+    selection_stats: Optional[SelectionStats] = None,
+    deadline_seconds: Optional[float] = None,
+    session_store: Optional[SessionStore] = None,
+    resume: bool = True,
+    translation_path: Optional[str] = None,
+    translation_stats: Optional[TranslationStats] = None,
+    tool_registry: Optional[ToolRegistry] = None,
+    speculate: int = 0,
+    speculation_stats: Optional[SpeculationStats] = None,
+    transcript_store: Optional[TranscriptStore] = None,
+    member_client_types: Optional[Mapping[str, str]] = None,
+) -> Optional[SessionResult]:
+    """
+    Runs one parliament session on a topic, streaming each turn to the script file as it arrives.
+
+    Args:
+        topic (str): The topic to discuss.
+        personas_util (PersonasUtil): The loaded personas.
+        client_provider (ClientProvider): Returns a model client for a provider name.
+        output_path (Optional[str]): Where to write the script. None skips writing.
+        max_messages (int): The number of messages after which the discussion ends.
+        cancellation_token (Optional[CancellationToken]): Token to cancel the session.
+        jsonl_path (Optional[str]): Where to also write one JSON record per turn. None skips it.
+        echo (bool): Whether to print each written turn to the console as it arrives.
+        usage (Optional[SessionUsage]): The session accounting for the members and the selector.
+        max_total_tokens (Optional[int]): Ends the discussion once the session used this many tokens.
+        max_cost (Optional[float]): Ends the discussion once the session cost this many USD.
+        context_policy (Optional[ContextPolicy]): How much history the members and the selector send.
+        speaker_selection (str): One of SELECTION_MODES.
+        selection_stats (Optional[SelectionStats]): Where to record the speaker picks and selector calls.
+        deadline_seconds (Optional[float]): The time the session may take. Model calls shorten their timeouts
+                                            and stop retrying to meet it, and the cancellation token is
+                                            cancelled when it passes.
+        session_store (Optional[SessionStore]): Where to checkpoint the session after every turn. The team
+                                                then runs one turn at a time, so each checkpoint is taken
+                                                while it is idle. None runs without checkpoints.
+        resume (bool): Whether to continue the last unfinished session on the same topic with the same
+                       members, if the store has one that nobody else is running, instead of starting over.
+                       The script is rewritten from the start; the translated script is appended to, and the
+                       transcript only holds the turns of this run.
+        translation_path (Optional[str]): Where to write the script translated by the translator persona.
+                                          Turns are translated while the debate runs. None skips translation.
+        translation_stats (Optional[TranslationStats]): Where to record the translation's chunks and timings.
+        tool_registry (Optional[ToolRegistry]): The tools the members can call, memoised for the session.
+        speculate (int): How many of the likely next speakers start their turn while the selector model is
+                         choosing. The chosen one's turn is used if it was among them, the others are cancelled.
+                         0 turns speculation off.
+        speculation_stats (Optional[SpeculationStats]): Where to record the used and the wasted turns.
+        transcript_store (Optional[TranscriptStore]): Where to keep the session's structured transcript, with
+                                                      each turn's timing, provider and tokens. None skips it.
+        member_client_types (Optional[Mapping[str, str]]): The client type of each member by name, e.g. the
+                                                           providers a ProviderLeaderboard ranks best.
+
+    Returns:
+        The session's message counts and stop reason, or None if the group chat could not be built. A resumed
+        session's counts include the messages from before it was interrupted.
+    """
+    prefetcher = SpeculativePrefetcher(speculate, speculation_stats) if speculate > 0 else None
+    cancellation_token = cancellation_token or CancellationToken()
+    groupchat = build_groupchat(
+        topic,
+        personas_util,
+        client_provider,
+        max_messages=max_messages,
+        usage=usage,
+        max_total_tokens=max_total_tokens,
+        max_cost=max_cost,
+        context_policy=context_policy,
+        speaker_selection=speaker_selection,
+        selection_stats=selection_stats,
+        max_turns=1 if session_store is not None else None,
+        tool_registry=tool_registry,
+        prefetcher=prefetcher,
+        member_client_types=member_client_types,
+        cancellation_token=cancellation_token,
+    )
+    if groupchat is None:
+        return None
+
+    persona_set = persona_set_key(
+        member.get('name', 'Agent') for member in personas_util.get_parliament_members().values()
+    )
+    resumed = session_store.claim_resumable(topic, persona_set) if session_store is not None and resume else None
+    writer = ScriptWriter(output_path, jsonl_path=jsonl_path, echo=echo) if output_path is not None else None
+    translation = None
+    if translation_path is not None:
+        translation = build_translation_pipeline(
+            personas_util, client_provider, translation_path,
+            usage=usage, stats=translation_stats, cancellation_token=cancellation_token,
+        )
+    transcript = None
+    if transcript_store is not None:
+        # The provider a member's calls went to is only known once it has made one.
+        transcript = transcript_store.start(
+            topic,
+            [member.get('name', 'Agent') for member in personas_util.get_parliament_members().values()],
+            provider_of=lambda speaker: usage.agents[speaker].provider if usage and speaker in usage.agents else "",
+        )
+    turn_tracer = TurnTracer(topic)
+    result: Optional[SessionResult] = None
+    if writer is not None:
+        writer.open()
+    if translation is not None:
+        translation.start(append=resumed is not None)
+    task = session_task(topic)
+
+    def emit(item: Union[BaseAgentEvent, BaseChatMessage]) -> None:
+        if writer is not None:
+            writer.write(item)
+        if translation is not None:
+            translation.submit(item)
+        if transcript is not None:
+            transcript.write(item)
+
+    def on_item(item: Union[BaseAgentEvent, BaseChatMessage]) -> None:
+        turn_tracer.record(item)
+        if isinstance(item, BaseChatMessage) and item.source != "user":
+            registry.inc("parliament_turns_total")
+        emit(item)
+
+    registry.add("parliament_sessions_in_flight", 1)
+    status = FAILED
+    try:
+        with deadline_scope(deadline_seconds, cancellation_token), \
+                tracer.start_as_current_span("parliament.session", attributes={"parliament.topic": topic}) as span:
+            if session_store is None:
+                result = SessionResult(message_count=0, turns=0, stop_reason=None)
+                async for item in groupchat.run_stream(task=task, cancellation_token=cancellation_token):
+                    if isinstance(item, TaskResult):
+                        result.stop_reason = item.stop_reason
+                        continue
+                    if isinstance(item, BaseChatMessage):
+                        result.message_count += 1
+                        if item.source != "user":
+                            result.turns += 1
+                    on_item(item)
+            else:
+                budget = None
+                if usage is not None and (max_total_tokens is not None or max_cost is not None):
+                    budget = TokenBudgetTermination(usage, max_total_tokens, max_cost)
+                result = await _run_checkpointed(
+                    groupchat, session_store, resumed, topic, persona_set, task, max_messages,
+                    cancellation_token, on_item, writer.write if writer is not None else None, usage, budget,
+                )
+            span.set_attribute("parliament.turns", turn_tracer.turn)
+            if translation is not None:
+                await translation.finish()
+        status = COMPLETED
+    finally:
+        registry.add("parliament_sessions_in_flight", -1)
+        registry.inc("parliament_sessions_total", status=status)
+        if writer is not None:
+            writer.close()
+        if transcript is not None:
+            transcript.close(status)
+        if translation is not None:
+            await translation.cancel()
+        if prefetcher is not None:
+            await prefetcher.close()
+    return result
+
+
+async def _run_checkpointed(
+    groupchat: SelectorGroupChat,
+    session_store: SessionStore,
+    resumed: Optional[SessionRecord],
+    topic: str,
+    persona_set: str,
+    task: str,
+    max_messages: int,
+    cancellation_token: CancellationToken,
+    on_item: Callable[[Union[BaseAgentEvent, BaseChatMessage]], None],
+    replay: Optional[Callable[[Union[BaseAgentEvent, BaseChatMessage]], None]],
+    usage: Optional[SessionUsage],
+    budget: Optional[TokenBudgetTermination],
+) -> SessionResult:
+    """Runs the team one turn at a time, checkpointing the turn's messages, the team state and usage after each.
+
+    A resumed session (claimed by the caller) continues from its last checkpoint: its usage is added to
+    `usage`, so budgets count what it spent before, and its messages are passed to `replay`.
+    """
+    # The team's termination conditions are reset after every one-turn run, so the message limit and the
+    # budget are checked here.
+    result = SessionResult(message_count=0, turns=0, stop_reason=None)
+    next_task: Optional[str] = task
+    if resumed is not None:
+        session_id = resumed.session_id
+        await groupchat.load_state(session_store.load_state(session_id) or {})
+        if usage is not None:
+            usage.load(session_store.load_usage(session_id) or {})
+        factory = MessageFactory()
+        for data in session_store.get_messages(session_id):
+            message = factory.create(data)
+            if isinstance(message, BaseChatMessage):
+                result.message_count += 1
+                if message.source != "user":
+                    result.turns += 1
+            if replay is not None:
+                replay(message)
+        next_task = None
+        print(f"Resuming session {session_id} on '{topic}' after {resumed.message_count} messages.")
+    else:
+        session_id = session_store.start_session(topic, persona_set, max_messages)
+
+    try:
+        while result.message_count < max_messages:
+            step: List[Union[BaseAgentEvent, BaseChatMessage]] = []
+            turns = 0
+            async for item in groupchat.run_stream(task=next_task, cancellation_token=cancellation_token):
+                if isinstance(item, TaskResult):
+                    result.stop_reason = item.stop_reason
+                    continue
+                step.append(item)
+                on_item(item)
+                if isinstance(item, BaseChatMessage):
+                    result.message_count += 1
+                    if item.source != "user":
+                        turns += 1
+            next_task = None
+            result.turns += turns
+            session_store.checkpoint(
+                session_id,
+                [message.dump() for message in step],
+                await groupchat.save_state(),
+                usage.dump() if usage is not None else None,
+            )
+            if turns == 0 or (budget is not None and budget.over_budget()):
+                # A termination condition ended the run before anyone spoke, or the budget is spent.
+                break
+        else:
+            result.stop_reason = (
+                f"Maximum number of messages {max_messages} reached, current message count: {result.message_count}"
+            )
+    except BaseException as e:
+        session_store.finish(session_id, FAILED, repr(e))
+        raise
+    session_store.finish(session_id, COMPLETED, result.stop_reason)
+    return result
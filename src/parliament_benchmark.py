@@ -0,0 +1,297 @@
+import argparse
+import asyncio
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+import toml
+from autogen_agentchat.base import TaskResult
+from autogen_core.models import ChatCompletionClient
+
+from agents_factory import AgentsFactory
+from parliament import build_groupchat
+from personas_util import PARLIAMENT_MEMBER_NAMES, PersonasUtil
+from speaker_selection import SELECTION_MODES, SelectionStats
+
+BENCHMARK_TOPIC = "the price of beer"
+
+
+@dataclass
+class BenchmarkResult:
+    """The measurements of one (member count, message limit, selection mode) configuration."""
+    members: int
+    max_messages: int
+    selection: str
+    sessions: int
+    seconds: float
+    sessions_per_second: float
+    selector_calls: int
+    selector_tokens: int
+    selector_overhead: float
+    turn_p50_ms: float
+    turn_p95_ms: float
+    turn_p99_ms: float
+    peak_memory_kb: float
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """
+    Computes a nearest-rank percentile.
+
+    Args:
+        values (Sequence[float]): The samples.
+        pct (float): The percentile, between 0 and 100.
+
+    Returns:
+        The percentile, or 0.0 if there are no samples.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def write_member_config(config_path: str, member_count: int, path: str) -> None:
+    """
+    Writes a copy of a personas file that keeps only the first `member_count` parliament members.
+
+    Args:
+        config_path (str): The full personas TOML file.
+        member_count (int): The number of members to keep, between 2 (the group chat minimum) and the
+                            number of members.
+        path (str): Where to write the copy.
+
+    Raises:
+        ValueError: If member_count is out of range.
+    """
+    if not 2 <= member_count <= len(PARLIAMENT_MEMBER_NAMES):
+        raise ValueError(f"member_count must be between 2 and {len(PARLIAMENT_MEMBER_NAMES)}, got {member_count}")
+    with open(config_path, 'r', encoding='utf-8') as f:
+        personas = toml.load(f)
+    for name in PARLIAMENT_MEMBER_NAMES[member_count:]:
+        personas.pop(name, None)
+    with open(path, 'w', encoding='utf-8') as f:
+        toml.dump(personas, f)
+
+
+async def _run_session(
+    personas_util: PersonasUtil, max_messages: int, selection: str, mock_settings: Dict[str, str]
+) -> Dict[str, Any]:
+    """Runs one offline session and returns its duration, turn latencies and selection stats."""
+    # A factory per session gives each session its own seeded mock client, so sessions stay
+    # deterministic however they are interleaved.
+    factory = AgentsFactory(mock_settings=mock_settings)
+    stats = SelectionStats()
+
+    def client_provider(client_type: str) -> Optional[ChatCompletionClient]:
+        return factory.get_client("mock")
+
+    groupchat = build_groupchat(
+        BENCHMARK_TOPIC,
+        personas_util,
+        client_provider,
+        max_messages=max_messages,
+        speaker_selection=selection,
+        selection_stats=stats,
+    )
+    assert groupchat is not None
+    turns: List[float] = []
+    start = last = time.perf_counter()
+    try:
+        async for item in groupchat.run_stream(task=f"You are discussing today's topic: {BENCHMARK_TOPIC}."):
+            if isinstance(item, TaskResult) or getattr(item, 'source', 'user') == 'user':
+                continue
+            now = time.perf_counter()
+            turns.append(now - last)
+            last = now
+    finally:
+        await factory.close()
+    return {"seconds": time.perf_counter() - start, "turns": turns, "selection": stats}
+
+
+async def run_benchmark(
+    config_path: str,
+    member_count: int,
+    max_messages: int,
+    selection: str = 'llm',
+    sessions: int = 10,
+    concurrency: int = 4,
+    latency_ms: float = 0.0,
+    completion_tokens: int = 40,
+    seed: int = 0,
+) -> BenchmarkResult:
+    """
+    Runs offline sessions against mock clients and measures them.
+
+    Args:
+        config_path (str): The personas TOML file.
+        member_count (int): How many parliament members take part.
+        max_messages (int): The message limit of each session.
+        selection (str): The speaker selection mode, one of SELECTION_MODES.
+        sessions (int): The number of timed sessions.
+        concurrency (int): The number of sessions run at once.
+        latency_ms (float): The simulated latency of every model call.
+        completion_tokens (int): The length of every mock completion.
+        seed (int): The mock clients' seed.
+
+    Returns:
+        The throughput, selector calls and overhead, turn latency percentiles and the peak memory of one session.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        member_config = os.path.join(tmp, 'config.toml')
+        write_member_config(config_path, member_count, member_config)
+        personas_util = PersonasUtil(config_path=member_config, auto_reload=False)
+        mock_settings = {
+            "latency_ms": str(latency_ms),
+            "completion_tokens": str(completion_tokens),
+            "seed": str(seed),
+            # Synthetic completions only name members that take part, so the selector always finds one.
+            "speakers": ",".join(member['name'] for member in personas_util.get_parliament_members().values()),
+        }
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def bounded() -> Dict[str, Any]:
+            async with semaphore:
+                return await _run_session(personas_util, max_messages, selection, mock_settings)
+
+        start = time.perf_counter()
+        runs = await asyncio.gather(*(bounded() for _ in range(sessions)))
+        elapsed = time.perf_counter() - start
+
+        # Memory is measured on a separate session, as tracemalloc slows down the timed ones.
+        tracemalloc.start()
+        try:
+            await _run_session(personas_util, max_messages, selection, mock_settings)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    turns_ms = [turn * 1000 for run in runs for turn in run["turns"]]
+    session_seconds = sum(run["seconds"] for run in runs)
+    selector_seconds = sum(run["selection"].llm_seconds + run["selection"].heuristic_seconds for run in runs)
+    return BenchmarkResult(
+        members=member_count,
+        max_messages=max_messages,
+        selection=selection,
+        sessions=sessions,
+        seconds=elapsed,
+        sessions_per_second=sessions / elapsed if elapsed > 0 else 0.0,
+        selector_calls=sum(run["selection"].llm_calls for run in runs),
+        selector_tokens=sum(run["selection"].llm_tokens for run in runs),
+        selector_overhead=selector_seconds / session_seconds if session_seconds > 0 else 0.0,
+        turn_p50_ms=percentile(turns_ms, 50),
+        turn_p95_ms=percentile(turns_ms, 95),
+        turn_p99_ms=percentile(turns_ms, 99),
+        peak_memory_kb=peak / 1024,
+    )
+
+
+def find_regressions(
+    results: Sequence[BenchmarkResult], baseline: Sequence[Dict[str, Any]], tolerance: float = 0.3
+) -> List[str]:
+    """
+    Compares results with a saved baseline of the same configurations.
+
+    Args:
+        results (Sequence[BenchmarkResult]): The new measurements.
+        baseline (Sequence[Dict[str, Any]]): Earlier results, as written by --output.
+        tolerance (float): The allowed relative drop in throughput or growth in memory.
+
+    Returns:
+        A description of each regression. Configurations missing from the baseline are not compared.
+    """
+    previous = {
+        (entry["members"], entry["max_messages"], entry.get("selection", 'llm')): entry for entry in baseline
+    }
+    regressions: List[str] = []
+    for result in results:
+        entry = previous.get((result.members, result.max_messages, result.selection))
+        if entry is None:
+            continue
+        label = f"{result.members} members / {result.max_messages} messages / {result.selection}"
+        if result.sessions_per_second < entry["sessions_per_second"] * (1 - tolerance):
+            regressions.append(
+                f"{label}: {result.sessions_per_second:.2f} sessions/s, baseline {entry['sessions_per_second']:.2f}"
+            )
+        if result.peak_memory_kb > entry["peak_memory_kb"] * (1 + tolerance):
+            regressions.append(
+                f"{label}: {result.peak_memory_kb:.0f} KiB peak, baseline {entry['peak_memory_kb']:.0f} KiB"
+            )
+    return regressions
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(',') if item.strip()]
+
+
+def _mode_list(value: str) -> List[str]:
+    modes = [item.strip() for item in value.split(',') if item.strip()]
+    for mode in modes:
+        if mode not in SELECTION_MODES:
+            raise argparse.ArgumentTypeError(f"Unknown selection mode: {mode}. Expected one of {SELECTION_MODES}")
+    return modes
+
+
+async def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Prints the benchmark table and returns 1 if a result regressed against the baseline."""
+    parser = argparse.ArgumentParser(description="Benchmark parliament sessions offline against mock model clients.")
+    parser.add_argument('--config', default='src/config.toml', help="Path to the personas TOML file.")
+    parser.add_argument('--members', type=_int_list, default=[2, 5], help="Comma-separated member counts.")
+    parser.add_argument('--max-messages', type=_int_list, default=[5, 10], help="Comma-separated message limits.")
+    parser.add_argument('--selection', type=_mode_list, default=['llm'],
+                        help="Comma-separated speaker selection modes to compare.")
+    parser.add_argument('--sessions', type=int, default=10, help="Timed sessions per configuration.")
+    parser.add_argument('--concurrency', type=int, default=4, help="Sessions run at once.")
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="Simulated latency of every model call.")
+    parser.add_argument('--completion-tokens', type=int, default=40, help="Length of every mock completion.")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the mock clients.")
+    parser.add_argument('--output', default=None, help="Write the results to this JSON file.")
+    parser.add_argument('--baseline', default=None, help="Compare with the results in this JSON file.")
+    parser.add_argument('--tolerance', type=float, default=0.3, help="Allowed relative regression.")
+    args = parser.parse_args(argv)
+
+    results: List[BenchmarkResult] = []
+    print(f"{'members':>7} {'messages':>8} {'selection':>11} {'sess/s':>8} {'sel calls':>9} {'sel tok':>8} "
+          f"{'selector':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'peak KiB':>9}")
+    for member_count in args.members:
+        for max_messages in args.max_messages:
+            for selection in args.selection:
+                result = await run_benchmark(
+                    args.config,
+                    member_count,
+                    max_messages,
+                    selection=selection,
+                    sessions=args.sessions,
+                    concurrency=args.concurrency,
+                    latency_ms=args.latency_ms,
+                    completion_tokens=args.completion_tokens,
+                    seed=args.seed,
+                )
+                results.append(result)
+                print(f"{result.members:>7} {result.max_messages:>8} {result.selection:>11} "
+                      f"{result.sessions_per_second:>8.2f} {result.selector_calls:>9} {result.selector_tokens:>8} "
+                      f"{result.selector_overhead:>8.0%} {result.turn_p50_ms:>8.1f} {result.turn_p95_ms:>8.1f} "
+                      f"{result.turn_p99_ms:>8.1f} {result.peak_memory_kb:>9.0f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump([asdict(result) for result in results], f, indent=2)
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = find_regressions(results, json.load(f), tolerance=args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(asyncio.run(main()))
@@ -1,18 +1,151 @@
+import copy
+import os
+import threading
 import toml
-from typing import Dict, Any
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Tuple
+
+PARLIAMENT_MEMBER_NAMES = ['shauli', 'amatzia', 'karakov', 'hektor', 'avi']
+
+# Fields every persona table must define as non-empty strings.
+REQUIRED_PERSONA_FIELDS = ['name', 'instructions']
+
+
+class PersonaConfigError(ValueError):
+    """Raised when the personas TOML file does not match the expected schema."""
+
+
+@dataclass
+class _LoadedConfig:
+    """A parsed and validated configuration file, with its derived indexes."""
+    signature: Optional[Tuple[int, int]]
+    personas: Dict[str, Any]
+    members: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    members_by_role: Dict[str, Dict[str, Dict[str, Any]]] = field(default_factory=dict)
+
+
+# Parsed configurations shared by every PersonasUtil, keyed by absolute path.
+_cache: Dict[str, _LoadedConfig] = {}
+_cache_lock = threading.Lock()
+
+
+def clear_cache() -> None:
+    """Forgets every parsed configuration, so the next PersonasUtil re-reads its file."""
+    with _cache_lock:
+        _cache.clear()
+
+
+def validate_personas(personas: Dict[str, Any]) -> None:
+    """
+    Checks that every persona the application uses is well formed.
+
+    Args:
+        personas (Dict[str, Any]): The parsed TOML configuration.
+
+    Raises:
+        PersonaConfigError: If a parliament member, the translator or the scripter is not a table,
+                            or is missing a required field.
+    """
+    tables: Dict[str, Any] = {name: personas[name] for name in PARLIAMENT_MEMBER_NAMES + ['translator'] if name in personas}
+    agents = personas.get('agents', {})
+    if not isinstance(agents, dict):
+        raise PersonaConfigError("'agents' must be a table")
+    if 'scripter' in agents:
+        tables['agents.scripter'] = agents['scripter']
+
+    errors: List[str] = []
+    for table_name, persona in tables.items():
+        if not isinstance(persona, dict):
+            errors.append(f"[{table_name}] must be a table")
+            continue
+        for field_name in REQUIRED_PERSONA_FIELDS:
+            value = persona.get(field_name)
+            if not isinstance(value, str) or not value.strip():
+                errors.append(f"[{table_name}] is missing the '{field_name}' string")
+        for field_name in ('role', 'description'):
+            if field_name in persona and not isinstance(persona[field_name], str):
+                errors.append(f"[{table_name}] '{field_name}' must be a string")
+    if errors:
+        raise PersonaConfigError("Invalid personas configuration: " + "; ".join(errors))
+
 
 class PersonasUtil:
-    """A utility class for loading and accessing persona configurations from a TOML file."""
+    """A utility class for loading and accessing persona configurations from a TOML file.
+
+    The file is parsed and validated once per path and shared by every instance, which is why the getters return
+    copies: a caller editing a persona must not change it for everyone else. When `auto_reload` is on,
+    each access compares the file's modification time and size with the cached ones and re-parses only if it changed,
+    so long-running workers pick up persona edits without a restart.
+    """
 
-    def __init__(self, config_path: str = 'src/config.toml'):
+    def __init__(self, config_path: str = 'src/config.toml', auto_reload: bool = True):
         """
         Initializes the PersonasUtil with the path to the configuration file.
 
         Args:
             config_path (str): The path to the TOML configuration file.
+            auto_reload (bool): Whether to reload the file when its modification time or size changes.
+
+        Raises:
+            PersonaConfigError: If the file does not match the expected schema.
         """
         self.config_path = config_path
-        self.personas = self._load_personas()
+        self.auto_reload = auto_reload
+        self._loaded = self._get_loaded(initial=True)
+
+    @property
+    def personas(self) -> Dict[str, Any]:
+        """The parsed configuration, reloaded first if the file changed."""
+        return self._current().personas
+
+    def _signature(self) -> Optional[Tuple[int, int]]:
+        """The file's modification time and size, or None if it cannot be read."""
+        try:
+            stat = os.stat(self.config_path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _current(self) -> _LoadedConfig:
+        if self.auto_reload and self._signature() != self._loaded.signature:
+            self._loaded = self._get_loaded(initial=False)
+        return self._loaded
+
+    def _get_loaded(self, initial: bool) -> _LoadedConfig:
+        """Returns the cached configuration for this path, parsing it if missing or stale."""
+        key = os.path.abspath(self.config_path)
+        signature = self._signature()
+        with _cache_lock:
+            cached = _cache.get(key)
+            if cached is not None and cached.signature == signature:
+                return cached
+            try:
+                loaded = self._build(signature)
+            except PersonaConfigError as e:
+                if initial or cached is None:
+                    raise
+                # Keep serving the last good configuration while the file is being edited.
+                print(f"Error: {e}. Keeping the previously loaded personas.")
+                cached.signature = signature
+                return cached
+            if not loaded.personas and cached is not None and signature is not None:
+                # The file exists but could not be decoded, most likely a half-saved edit.
+                print("Error: Keeping the previously loaded personas.")
+                cached.signature = signature
+                return cached
+            _cache[key] = loaded
+            return loaded
+
+    def _build(self, signature: Optional[Tuple[int, int]]) -> _LoadedConfig:
+        personas = self._load_personas()
+        validate_personas(personas)
+        members: Dict[str, Dict[str, Any]] = {
+            name: personas[name] for name in PARLIAMENT_MEMBER_NAMES if name in personas
+        }
+        members_by_role: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for name, persona in members.items():
+            members_by_role.setdefault(persona.get('role', ''), {})[name] = persona
+        return _LoadedConfig(signature, personas, members, members_by_role)
 
     def _load_personas(self) -> Dict[str, Any]:
         """
@@ -39,44 +172,52 @@ class PersonasUtil:
             name (str): The name of the persona to retrieve.
 
         Returns:
-            A dictionary containing the persona's configuration, or an empty dictionary if not found.
+            A copy of the persona's configuration, or an empty dictionary if not found.
         """
+        personas = self.personas
         # The scripter is nested under 'agents'
         if name.lower() == 'scripter':
-            return self.personas.get('agents', {}).get('scripter', {})
-        return self.personas.get(name.lower(), {})
+            return copy.deepcopy(personas.get('agents', {}).get('scripter', {}))
+        return copy.deepcopy(personas.get(name.lower(), {}))
 
     def get_all_personas(self) -> Dict[str, Any]:
         """
         Retrieves all loaded personas.
 
         Returns:
-            A dictionary containing all persona configurations.
+            A copy of all persona configurations.
         """
-        return self.personas
+        return copy.deepcopy(self.personas)
 
     def get_parliament_members(self) -> Dict[str, Dict[str, Any]]:
         """
         Retrieves only the personas that are members of the parliament.
 
         Returns:
-            A dictionary containing the configurations for Shauli, Amatzia, Karakov, Hektor, and Avi.
+            A copy of the configurations for Shauli, Amatzia, Karakov, Hektor, and Avi.
+        """
+        return copy.deepcopy(self._current().members)
+
+    def get_members_by_role(self, role: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Retrieves the parliament members with a given role.
+
+        Args:
+            role (str): The role, e.g. 'Taxi Driver'. Members without a role are indexed under ''.
+
+        Returns:
+            A copy of each member's configuration by name, empty if no member has the role.
         """
-        members: Dict[str, Dict[str, Any]] = {}
-        member_names = ['shauli', 'amatzia', 'karakov', 'hektor', 'avi']
-        for name in member_names:
-            if name in self.personas:
-                members[name] = self.personas[name]
-        return members
-    
+        return copy.deepcopy(self._current().members_by_role.get(role, {}))
+
     def get_translator(self) -> Dict[str, Any]:
         """
         Retrieves the translator persona.
 
         Returns:
-            A dictionary containing the translator's configuration.
+            A copy of the translator's configuration.
         """
-        return self.personas.get('translator', {})
+        return copy.deepcopy(self.personas.get('translator', {}))
 
 if __name__ == '__main__':
     # Example usage:
@@ -0,0 +1,61 @@
+from typing import List, Tuple
+
+# Providers cache prompts by prefix, so the selector prompt goes from the parts that never change to the parts
+# that change most: the scripter persona and the roles (shared by every session with the same members), the
+# topic (shared by every turn of a session), the history (which only grows), and last the candidates.
+_SELECTOR_LAYOUT = """{persona}
+
+The following roles are available:
+{{roles}}
+
+{topic}
+
+The conversation so far:
+{{history}}
+
+Read the above conversation. Then select the next role from {{participants}} to play. Only return the role.
+"""
+
+
+def _escape(text: str) -> str:
+    """Escapes braces, so text survives the str.format() AutoGen applies to the selector prompt."""
+    return text.replace('{', '{{').replace('}', '}}')
+
+
+def split_topic_lines(instructions: str, topic: str) -> Tuple[str, str]:
+    """
+    Separates persona instructions into the part that is the same for every topic and the part about the topic.
+
+    Lines with the '{0}' topic placeholder are moved, with the topic filled in, to the topic part.
+
+    Args:
+        instructions (str): The persona instructions, with '{0}' where the topic goes.
+        topic (str): The topic.
+
+    Returns:
+        The topic-independent instructions, and the topic lines. Without a placeholder, the topic lines just
+        name the topic.
+    """
+    persona: List[str] = []
+    topic_lines: List[str] = []
+    for line in instructions.strip().splitlines():
+        if '{0}' in line:
+            topic_lines.append(line.replace('{0}', topic).strip())
+        else:
+            persona.append(line.rstrip())
+    return "\n".join(persona).strip(), "\n".join(topic_lines) or f"Today's topic: {topic}."
+
+
+def build_selector_prompt(scripter_instructions: str, topic: str) -> str:
+    """
+    Builds the selector prompt template in a prefix-stable layout.
+
+    Args:
+        scripter_instructions (str): The scripter persona's instructions, with '{0}' where the topic goes.
+        topic (str): The topic.
+
+    Returns:
+        The template, with the {roles}, {history} and {participants} fields SelectorGroupChat fills in.
+    """
+    persona, topic_lines = split_topic_lines(scripter_instructions, topic)
+    return _SELECTOR_LAYOUT.format(persona=_escape(persona), topic=_escape(topic_lines))
@@ -0,0 +1,220 @@
+import argparse
+import asyncio
+import json
+import os
+import re
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+from autogen_core import CancellationToken
+from autogen_core.models import ChatCompletionClient, SystemMessage, UserMessage
+from dotenv import load_dotenv
+
+from agents_factory import AgentsFactory
+from model_router import ROUTED_PROVIDERS
+from parliament import ClientProvider, session_task
+from personas_util import PersonasUtil
+from provider_leaderboard import DEFAULT_LEADERBOARD_PATH, ProviderLeaderboard
+
+_JUDGE_PROMPT = (
+    "Rate from 1 to 10 how well the reply below stays in character as {name} ({description}) and takes part "
+    "in a discussion on '{topic}'. Reply with the number only.\n\nReply:\n{output}"
+)
+
+
+@dataclass
+class EvalResult:
+    """One provider's answer for one persona."""
+    persona: str
+    provider: str
+    round: int
+    latency_seconds: float
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    output: str = ""
+    error: Optional[str] = None
+    score: Optional[float] = None
+
+
+def parse_score(text: str) -> Optional[float]:
+    """
+    Reads a judge's 1 to 10 rating.
+
+    Args:
+        text (str): The judge's reply.
+
+    Returns:
+        The first number in the reply, clamped to 1 to 10, or None if there is none.
+    """
+    match = re.search(r"\d+(?:\.\d+)?", text)
+    if match is None:
+        return None
+    return min(max(float(match.group()), 1.0), 10.0)
+
+
+async def _run_one(
+    client: ChatCompletionClient,
+    persona: Dict[str, Any],
+    provider: str,
+    round_index: int,
+    topic: str,
+    cancellation_token: Optional[CancellationToken],
+) -> EvalResult:
+    name = persona.get('name', 'Agent')
+    messages = [
+        SystemMessage(content=persona.get('instructions', 'You are a helpful assistant.')),
+        UserMessage(content=session_task(topic), source="user"),
+    ]
+    start = time.perf_counter()
+    try:
+        result = await client.create(messages, cancellation_token=cancellation_token)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        return EvalResult(name, provider, round_index, time.perf_counter() - start, error=f"{type(e).__name__}: {e}")
+    return EvalResult(
+        name, provider, round_index, time.perf_counter() - start,
+        prompt_tokens=result.usage.prompt_tokens,
+        completion_tokens=result.usage.completion_tokens,
+        output=result.content if isinstance(result.content, str) else str(result.content),
+    )
+
+
+async def _judge(
+    judge: ChatCompletionClient,
+    persona: Dict[str, Any],
+    result: EvalResult,
+    topic: str,
+    cancellation_token: Optional[CancellationToken],
+) -> None:
+    prompt = _JUDGE_PROMPT.format(
+        name=result.persona, description=persona.get('description', ''), topic=topic, output=result.output
+    )
+    try:
+        reply = await judge.create([UserMessage(content=prompt, source="user")], cancellation_token=cancellation_token)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        print(f"Warning: Could not judge {result.provider}'s answer for {result.persona}: {e}")
+        return
+    result.score = parse_score(reply.content if isinstance(reply.content, str) else str(reply.content))
+
+
+async def evaluate_providers(
+    topic: str,
+    personas_util: PersonasUtil,
+    client_provider: ClientProvider,
+    providers: Sequence[str] = ROUTED_PROVIDERS,
+    rounds: int = 1,
+    judge: Optional[ChatCompletionClient] = None,
+    cancellation_token: Optional[CancellationToken] = None,
+) -> List[EvalResult]:
+    """
+    Fans the first turn of a session out to every provider, for every parliament member at once.
+
+    Each member is sent what it would be sent as the first speaker on the topic, by each configured provider,
+    `rounds` times. All the calls run concurrently, so the evaluation takes about as long as the slowest one.
+
+    Args:
+        topic (str): The topic.
+        personas_util (PersonasUtil): The loaded personas. Every parliament member is evaluated.
+        client_provider (ClientProvider): Returns a model client for a provider name.
+        providers (Sequence[str]): The providers to compare. Unconfigured ones are skipped.
+        rounds (int): How many answers to ask each provider for, per member.
+        judge (Optional[ChatCompletionClient]): A client that rates each answer 1 to 10 for staying in
+                                                character. None leaves the answers unscored.
+        cancellation_token (Optional[CancellationToken]): Token to cancel the evaluation.
+
+    Returns:
+        One result per member, provider and round. Failed calls are reported in their result.
+
+    Raises:
+        ValueError: If rounds is less than one.
+    """
+    if rounds < 1:
+        raise ValueError(f"rounds must be at least 1, got {rounds}")
+    clients: Dict[str, ChatCompletionClient] = {}
+    for provider in providers:
+        client = client_provider(provider)
+        if client is None:
+            print(f"Warning: Provider '{provider}' is not configured, leaving it out of the evaluation")
+            continue
+        clients[provider] = client
+
+    members = list(personas_util.get_parliament_members().values())
+    results = await asyncio.gather(*(
+        _run_one(client, persona, provider, round_index, topic, cancellation_token)
+        for persona in members
+        for provider, client in clients.items()
+        for round_index in range(rounds)
+    ))
+    if judge is not None:
+        by_name = {persona.get('name', 'Agent'): persona for persona in members}
+        await asyncio.gather(*(
+            _judge(judge, by_name[result.persona], result, topic, cancellation_token)
+            for result in results
+            if result.error is None
+        ))
+    return list(results)
+
+
+def update_leaderboard(leaderboard: ProviderLeaderboard, results: Sequence[EvalResult]) -> None:
+    """Adds evaluation results to a leaderboard."""
+    for result in results:
+        leaderboard.score(result.persona, result.provider).add(
+            result.latency_seconds,
+            prompt_tokens=result.prompt_tokens,
+            completion_tokens=result.completion_tokens,
+            error=result.error is not None,
+            score=result.score,
+        )
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Compare the providers per persona on one turn, and update the provider leaderboard."
+    )
+    parser.add_argument('topic', help="The topic the members answer on.")
+    parser.add_argument('--config', default=None, help="Personas config file (defaults to src/config.toml).")
+    parser.add_argument('--providers', nargs='+', default=ROUTED_PROVIDERS, help="The providers to compare.")
+    parser.add_argument('--rounds', type=int, default=1, help="Answers per member and provider.")
+    parser.add_argument('--judge', default=None,
+                        help="A provider that rates each answer 1 to 10 for staying in character.")
+    parser.add_argument('--leaderboard', default=DEFAULT_LEADERBOARD_PATH,
+                        help="The leaderboard file to update; later runs choose each member's provider from it.")
+    parser.add_argument('--results', default=None, help="Also write every answer to this JSONL file.")
+    parser.add_argument('--offline', action='store_true',
+                        help="Serve every provider from local mock clients (see the MOCK_* variables).")
+    return parser
+
+
+async def main(argv: Optional[List[str]] = None) -> None:
+    """Runs the provider evaluation CLI."""
+    args = build_parser().parse_args(argv)
+
+    load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '.env'), override=True)
+    personas_util = PersonasUtil(config_path=args.config) if args.config else PersonasUtil()
+    factory = AgentsFactory(offline=args.offline)
+    try:
+        judge = factory.get_client(args.judge) if args.judge else None
+        results = await evaluate_providers(
+            args.topic, personas_util, factory.get_client, args.providers, args.rounds, judge=judge
+        )
+    finally:
+        await factory.close()
+
+    if args.results:
+        with open(args.results, "a", encoding="utf-8") as f:
+            for result in results:
+                f.write(json.dumps({"topic": args.topic, **asdict(result)}, ensure_ascii=False) + "\n")
+    leaderboard = ProviderLeaderboard.load(args.leaderboard)
+    update_leaderboard(leaderboard, results)
+    leaderboard.save(args.leaderboard)
+    failed = sum(1 for result in results if result.error is not None)
+    print(f"Evaluated {len(results)} answers ({failed} failed); leaderboard saved to {args.leaderboard}.")
+    print(leaderboard.report())
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
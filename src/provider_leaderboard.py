@@ -0,0 +1,182 @@
+import json
+import os
+from dataclasses import asdict, dataclass, fields
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+DEFAULT_LEADERBOARD_PATH = os.path.join(os.path.dirname(__file__), "provider_leaderboard.json")
+
+# A provider failing at least this often for a persona is ranked after every provider that doesn't.
+MAX_ERROR_RATE = 0.5
+
+
+@dataclass
+class ProviderScore:
+    """The accumulated evaluation results of one provider for one persona."""
+    runs: int = 0
+    errors: int = 0
+    latency_seconds: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    scored: int = 0
+    score_total: float = 0.0
+
+    @property
+    def error_rate(self) -> float:
+        return self.errors / self.runs if self.runs else 0.0
+
+    @property
+    def mean_latency(self) -> Optional[float]:
+        """The mean latency of the successful runs."""
+        ok = self.runs - self.errors
+        return self.latency_seconds / ok if ok else None
+
+    @property
+    def mean_completion_tokens(self) -> Optional[float]:
+        ok = self.runs - self.errors
+        return self.completion_tokens / ok if ok else None
+
+    @property
+    def mean_score(self) -> Optional[float]:
+        """The mean judge score, 1 to 10, or None if no run was judged."""
+        return self.score_total / self.scored if self.scored else None
+
+    def add(
+        self,
+        latency_seconds: float,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+        error: bool = False,
+        score: Optional[float] = None,
+    ) -> None:
+        """Adds one run. The latency and tokens of failed runs are not counted."""
+        self.runs += 1
+        if error:
+            self.errors += 1
+            return
+        self.latency_seconds += latency_seconds
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        if score is not None:
+            self.scored += 1
+            self.score_total += score
+
+
+class ProviderLeaderboard:
+    """Per-persona provider rankings, accumulated over evaluation runs and kept in a JSON file.
+
+    Providers are ranked for a persona by their mean judge score when they have one, then by mean latency;
+    providers that fail MAX_ERROR_RATE of their runs or more come last. AgentsFactory uses the ranking to give
+    each member its best provider instead of a random one.
+    """
+
+    def __init__(self, entries: Optional[Dict[str, Dict[str, ProviderScore]]] = None):
+        """
+        Args:
+            entries (Optional[Dict[str, Dict[str, ProviderScore]]]): The scores by persona name and provider.
+        """
+        self.entries: Dict[str, Dict[str, ProviderScore]] = entries or {}
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_LEADERBOARD_PATH) -> "ProviderLeaderboard":
+        """
+        Loads a leaderboard file.
+
+        Args:
+            path (str): The JSON file written by save().
+
+        Returns:
+            The leaderboard, empty if the file does not exist.
+        """
+        if not os.path.exists(path):
+            return cls()
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        names = {field.name for field in fields(ProviderScore)}
+        return cls({
+            persona: {
+                provider: ProviderScore(**{key: value for key, value in score.items() if key in names})
+                for provider, score in providers.items()
+            }
+            for persona, providers in data.get("personas", {}).items()
+        })
+
+    def save(self, path: str = DEFAULT_LEADERBOARD_PATH) -> None:
+        """Writes the leaderboard, replacing the file atomically so readers never see half of it."""
+        data: Dict[str, Any] = {"personas": {}}
+        for persona, providers in self.entries.items():
+            data["personas"][persona] = {}
+            for provider, score in providers.items():
+                data["personas"][persona][provider] = {
+                    **asdict(score),
+                    "error_rate": score.error_rate,
+                    "mean_latency": score.mean_latency,
+                    "mean_score": score.mean_score,
+                }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def score(self, persona: str, provider: str) -> ProviderScore:
+        """Returns the score of a provider for a persona, created empty if missing."""
+        return self.entries.setdefault(persona, {}).setdefault(provider, ProviderScore())
+
+    def ranking(self, persona: str, available: Optional[Iterable[str]] = None) -> List[str]:
+        """
+        Ranks the providers evaluated for a persona.
+
+        Args:
+            persona (str): The persona name.
+            available (Optional[Iterable[str]]): Only rank these providers. None ranks all of them.
+
+        Returns:
+            The providers, best first. Empty if the persona has no successful runs. Providers that fail too often
+            come last. Judge scores are only compared between providers that both have one: the judged providers
+            keep their order by score, and the unjudged ones are placed among them by latency.
+        """
+        allowed = set(available) if available is not None else None
+        latency: Dict[str, float] = {}
+        for provider, score in self.entries.get(persona, {}).items():
+            if score.mean_latency is not None and (allowed is None or provider in allowed):
+                latency[provider] = score.mean_latency
+        scores = self.entries.get(persona, {})
+        ranking: List[str] = []
+        for failing in (False, True):
+            group = [provider for provider in latency if (scores[provider].error_rate >= MAX_ERROR_RATE) == failing]
+            judge_scores = {provider: scores[provider].mean_score for provider in group}
+            judged = sorted(
+                (provider for provider in group if judge_scores[provider] is not None),
+                key=lambda provider: (-judge_scores[provider], latency[provider]),  # type: ignore[operator]
+            )
+            unjudged = sorted((provider for provider in group if judge_scores[provider] is None), key=latency.get)
+            while judged and unjudged:
+                ranking.append((unjudged if latency[unjudged[0]] < latency[judged[0]] else judged).pop(0))
+            ranking += judged + unjudged
+        return ranking
+
+    def best(self, persona: str, available: Optional[Iterable[str]] = None) -> Optional[str]:
+        """The best provider for a persona, or None if none of the available ones was evaluated."""
+        ranking = self.ranking(persona, available)
+        return ranking[0] if ranking else None
+
+    def assignments(self, personas: Iterable[str], available: Optional[Iterable[str]] = None) -> Mapping[str, str]:
+        """The best provider of each persona that has one."""
+        allowed = list(available) if available is not None else None
+        best = {persona: self.best(persona, allowed) for persona in personas}
+        return {persona: provider for persona, provider in best.items() if provider is not None}
+
+    def report(self) -> str:
+        """A table of every persona's providers, best first."""
+        lines = ["--- Provider Leaderboard ---"]
+        for persona in sorted(self.entries):
+            lines.append(f"  {persona}:")
+            ranked = self.ranking(persona)
+            unranked = [provider for provider in self.entries[persona] if provider not in ranked]
+            for provider in ranked + unranked:
+                score = self.entries[persona][provider]
+                latency = f"{score.mean_latency:.2f}s" if score.mean_latency is not None else "-"
+                judged = f"{score.mean_score:.1f}/10" if score.mean_score is not None else "unscored"
+                tokens = f"{score.mean_completion_tokens:.0f}" if score.mean_completion_tokens is not None else "-"
+                lines.append(f"    {provider:<8} {judged:>9}  {latency:>7}  {tokens:>5} tokens  "
+                             f"{score.runs} runs, {score.error_rate:.0%} errors")
+        return "\n".join(lines)
@@ -0,0 +1,376 @@
+import asyncio
+import contextvars
+import random
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, AsyncGenerator, Dict, Iterator, Optional, Sequence, Union
+
+from autogen_core import CancellationToken
+from autogen_core.models import ChatCompletionClient, CreateResult, LLMMessage
+
+from client_wrappers import DelegatingChatCompletionClient, TokenBucket
+
+# HTTP statuses worth retrying: timeouts, conflicts, rate limits and server errors.
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+# The monotonic time by which the current session must finish, set by deadline_scope().
+session_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar('session_deadline', default=None)
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a provider whose circuit breaker is open."""
+
+
+class DeadlineExceededError(TimeoutError):
+    """Raised when the session deadline leaves no time for another attempt."""
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float], cancellation_token: Optional[CancellationToken] = None) -> Iterator[None]:
+    """
+    Gives the model calls made inside the block a deadline, and cancels the token when it passes.
+
+    Resilient clients read the deadline to shorten their timeouts and to stop retrying once it has passed.
+    The deadline reaches the clients through a context variable, which AutoGen's runtime tasks inherit.
+
+    Args:
+        seconds (Optional[float]): The time left from now. None sets no deadline.
+        cancellation_token (Optional[CancellationToken]): Cancelled when the deadline passes.
+    """
+    if seconds is None:
+        yield
+        return
+    reset = session_deadline.set(time.monotonic() + seconds)
+    timer = None
+    if cancellation_token is not None:
+        timer = asyncio.get_running_loop().call_later(seconds, cancellation_token.cancel)
+    try:
+        yield
+    finally:
+        if timer is not None:
+            timer.cancel()
+        session_deadline.reset(reset)
+
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    Tells transient provider failures (timeouts, dropped connections, 429s and 5xx) from permanent ones.
+
+    Args:
+        error (BaseException): The error raised by the model client.
+
+    Returns:
+        True if the call may succeed when retried.
+    """
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    status = getattr(error, 'status_code', None)
+    if isinstance(status, int):
+        return status in RETRYABLE_STATUS_CODES
+    # The OpenAI SDK's timeout and connection errors carry no status code.
+    return type(error).__name__ in ('APITimeoutError', 'APIConnectionError')
+
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    """The delay a rate-limited provider asked for in its Retry-After header, if any."""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if headers is None:
+        return None
+    try:
+        return float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass
+class ResilienceCounters:
+    """What the resilience layer did for one provider."""
+    calls: int = 0
+    successes: int = 0
+    failures: int = 0
+    retries: int = 0
+    timeouts: int = 0
+    rejected: int = 0
+    circuit_opens: int = 0
+    in_flight: int = 0
+    max_in_flight: int = 0
+    wait_seconds: float = 0.0
+
+
+class CircuitBreaker:
+    """Stops calling a provider after `failure_threshold` consecutive failures.
+
+    After `reset_timeout` seconds the breaker lets a single trial call through (half-open). Its success closes
+    the circuit again; its failure re-opens it for another `reset_timeout`.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        Args:
+            failure_threshold (int): Consecutive failures that open the circuit.
+            reset_timeout (float): Seconds the circuit stays open before a trial call.
+
+        Raises:
+            ValueError: If failure_threshold is less than one.
+        """
+        if failure_threshold < 1:
+            raise ValueError(f"failure_threshold must be at least 1, got {failure_threshold}")
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.consecutive_failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        """'closed', 'open' or 'half_open'."""
+        if self._opened_at is None:
+            return 'closed'
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def allow(self) -> bool:
+        """Returns whether a call may go through now, reserving the trial call when half-open."""
+        state = self.state
+        if state == 'closed':
+            return True
+        if state == 'half_open' and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def release_trial(self) -> None:
+        """Gives back the half-open trial slot of a call that said nothing about the provider's health."""
+        self._trial_in_flight = False
+
+    def record_success(self) -> None:
+        self.consecutive_failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self) -> bool:
+        """Counts a failure and returns True if it opened the circuit."""
+        self.consecutive_failures += 1
+        was_open = self._opened_at is not None
+        if self._trial_in_flight or self.consecutive_failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+            return not was_open
+        return False
+
+
+@dataclass
+class ResilienceSettings:
+    """How AgentsFactory protects the calls to each provider."""
+    enabled: bool = True
+    timeout: Optional[float] = 60.0
+    max_retries: int = 3
+    backoff_base: float = 0.5
+    backoff_max: float = 10.0
+    max_concurrency: int = 8
+    rate_limits: Dict[str, float] = field(default_factory=dict)
+    failure_threshold: int = 5
+    reset_timeout: float = 30.0
+
+    def __post_init__(self) -> None:
+        if self.max_retries < 0:
+            raise ValueError(f"max_retries must not be negative, got {self.max_retries}")
+        if self.max_concurrency < 1:
+            raise ValueError(f"max_concurrency must be at least 1, got {self.max_concurrency}")
+
+
+class ProviderGuard:
+    """The concurrency limit, rate limit, circuit breaker and counters shared by every client of a provider."""
+
+    def __init__(self, provider: str, settings: ResilienceSettings):
+        """
+        Args:
+            provider (str): The provider name.
+            settings (ResilienceSettings): The limits to apply.
+        """
+        self.provider = provider
+        self.settings = settings
+        self.semaphore = asyncio.Semaphore(settings.max_concurrency)
+        rate = settings.rate_limits.get(provider)
+        self.bucket = TokenBucket(rate) if rate else None
+        self.breaker = CircuitBreaker(settings.failure_threshold, settings.reset_timeout)
+        self.counters = ResilienceCounters()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """The counters and the circuit state, for reports."""
+        return {**asdict(self.counters), "circuit": self.breaker.state}
+
+
+class ResilientChatCompletionClient(DelegatingChatCompletionClient):
+    """A model client that bounds, rate limits, times out, retries and circuit-breaks the calls to a provider.
+
+    Each attempt waits for a concurrency slot and a rate limit token, then runs with the settings' timeout,
+    shortened to the session deadline when one is set. Transient failures are retried with full-jitter
+    exponential backoff (or the provider's Retry-After), as long as the deadline allows. Consecutive failures
+    open the provider's circuit breaker, which fails calls fast with CircuitOpenError so a router can fail over.
+    """
+
+    def __init__(self, inner: ChatCompletionClient, guard: ProviderGuard, seed: Optional[int] = None):
+        """
+        Args:
+            inner (ChatCompletionClient): The provider client.
+            guard (ProviderGuard): The provider's shared limits, breaker and counters.
+            seed (Optional[int]): The seed of the backoff jitter.
+        """
+        super().__init__(inner)
+        self.guard = guard
+        self.settings = guard.settings
+        self._random = random.Random(seed)
+
+    def _attempt_timeout(self) -> Optional[float]:
+        deadline = session_deadline.get()
+        if deadline is None:
+            return self.settings.timeout
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceededError("The session deadline has passed")
+        return remaining if self.settings.timeout is None else min(self.settings.timeout, remaining)
+
+    def _backoff(self, attempt: int, error: BaseException) -> float:
+        delay = _retry_after(error)
+        if delay is None:
+            delay = self._random.uniform(0, min(self.settings.backoff_max, self.settings.backoff_base * 2 ** attempt))
+        return min(delay, self.settings.backoff_max)
+
+    async def _acquire(self) -> None:
+        start = time.perf_counter()
+        await self.guard.semaphore.acquire()
+        try:
+            if self.guard.bucket is not None:
+                await self.guard.bucket.acquire()
+        except BaseException:
+            self.guard.semaphore.release()
+            raise
+        counters = self.guard.counters
+        counters.wait_seconds += time.perf_counter() - start
+        counters.in_flight += 1
+        counters.max_in_flight = max(counters.max_in_flight, counters.in_flight)
+
+    def _release(self) -> None:
+        self.guard.counters.in_flight -= 1
+        self.guard.semaphore.release()
+
+    def _check_circuit(self) -> None:
+        if not self.guard.breaker.allow():
+            self.guard.counters.rejected += 1
+            raise CircuitOpenError(f"The circuit for {self.guard.provider} is open")
+
+    def _record_failure(self, error: BaseException) -> None:
+        counters = self.guard.counters
+        counters.failures += 1
+        if isinstance(error, asyncio.TimeoutError):
+            counters.timeouts += 1
+        if not is_retryable(error):
+            # The provider answered, so this says nothing about its health; let the next call be the trial.
+            self.guard.breaker.release_trial()
+        elif self.guard.breaker.record_failure():
+            counters.circuit_opens += 1
+
+    async def _wait_before_retry(self, attempt: int, error: BaseException) -> bool:
+        """Sleeps before the next attempt and returns False if the error is final."""
+        if attempt >= self.settings.max_retries or not is_retryable(error):
+            return False
+        delay = self._backoff(attempt, error)
+        deadline = session_deadline.get()
+        if deadline is not None and time.monotonic() + delay >= deadline:
+            return False
+        self.guard.counters.retries += 1
+        await asyncio.sleep(delay)
+        return True
+
+    async def create(  # type: ignore[override]
+        self,
+        messages: Sequence[LLMMessage],
+        *,
+        cancellation_token: Optional[CancellationToken] = None,
+        **kwargs: Any,
+    ) -> CreateResult:
+        self.guard.counters.calls += 1
+        attempt = 0
+        while True:
+            timeout = self._attempt_timeout()
+            self._check_circuit()
+            await self._acquire()
+            try:
+                call = asyncio.ensure_future(
+                    super().create(messages, cancellation_token=cancellation_token, **kwargs)
+                )
+                if cancellation_token is not None:
+                    cancellation_token.link_future(call)
+                result = await asyncio.wait_for(call, timeout=timeout)
+            except asyncio.CancelledError:
+                # Cancellation is the caller's decision, not a provider failure.
+                self.guard.breaker.release_trial()
+                raise
+            except Exception as e:
+                self._record_failure(e)
+                error: Exception = e
+            else:
+                self.guard.breaker.record_success()
+                self.guard.counters.successes += 1
+                return result
+            finally:
+                self._release()
+            if not await self._wait_before_retry(attempt, error):
+                raise error
+            attempt += 1
+
+    async def create_stream(  # type: ignore[override]
+        self,
+        messages: Sequence[LLMMessage],
+        *,
+        cancellation_token: Optional[CancellationToken] = None,
+        **kwargs: Any,
+    ) -> AsyncGenerator[Union[str, CreateResult], None]:
+        # Retried only until the first chunk arrives; after that the caller has seen partial output.
+        self.guard.counters.calls += 1
+        attempt = 0
+        loop = asyncio.get_running_loop()
+        while True:
+            timeout = self._attempt_timeout()
+            self._check_circuit()
+            await self._acquire()
+            yielded = False
+            stream = super().create_stream(messages, cancellation_token=cancellation_token, **kwargs)
+            # The attempt's timeout covers the whole stream, but not the time the caller spends on each chunk.
+            deadline = None if timeout is None else loop.time() + timeout
+            try:
+                while True:
+                    remaining = None if deadline is None else deadline - loop.time()
+                    if remaining is not None and remaining <= 0:
+                        raise asyncio.TimeoutError()
+                    try:
+                        chunk = await asyncio.wait_for(stream.__anext__(), timeout=remaining)
+                    except StopAsyncIteration:
+                        break
+                    yielded = True
+                    yielded_at = loop.time()
+                    yield chunk
+                    if deadline is not None:
+                        deadline += loop.time() - yielded_at
+            except asyncio.CancelledError:
+                self.guard.breaker.release_trial()
+                raise
+            except Exception as e:
+                self._record_failure(e)
+                if yielded:
+                    raise
+                error: Exception = e
+            else:
+                self.guard.breaker.record_success()
+                self.guard.counters.successes += 1
+                return
+            finally:
+                self._release()
+                await stream.aclose()
+            if not await self._wait_before_retry(attempt, error):
+                raise error
+            attempt += 1
@@ -0,0 +1,234 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, AsyncGenerator, Literal, Mapping, Optional, Sequence, Tuple, Union
+
+from autogen_core import CacheStore, CancellationToken
+from autogen_core.models import ChatCompletionClient, CreateResult, LLMMessage
+from autogen_core.tools import Tool, ToolSchema
+from pydantic import BaseModel
+
+from client_wrappers import DelegatingChatCompletionClient
+
+
+class LRUCacheStore(CacheStore[CreateResult]):
+    """An in-memory CacheStore that keeps the `max_entries` most recently used results, each for `ttl_seconds`."""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: Optional[float] = None):
+        """
+        Args:
+            max_entries (int): The maximum number of cached results.
+            ttl_seconds (Optional[float]): How long a result stays valid. None keeps results until evicted.
+
+        Raises:
+            ValueError: If max_entries is less than one.
+        """
+        if max_entries < 1:
+            raise ValueError(f"max_entries must be at least 1, got {max_entries}")
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, CreateResult]]" = OrderedDict()
+
+    def get(self, key: str, default: Optional[CreateResult] = None) -> Optional[CreateResult]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        stored_at, value = entry
+        if self.ttl_seconds is not None and time.time() - stored_at > self.ttl_seconds:
+            del self._entries[key]
+            return default
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: CreateResult) -> None:
+        self._entries[key] = (time.time(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCacheStore(CacheStore[CreateResult]):
+    """A CacheStore that keeps results in a SQLite file, so they survive between runs."""
+
+    def __init__(self, path: str = 'response_cache.sqlite', ttl_seconds: Optional[float] = None):
+        """
+        Args:
+            path (str): The SQLite database file. Created if missing.
+            ttl_seconds (Optional[float]): How long a result stays valid. None keeps results forever.
+        """
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, stored_at REAL NOT NULL, value TEXT NOT NULL)"
+            )
+
+    def get(self, key: str, default: Optional[CreateResult] = None) -> Optional[CreateResult]:
+        with self._lock:
+            row = self._conn.execute("SELECT stored_at, value FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return default
+        stored_at, value = row
+        if self.ttl_seconds is not None and time.time() - stored_at > self.ttl_seconds:
+            with self._lock, self._conn:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            return default
+        return CreateResult.model_validate_json(value)
+
+    def set(self, key: str, value: CreateResult) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, stored_at, value) VALUES (?, ?, ?)",
+                (key, time.time(), value.model_dump_json()),
+            )
+
+    def close(self) -> None:
+        """Closes the database connection."""
+        self._conn.close()
+
+
+@dataclass
+class CacheStats:
+    """Hit and miss counters, shared by all the cached clients of a factory."""
+    hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """The fraction of lookups that were hits, or 0.0 before any lookup."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+def make_cache_key(
+    namespace: str,
+    messages: Sequence[LLMMessage],
+    tools: Sequence[Tool | ToolSchema] = [],
+    tool_choice: Tool | Literal["auto", "required", "none"] = "auto",
+    json_output: Optional[bool | type[BaseModel]] = None,
+    extra_create_args: Mapping[str, Any] = {},
+) -> str:
+    """
+    Builds the cache key of a request.
+
+    Args:
+        namespace (str): Identifies the model and its default sampling parameters.
+        messages (Sequence[LLMMessage]): The request messages.
+        tools (Sequence[Tool | ToolSchema]): The tools offered to the model.
+        tool_choice (Tool | Literal["auto", "required", "none"]): Whether and which tool the model must call.
+        json_output (Optional[bool | type[BaseModel]]): The requested output format.
+        extra_create_args (Mapping[str, Any]): Per-request sampling parameters such as temperature.
+
+    Returns:
+        A SHA-256 hex digest.
+    """
+    if isinstance(json_output, type) and issubclass(json_output, BaseModel):
+        json_output_data: Any = json_output.model_json_schema()
+    else:
+        json_output_data = json_output
+    data = {
+        "namespace": namespace,
+        "messages": [message.model_dump() for message in messages],
+        "tools": [(tool.schema if isinstance(tool, Tool) else tool) for tool in tools],
+        "tool_choice": tool_choice.schema if isinstance(tool_choice, Tool) else tool_choice,
+        "json_output": json_output_data,
+        "extra_create_args": dict(extra_create_args),
+    }
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class CachedChatCompletionClient(DelegatingChatCompletionClient):
+    """A model client that answers repeated requests from a CacheStore instead of the model.
+
+    Cache hits are returned with `cached=True` and do not count towards the inner client's usage.
+    """
+
+    def __init__(
+        self,
+        inner: ChatCompletionClient,
+        store: CacheStore[CreateResult],
+        namespace: str,
+        stats: Optional[CacheStats] = None,
+    ):
+        """
+        Args:
+            inner (ChatCompletionClient): The client to call on a cache miss.
+            store (CacheStore[CreateResult]): Where results are kept.
+            namespace (str): Identifies the model and its default sampling parameters, e.g. 'grok:grok-3'.
+            stats (Optional[CacheStats]): The counters to update. A new one is created if omitted.
+        """
+        super().__init__(inner)
+        self.store = store
+        self.namespace = namespace
+        self.stats = stats or CacheStats()
+
+    def _lookup(self, key: str) -> Optional[CreateResult]:
+        result = self.store.get(key)
+        if result is None:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        return result.model_copy(update={"cached": True})
+
+    async def create(
+        self,
+        messages: Sequence[LLMMessage],
+        *,
+        tools: Sequence[Tool | ToolSchema] = [],
+        tool_choice: Tool | Literal["auto", "required", "none"] = "auto",
+        json_output: Optional[bool | type[BaseModel]] = None,
+        extra_create_args: Mapping[str, Any] = {},
+        cancellation_token: Optional[CancellationToken] = None,
+    ) -> CreateResult:
+        key = make_cache_key(self.namespace, messages, tools, tool_choice, json_output, extra_create_args)
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+        result = await self.inner.create(
+            messages,
+            tools=tools,
+            tool_choice=tool_choice,
+            json_output=json_output,
+            extra_create_args=extra_create_args,
+            cancellation_token=cancellation_token,
+        )
+        self.store.set(key, result)
+        return result
+
+    async def create_stream(  # type: ignore[override]
+        self,
+        messages: Sequence[LLMMessage],
+        *,
+        tools: Sequence[Tool | ToolSchema] = [],
+        tool_choice: Tool | Literal["auto", "required", "none"] = "auto",
+        json_output: Optional[bool | type[BaseModel]] = None,
+        extra_create_args: Mapping[str, Any] = {},
+        cancellation_token: Optional[CancellationToken] = None,
+    ) -> AsyncGenerator[Union[str, CreateResult], None]:
+        key = make_cache_key(self.namespace, messages, tools, tool_choice, json_output, extra_create_args)
+        cached = self._lookup(key)
+        if cached is not None:
+            if isinstance(cached.content, str):
+                yield cached.content
+            yield cached
+            return
+        async for chunk in self.inner.create_stream(
+            messages,
+            tools=tools,
+            tool_choice=tool_choice,
+            json_output=json_output,
+            extra_create_args=extra_create_args,
+            cancellation_token=cancellation_token,
+        ):
+            if isinstance(chunk, CreateResult):
+                self.store.set(key, chunk)
+            yield chunk
@@ -0,0 +1,99 @@
+import json
+import time
+from typing import Any, Dict, Optional, TextIO
+
+from autogen_agentchat.messages import TextMessage
+
+
+def format_turn(msg: Any) -> Optional[str]:
+    """
+    Renders one message as a "source: content" script line.
+
+    Args:
+        msg (Any): A message or event yielded by the group chat.
+
+    Returns:
+        The script line, or None for user messages and anything that is not a text message, such as tool
+        call events.
+    """
+    if isinstance(msg, TextMessage) and msg.source != "user":
+        return f"{msg.source}: {msg.content}\n\n"
+    return None
+
+
+class ScriptWriter:
+    """Appends each speaker turn to the script file as it arrives, optionally mirrored to a JSONL file.
+
+    Both files are flushed after every turn, so a live preview can tail them while the debate runs.
+    """
+
+    def __init__(self, script_path: str = "pub_script.txt", jsonl_path: Optional[str] = None, echo: bool = False):
+        """
+        Args:
+            script_path (str): The text script file. It is truncated when the writer opens.
+            jsonl_path (Optional[str]): A JSONL file with one record per turn. None disables it.
+            echo (bool): Whether to also print each turn to the console.
+        """
+        self.script_path = script_path
+        self.jsonl_path = jsonl_path
+        self.echo = echo
+        self.turns = 0
+        self._script_file: Optional[TextIO] = None
+        self._jsonl_file: Optional[TextIO] = None
+
+    def open(self) -> "ScriptWriter":
+        """Opens (and truncates) the output files."""
+        self._script_file = open(self.script_path, "w", encoding="utf-8")
+        if self.jsonl_path is not None:
+            self._jsonl_file = open(self.jsonl_path, "w", encoding="utf-8")
+        return self
+
+    def close(self) -> None:
+        """Closes the output files."""
+        for f in (self._script_file, self._jsonl_file):
+            if f is not None:
+                f.close()
+        self._script_file = None
+        self._jsonl_file = None
+
+    def __enter__(self) -> "ScriptWriter":
+        return self.open()
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def write(self, msg: Any) -> bool:
+        """
+        Writes one message if it is a speaker turn.
+
+        Args:
+            msg (Any): A message or event yielded by the group chat.
+
+        Returns:
+            True if the message was written, False if it was filtered out.
+
+        Raises:
+            RuntimeError: If the writer is not open.
+        """
+        if self._script_file is None:
+            raise RuntimeError("ScriptWriter is not open")
+        line = format_turn(msg)
+        if line is None:
+            return False
+
+        self._script_file.write(line)
+        self._script_file.flush()
+        if self._jsonl_file is not None:
+            record: Dict[str, Any] = {
+                "turn": self.turns,
+                "source": msg.source,
+                "type": type(msg).__name__,
+                "content": msg.content if isinstance(msg.content, str) else str(msg.content),
+                "timestamp": time.time(),
+            }
+            self._jsonl_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._jsonl_file.flush()
+        if self.echo:
+            print(line, end="", flush=True)
+        self.turns += 1
+        return True
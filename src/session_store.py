@@ -0,0 +1,289 @@
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence
+
+# Session statuses. A 'running' session whose process died is only told from a live one by its last
+# checkpoint: it can be resumed once it has not been updated for the store's `stale_after` seconds.
+RUNNING = 'running'
+FAILED = 'failed'
+COMPLETED = 'completed'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    topic TEXT NOT NULL,
+    topic_key TEXT NOT NULL,
+    persona_set TEXT NOT NULL,
+    status TEXT NOT NULL,
+    max_messages INTEGER NOT NULL,
+    message_count INTEGER NOT NULL DEFAULT 0,
+    state TEXT,
+    usage TEXT,
+    stop_reason TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_by_topic ON sessions (topic_key, persona_set, status, updated_at);
+CREATE INDEX IF NOT EXISTS sessions_by_persona_set ON sessions (persona_set, status, updated_at);
+CREATE TABLE IF NOT EXISTS messages (
+    session_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    message TEXT NOT NULL,
+    PRIMARY KEY (session_id, position)
+);
+"""
+
+
+def topic_key(topic: str) -> str:
+    """The normalised topic sessions are indexed by: lower case with collapsed whitespace."""
+    return " ".join(topic.lower().split())
+
+
+def persona_set_key(names: Iterable[str]) -> str:
+    """The order-independent key of a set of participant names, e.g. 'avi,shauli'."""
+    return ",".join(sorted({name.lower() for name in names}))
+
+
+@dataclass
+class SessionRecord:
+    """One stored session, without its state and messages."""
+    session_id: str
+    topic: str
+    persona_set: str
+    status: str
+    max_messages: int
+    message_count: int
+    stop_reason: Optional[str]
+    created_at: float
+    updated_at: float
+
+
+class SessionStore:
+    """Checkpoints parliament sessions in a SQLite file, so interrupted sessions can be resumed.
+
+    After every turn the session's new messages are appended and the team state (from the team's
+    `save_state()`) and token usage replace the previous checkpoint, in one transaction. Sessions are indexed
+    by normalised topic and persona set. Several processes can share a store: a session is resumed by at most
+    one of them at a time.
+    """
+
+    def __init__(self, path: str = 'sessions.sqlite', stale_after: float = 300.0):
+        """
+        Args:
+            path (str): The SQLite database file. Created if missing.
+            stale_after (float): Seconds without a checkpoint after which a running session is taken for one
+                                 whose process died, and can be resumed.
+        """
+        self.path = path
+        self.stale_after = stale_after
+        self._lock = threading.Lock()
+        # Worker processes write to the same file; wait for their transactions rather than failing.
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._conn:
+            self._conn.executescript(_SCHEMA)
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(sessions)")}
+            if "usage" not in columns:
+                # Stores created before usage was checkpointed.
+                self._conn.execute("ALTER TABLE sessions ADD COLUMN usage TEXT")
+
+    def start_session(self, topic: str, persona_set: str, max_messages: int) -> str:
+        """
+        Registers a new session.
+
+        Args:
+            topic (str): The topic.
+            persona_set (str): The participants, as returned by persona_set_key().
+            max_messages (int): The message limit of the session.
+
+        Returns:
+            The new session id.
+        """
+        session_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO sessions (session_id, topic, topic_key, persona_set, status, max_messages, "
+                "created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (session_id, topic, topic_key(topic), persona_set, RUNNING, max_messages, now, now),
+            )
+        return session_id
+
+    def checkpoint(
+        self,
+        session_id: str,
+        messages: Sequence[Mapping[str, Any]],
+        state: Mapping[str, Any],
+        usage: Optional[Mapping[str, Any]] = None,
+    ) -> None:
+        """
+        Appends a turn's messages and replaces the session's team state and usage.
+
+        Args:
+            session_id (str): The session.
+            messages (Sequence[Mapping[str, Any]]): The messages produced since the last checkpoint, as dumped
+                                                   by their `dump()` method.
+            state (Mapping[str, Any]): The team state after those messages.
+            usage (Optional[Mapping[str, Any]]): The session's token usage so far, from SessionUsage.dump().
+        """
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT message_count FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            if row is None:
+                raise KeyError(f"Unknown session: {session_id}")
+            position = row[0]
+            self._conn.executemany(
+                "INSERT INTO messages (session_id, position, message) VALUES (?, ?, ?)",
+                [(session_id, position + i, json.dumps(message, default=str)) for i, message in enumerate(messages)],
+            )
+            self._conn.execute(
+                "UPDATE sessions SET message_count = ?, state = ?, usage = ?, status = ?, updated_at = ? "
+                "WHERE session_id = ?",
+                (
+                    position + len(messages),
+                    json.dumps(state, default=str),
+                    json.dumps(usage) if usage is not None else None,
+                    RUNNING,
+                    time.time(),
+                    session_id,
+                ),
+            )
+
+    def finish(self, session_id: str, status: str, stop_reason: Optional[str] = None) -> None:
+        """
+        Marks a session as completed or failed.
+
+        Args:
+            session_id (str): The session.
+            status (str): COMPLETED or FAILED.
+            stop_reason (Optional[str]): Why the session stopped, e.g. the termination message or the error.
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE sessions SET status = ?, stop_reason = ?, updated_at = ? WHERE session_id = ?",
+                (status, stop_reason, time.time(), session_id),
+            )
+
+    def _records(self, query: str, params: Sequence[Any]) -> List[SessionRecord]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT session_id, topic, persona_set, status, max_messages, message_count, stop_reason, "
+                "created_at, updated_at FROM sessions " + query,
+                params,
+            ).fetchall()
+        return [SessionRecord(*row) for row in rows]
+
+    def get_session(self, session_id: str) -> Optional[SessionRecord]:
+        """Returns a session's record, or None if it does not exist."""
+        records = self._records("WHERE session_id = ?", (session_id,))
+        return records[0] if records else None
+
+    def find_sessions(
+        self,
+        topic: Optional[str] = None,
+        persona_set: Optional[str] = None,
+        status: Optional[str] = None,
+        limit: int = 50,
+    ) -> List[SessionRecord]:
+        """
+        Queries the index, most recently updated first.
+
+        Args:
+            topic (Optional[str]): Only sessions on this topic, compared after normalisation.
+            persona_set (Optional[str]): Only sessions with these participants, as returned by persona_set_key().
+            status (Optional[str]): Only sessions with this status.
+            limit (int): The maximum number of records.
+
+        Returns:
+            The matching sessions.
+        """
+        conditions: List[str] = []
+        params: List[Any] = []
+        if topic is not None:
+            conditions.append("topic_key = ?")
+            params.append(topic_key(topic))
+        if persona_set is not None:
+            conditions.append("persona_set = ?")
+            params.append(persona_set)
+        if status is not None:
+            conditions.append("status = ?")
+            params.append(status)
+        where = "WHERE " + " AND ".join(conditions) + " " if conditions else ""
+        return self._records(where + "ORDER BY updated_at DESC LIMIT ?", params + [limit])
+
+    # Failed sessions, and running ones whose process has stopped checkpointing.
+    _RESUMABLE = "state IS NOT NULL AND (status = ? OR (status = ? AND updated_at < ?))"
+
+    def find_resumable(self, topic: str, persona_set: str) -> Optional[SessionRecord]:
+        """
+        Finds the most recent unfinished session on a topic with the same participants that nobody is running.
+
+        Args:
+            topic (str): The topic.
+            persona_set (str): The participants, as returned by persona_set_key().
+
+        Returns:
+            The session, or None if there is nothing to resume.
+        """
+        records = self._records(
+            f"WHERE topic_key = ? AND persona_set = ? AND {self._RESUMABLE} ORDER BY updated_at DESC LIMIT 1",
+            (topic_key(topic), persona_set, FAILED, RUNNING, time.time() - self.stale_after),
+        )
+        return records[0] if records else None
+
+    def claim_resumable(self, topic: str, persona_set: str) -> Optional[SessionRecord]:
+        """
+        Finds a session to resume, like find_resumable(), and marks it running so no one else resumes it.
+
+        The session is claimed with a conditional update, so when several processes or tasks look for the same
+        topic at once, each session goes to only one of them.
+
+        Args:
+            topic (str): The topic.
+            persona_set (str): The participants, as returned by persona_set_key().
+
+        Returns:
+            The claimed session, or None if there is nothing to resume.
+        """
+        while True:
+            record = self.find_resumable(topic, persona_set)
+            if record is None:
+                return None
+            now = time.time()
+            with self._lock, self._conn:
+                claimed = self._conn.execute(
+                    f"UPDATE sessions SET status = ?, updated_at = ? WHERE session_id = ? AND {self._RESUMABLE}",
+                    (RUNNING, now, record.session_id, FAILED, RUNNING, now - self.stale_after),
+                ).rowcount
+            if claimed:
+                record.status, record.updated_at = RUNNING, now
+                return record
+            # Someone else claimed it first; look for another one.
+
+    def load_state(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Returns the team state of the session's last checkpoint, or None if it has none."""
+        with self._lock:
+            row = self._conn.execute("SELECT state FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        return json.loads(row[0]) if row is not None and row[0] is not None else None
+
+    def load_usage(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Returns the token usage of the session's last checkpoint, or None if it has none."""
+        with self._lock:
+            row = self._conn.execute("SELECT usage FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        return json.loads(row[0]) if row is not None and row[0] is not None else None
+
+    def get_messages(self, session_id: str) -> List[Dict[str, Any]]:
+        """Returns the session's checkpointed messages, in order, as dumped by their `dump()` method."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT message FROM messages WHERE session_id = ? ORDER BY position", (session_id,)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def close(self) -> None:
+        """Closes the database connection."""
+        self._conn.close()
@@ -0,0 +1,346 @@
+import abc
+import math
+import random
+import re
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, AsyncGenerator, Dict, List, Optional, Sequence, Tuple, Union
+
+from autogen_agentchat.messages import BaseAgentEvent, BaseChatMessage
+from autogen_core.models import ChatCompletionClient, CreateResult, LLMMessage, UserMessage
+
+from client_wrappers import DelegatingChatCompletionClient
+from metrics import registry
+
+# 'llm': the selector model picks every speaker (the AutoGen default). 'round_robin': members speak in order.
+# 'weighted': a random pick weighted by how well each description matches the discussion and how long
+# each member has been quiet. 'classifier': a naive Bayes classifier over the persona texts picks the
+# most likely member. 'hybrid': the classifier, falling back to the selector model when it is unsure.
+SELECTION_MODES = ['llm', 'round_robin', 'weighted', 'classifier', 'hybrid']
+
+Thread = Sequence[Union[BaseAgentEvent, BaseChatMessage]]
+
+
+@dataclass
+class Participant:
+    """A member as seen by the speaker selection heuristics."""
+    name: str
+    description: str = ""
+    instructions: str = ""
+
+
+@dataclass
+class SelectionStats:
+    """What speaker selection cost, and what the heuristics saved compared with asking the selector model."""
+    heuristic_picks: int = 0
+    heuristic_seconds: float = 0.0
+    estimated_tokens_saved: int = 0
+    llm_calls: int = 0
+    llm_seconds: float = 0.0
+    llm_tokens: int = 0
+
+    def report(self) -> str:
+        """
+        Builds a summary of the selections.
+
+        Returns:
+            The report text. The saved time is only given once a selector model call has been measured.
+        """
+        lines: List[str] = ["--- Speaker Selection ---"]
+        lines.append(f"  Heuristic picks: {self.heuristic_picks} ({self.heuristic_seconds * 1000:.1f} ms in total)")
+        lines.append(f"  Selector model calls: {self.llm_calls} ({self.llm_tokens} tokens, {self.llm_seconds:.2f}s)")
+        if self.heuristic_picks:
+            saved = f"  Saved: {self.heuristic_picks} selector calls, ~{self.estimated_tokens_saved} prompt tokens"
+            if self.llm_calls:
+                mean = self.llm_seconds / self.llm_calls
+                saved += (f", ~{self.heuristic_picks * mean - self.heuristic_seconds:.2f}s "
+                          f"at the measured {mean * 1000:.0f} ms per call")
+            lines.append(saved)
+        return "\n".join(lines)
+
+
+def _words(text: str) -> List[str]:
+    return [word for word in re.findall(r"\w+", text.lower()) if len(word) > 2]
+
+
+def _chat_turns(thread: Thread) -> List[Tuple[str, str]]:
+    """The (source, text) of every chat message in the thread, including the task."""
+    return [(message.source, message.to_model_text()) for message in thread if isinstance(message, BaseChatMessage)]
+
+
+def _mentioned(names: Sequence[str], text: str) -> List[str]:
+    return [name for name in names if re.search(rf"(?<!\w){re.escape(name)}(?!\w)", text)]
+
+
+class SpeakerSelector(abc.ABC):
+    """Picks the next speaker from the message thread, used as SelectorGroupChat's `selector_func`.
+
+    Returning None leaves the pick to the selector model.
+    """
+
+    def __init__(
+        self,
+        participants: Sequence[Participant],
+        stats: Optional[SelectionStats] = None,
+        model_client: Optional[ChatCompletionClient] = None,
+        selector_prompt: str = "",
+    ):
+        """
+        Args:
+            participants (Sequence[Participant]): The members, in speaking order.
+            stats (Optional[SelectionStats]): Where to record the picks and their estimated savings.
+            model_client (Optional[ChatCompletionClient]): The selector client, used to count the tokens of
+                                                           the prompt a heuristic pick avoided.
+            selector_prompt (str): The selector prompt the selector model would have been sent.
+
+        Raises:
+            ValueError: If there are no participants.
+        """
+        if not participants:
+            raise ValueError("At least one participant is required")
+        self.participants = list(participants)
+        self.names = [participant.name for participant in self.participants]
+        self.stats = stats
+        self.model_client = model_client
+        self.selector_prompt = selector_prompt
+
+    @abc.abstractmethod
+    def select(self, thread: Thread) -> Optional[str]:
+        """
+        Picks the next speaker.
+
+        Args:
+            thread (Thread): The messages so far, starting with the task.
+
+        Returns:
+            A participant name, or None to ask the selector model.
+        """
+
+    def __call__(self, thread: Thread) -> Optional[str]:
+        start = time.perf_counter()
+        speaker = self.select(thread)
+        elapsed = time.perf_counter() - start
+        registry.observe("parliament_selector_decision_seconds", elapsed, method="heuristic")
+        if self.stats is not None:
+            self.stats.heuristic_seconds += elapsed
+            if speaker is not None:
+                self.stats.heuristic_picks += 1
+                self.stats.estimated_tokens_saved += self._estimate_prompt_tokens(thread)
+        return speaker
+
+    def _estimate_prompt_tokens(self, thread: Thread) -> int:
+        if self.model_client is None:
+            return 0
+        roles = "\n".join(f"{participant.name}: {participant.description}" for participant in self.participants)
+        history = "\n".join(f"{source}: {text}" for source, text in _chat_turns(thread))
+        try:
+            prompt = self.selector_prompt.format(roles=roles, participants=str(self.names), history=history)
+        except (KeyError, IndexError, ValueError):
+            prompt = self.selector_prompt
+        return self.model_client.count_tokens([UserMessage(content=prompt, source="user")])
+
+    def _last_speaker(self, thread: Thread) -> Optional[str]:
+        for source, _ in reversed(_chat_turns(thread)):
+            if source in self.names:
+                return source
+        return None
+
+    def _quiet_factors(self, thread: Thread) -> Dict[str, float]:
+        """How long each member has been quiet, from 1.0 (never spoke) down to 0.0 (spoke last)."""
+        spoken = [source for source, _ in _chat_turns(thread) if source in self.names]
+        factors: Dict[str, float] = {}
+        for name in self.names:
+            if name not in spoken:
+                factors[name] = 1.0
+            else:
+                turns_since = len(spoken) - 1 - max(i for i, source in enumerate(spoken) if source == name)
+                factors[name] = min(turns_since / max(len(self.names) - 1, 1), 1.0)
+        if len(self.names) == 1:
+            factors[self.names[0]] = 1.0
+        return factors
+
+
+class RoundRobinSelector(SpeakerSelector):
+    """Members speak in order, starting with the first."""
+
+    def select(self, thread: Thread) -> Optional[str]:
+        last = self._last_speaker(thread)
+        if last is None:
+            return self.names[0]
+        return self.names[(self.names.index(last) + 1) % len(self.names)]
+
+
+class WeightedSelector(SpeakerSelector):
+    """A random pick weighted by how well each description matches the last message and how long each member
+    has been quiet."""
+
+    def __init__(self, participants: Sequence[Participant], seed: Optional[int] = None, **kwargs: Any):
+        """
+        Args:
+            participants (Sequence[Participant]): The members.
+            seed (Optional[int]): The seed of the random picks.
+            **kwargs: Passed to SpeakerSelector.
+        """
+        super().__init__(participants, **kwargs)
+        self._random = random.Random(seed)
+        self._profiles = {participant.name: set(_words(participant.description)) for participant in self.participants}
+
+    def select(self, thread: Thread) -> Optional[str]:
+        turns = _chat_turns(thread)
+        recent = set(_words(turns[-1][1])) if turns else set()
+        quiet = self._quiet_factors(thread)
+        weights = [(1 + len(self._profiles[name] & recent)) * quiet[name] for name in self.names]
+        if not any(weights):
+            weights = [1.0] * len(self.names)
+        return self._random.choices(self.names, weights=weights)[0]
+
+
+class ClassifierSelector(SpeakerSelector):
+    """A multinomial naive Bayes classifier trained on each persona's description and instructions.
+
+    It scores the last message against each member's vocabulary, with a prior that favours members who have
+    been quiet. A member named in the last message is picked outright.
+    """
+
+    def __init__(self, participants: Sequence[Participant], **kwargs: Any):
+        super().__init__(participants, **kwargs)
+        self._counts: Dict[str, Counter] = {
+            participant.name: Counter(_words(f"{participant.description} {participant.instructions}"))
+            for participant in self.participants
+        }
+        self._totals = {name: sum(counts.values()) for name, counts in self._counts.items()}
+        self._vocabulary_size = len(set().union(*self._counts.values())) or 1
+
+    def probabilities(self, thread: Thread) -> Dict[str, float]:
+        """
+        Scores every member as the next speaker.
+
+        Args:
+            thread (Thread): The messages so far.
+
+        Returns:
+            The probability of each member speaking next. The last speaker gets 0 unless they are alone.
+        """
+        turns = _chat_turns(thread)
+        last_source, last_text = turns[-1] if turns else ("", "")
+        addressed = [name for name in _mentioned(self.names, last_text) if name != last_source]
+        if len(addressed) == 1:
+            return {name: 1.0 if name == addressed[0] else 0.0 for name in self.names}
+
+        words = _words(last_text)
+        quiet = self._quiet_factors(thread)
+        scores: Dict[str, float] = {}
+        for name in self.names:
+            if quiet[name] == 0.0:
+                continue
+            denominator = self._totals[name] + self._vocabulary_size
+            likelihood = sum(math.log((self._counts[name][word] + 1) / denominator) for word in words)
+            scores[name] = likelihood + math.log(quiet[name])
+        best = max(scores.values())
+        exp_scores = {name: math.exp(score - best) for name, score in scores.items()}
+        total = sum(exp_scores.values())
+        return {name: exp_scores.get(name, 0.0) / total for name in self.names}
+
+    def select(self, thread: Thread) -> Optional[str]:
+        probabilities = self.probabilities(thread)
+        return max(self.names, key=lambda name: probabilities[name])
+
+
+class HybridSelector(ClassifierSelector):
+    """The classifier's pick when it is confident, otherwise the selector model's."""
+
+    def __init__(self, participants: Sequence[Participant], margin: float = 0.2, **kwargs: Any):
+        """
+        Args:
+            participants (Sequence[Participant]): The members.
+            margin (float): How far the best member's probability must be ahead of the runner-up's.
+            **kwargs: Passed to SpeakerSelector.
+        """
+        super().__init__(participants, **kwargs)
+        self.margin = margin
+
+    def select(self, thread: Thread) -> Optional[str]:
+        probabilities = sorted(self.probabilities(thread).items(), key=lambda item: item[1], reverse=True)
+        runner_up = probabilities[1][1] if len(probabilities) > 1 else 0.0
+        if probabilities[0][1] - runner_up >= self.margin:
+            return probabilities[0][0]
+        return None
+
+
+def create_speaker_selector(
+    mode: str,
+    participants: Sequence[Participant],
+    stats: Optional[SelectionStats] = None,
+    model_client: Optional[ChatCompletionClient] = None,
+    selector_prompt: str = "",
+    seed: Optional[int] = None,
+) -> Optional[SpeakerSelector]:
+    """
+    Creates the speaker selection strategy for a mode.
+
+    Args:
+        mode (str): One of SELECTION_MODES.
+        participants (Sequence[Participant]): The members, in speaking order.
+        stats (Optional[SelectionStats]): Where to record the picks.
+        model_client (Optional[ChatCompletionClient]): The selector client, used to estimate saved tokens.
+        selector_prompt (str): The selector prompt, used to estimate saved tokens.
+        seed (Optional[int]): The seed of the 'weighted' mode.
+
+    Returns:
+        The selector, or None in 'llm' mode.
+
+    Raises:
+        ValueError: If the mode is unknown.
+    """
+    if mode not in SELECTION_MODES:
+        raise ValueError(f"Unknown speaker selection mode: {mode}. Expected one of {SELECTION_MODES}")
+    kwargs: Dict[str, Any] = {"stats": stats, "model_client": model_client, "selector_prompt": selector_prompt}
+    if mode == 'round_robin':
+        return RoundRobinSelector(participants, **kwargs)
+    if mode == 'weighted':
+        return WeightedSelector(participants, seed=seed, **kwargs)
+    if mode == 'classifier':
+        return ClassifierSelector(participants, **kwargs)
+    if mode == 'hybrid':
+        return HybridSelector(participants, **kwargs)
+    return None
+
+
+class SelectionStatsChatCompletionClient(DelegatingChatCompletionClient):
+    """A selector model client that records the time and tokens of every call in a SelectionStats."""
+
+    def __init__(self, inner: ChatCompletionClient, stats: SelectionStats):
+        """
+        Args:
+            inner (ChatCompletionClient): The selector client.
+            stats (SelectionStats): Where to record the calls.
+        """
+        super().__init__(inner)
+        self.stats = stats
+
+    async def close(self) -> None:
+        # The inner client is shared through the AgentsFactory pool, which closes it.
+        pass
+
+    def _record(self, start: float, result: CreateResult) -> None:
+        elapsed = time.perf_counter() - start
+        registry.observe("parliament_selector_decision_seconds", elapsed, method="llm")
+        self.stats.llm_calls += 1
+        self.stats.llm_seconds += elapsed
+        self.stats.llm_tokens += result.usage.prompt_tokens + result.usage.completion_tokens
+
+    async def create(self, messages: Sequence[LLMMessage], **kwargs: Any) -> CreateResult:  # type: ignore[override]
+        start = time.perf_counter()
+        result = await super().create(messages, **kwargs)
+        self._record(start, result)
+        return result
+
+    async def create_stream(  # type: ignore[override]
+        self, messages: Sequence[LLMMessage], **kwargs: Any
+    ) -> AsyncGenerator[Union[str, CreateResult], None]:
+        start = time.perf_counter()
+        async for chunk in super().create_stream(messages, **kwargs):
+            if isinstance(chunk, CreateResult):
+                self._record(start, chunk)
+            yield chunk
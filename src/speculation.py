@@ -0,0 +1,348 @@
+import asyncio
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Set
+
+from autogen_agentchat.agents import AssistantAgent
+from autogen_agentchat.messages import BaseChatMessage
+from autogen_core import CancellationToken
+from autogen_core.models import ChatCompletionClient, CreateResult, LLMMessage
+
+from autogen_compat import check_agent, model_call_messages, model_call_tools
+from client_wrappers import DelegatingChatCompletionClient
+from context_policy import SummarizingChatCompletionContext
+from metrics import registry
+from speaker_selection import ClassifierSelector, Participant, Thread
+
+
+@dataclass
+class SpeculationStats:
+    """What speculative prefetching of the next speaker's turn saved, and what it wasted."""
+    rounds: int = 0
+    started: int = 0
+    hits: int = 0
+    misses: int = 0
+    stale: int = 0
+    failed: int = 0
+    saved_seconds: float = 0.0
+    wasted_prompt_tokens: int = 0
+    wasted_completion_tokens: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """The share of selector calls whose chosen speaker had its turn prefetched."""
+        return self.hits / self.rounds if self.rounds else 0.0
+
+    def report(self) -> str:
+        """
+        Builds a summary of the speculative turns.
+
+        Returns:
+            The report text. Tokens of calls cancelled in flight are estimated from their prompts.
+        """
+        return "\n".join([
+            "--- Speculative Prefetch ---",
+            f"  Selector calls speculated on: {self.rounds} ({self.started} turns started)",
+            f"  Used: {self.hits} ({self.hit_rate:.0%}), ~{self.saved_seconds:.2f}s of member time hidden",
+            f"  Discarded: {self.misses} for another speaker, {self.stale} with a changed prompt, {self.failed} failed",
+            f"  Wasted: ~{self.wasted_prompt_tokens} prompt and {self.wasted_completion_tokens} completion tokens",
+        ])
+
+
+@dataclass
+class _Speculation:
+    messages: List[LLMMessage]
+    tools: List[Any]
+    prompt_tokens: int
+    task: "asyncio.Task[CreateResult]"
+    token: CancellationToken
+    started: float = field(default_factory=time.perf_counter)
+    finished: Optional[float] = None
+
+    def matches(self, messages: Sequence[LLMMessage], kwargs: Dict[str, Any]) -> bool:
+        """Whether a member's call asks for exactly what was prefetched."""
+        if kwargs.get("json_output") is not None or kwargs.get("extra_create_args") or \
+                kwargs.get("tool_choice", "auto") != "auto":
+            return False
+        return list(messages) == self.messages and list(kwargs.get("tools", [])) == self.tools
+
+
+@dataclass
+class _Member:
+    agent: AssistantAgent
+    client: "SpeculativeChatCompletionClient"
+
+
+class SpeculativePrefetcher:
+    """Starts the likely next speakers' turns while the selector model is still choosing.
+
+    When the selector model is about to be called, the `candidates` most likely members are predicted from how
+    often each member followed the last speaker in the session so far and from the classifier heuristic of
+    speaker_selection. Each one's completion starts with the prompt its agent would send. When the chosen member
+    calls its model, a prefetched completion is used if its prompt is exactly the same, and every other one is
+    cancelled through its CancellationToken. A speculative turn therefore never changes what a member says;
+    it only saves the time the member would have waited, at the price of the tokens of the discarded calls.
+    """
+
+    def __init__(self, candidates: int = 1, stats: Optional[SpeculationStats] = None, history_weight: float = 0.5):
+        """
+        Args:
+            candidates (int): How many members' turns to start per selector call.
+            stats (Optional[SpeculationStats]): Where to record hits, misses and wasted tokens.
+            history_weight (float): How much the observed speaker order counts against the classifier, 0 to 1.
+
+        Raises:
+            ValueError: If candidates is less than one or history_weight is outside 0 to 1.
+        """
+        if candidates < 1:
+            raise ValueError(f"candidates must be at least 1, got {candidates}")
+        if not 0.0 <= history_weight <= 1.0:
+            raise ValueError(f"history_weight must be between 0 and 1, got {history_weight}")
+        self.candidates = candidates
+        self.stats = stats if stats is not None else SpeculationStats()
+        self.history_weight = history_weight
+        self._clients: Dict[str, SpeculativeChatCompletionClient] = {}
+        self._members: Dict[str, _Member] = {}
+        self._participants: List[Participant] = []
+        self._classifier: Optional[ClassifierSelector] = None
+        self._pending: Dict[str, _Speculation] = {}
+        self._cancelled: Set["asyncio.Task[CreateResult]"] = set()
+
+    def wrap_client(self, client: ChatCompletionClient, name: str) -> "SpeculativeChatCompletionClient":
+        """
+        Wraps a member's model client, so its calls can use the member's prefetched turns.
+
+        Args:
+            client (ChatCompletionClient): The member's client.
+            name (str): The member's name.
+
+        Returns:
+            The client to give the member's agent.
+        """
+        wrapped = SpeculativeChatCompletionClient(client, self, name)
+        self._clients[name] = wrapped
+        return wrapped
+
+    def add_member(self, agent: AssistantAgent, participant: Participant) -> None:
+        """
+        Adds a member whose turns can be prefetched. Its model client must come from wrap_client().
+
+        Args:
+            agent (AssistantAgent): The member's agent.
+            participant (Participant): The member as seen by the prediction.
+
+        Raises:
+            ValueError: If no client was wrapped for the member.
+            RuntimeError: If the installed AutoGen no longer keeps the agent state the prompts are built from.
+        """
+        check_agent(agent)
+        client = self._clients.get(agent.name)
+        if client is None:
+            raise ValueError(f"No model client was wrapped for {agent.name}")
+        self._members[agent.name] = _Member(agent, client)
+        self._participants.append(participant)
+        self._classifier = None
+
+    def wrap_selector(
+        self, selector_func: Optional[Callable[[Thread], Optional[str]]]
+    ) -> Callable[[Thread], Awaitable[Optional[str]]]:
+        """
+        Wraps SelectorGroupChat's `selector_func` so turns are prefetched whenever the selector model is asked.
+
+        Args:
+            selector_func (Optional[Callable[[Thread], Optional[str]]]): The heuristic selector, or None.
+
+        Returns:
+            An async selector function that picks as `selector_func` does.
+        """
+        async def select(thread: Thread) -> Optional[str]:
+            speaker = selector_func(thread) if selector_func is not None else None
+            if speaker is None:
+                await self.prefetch(thread)
+            return speaker
+
+        return select
+
+    def predict(self, thread: Thread) -> List[str]:
+        """
+        Ranks the members as the next speaker.
+
+        Args:
+            thread (Thread): The messages so far.
+
+        Returns:
+            The `candidates` most likely members, most likely first.
+        """
+        if not self._participants:
+            return []
+        if self._classifier is None:
+            self._classifier = ClassifierSelector(self._participants)
+        scores = self._classifier.probabilities(thread)
+        sources = [message.source for message in thread if isinstance(message, BaseChatMessage)]
+        if len(sources) > 1:
+            followers = Counter(sources[i + 1] for i in range(len(sources) - 1) if sources[i] == sources[-1])
+            total = sum(count for name, count in followers.items() if name in scores)
+            if total:
+                scores = {
+                    name: (1 - self.history_weight) * score + self.history_weight * followers[name] / total
+                    for name, score in scores.items()
+                }
+        names = [participant.name for participant in self._participants]
+        return sorted(names, key=lambda name: -scores.get(name, 0.0))[:self.candidates]
+
+    async def prefetch(self, thread: Thread) -> None:
+        """
+        Starts the predicted members' turns. Turns still pending from the last selector call are discarded.
+
+        Args:
+            thread (Thread): The messages so far.
+        """
+        self.cancel_all()
+        self.stats.rounds += 1
+        turns = [message for message in thread if isinstance(message, BaseChatMessage)]
+        for name in self.predict(thread):
+            member = self._members[name]
+            messages = await self._prompt(member, turns)
+            if messages is None:
+                continue
+            tools = await model_call_tools(member.agent)
+            inner = member.client.inner
+            token = CancellationToken()
+            speculation = _Speculation(
+                messages, tools, inner.count_tokens(messages, tools=tools),
+                asyncio.ensure_future(inner.create(messages, tools=tools, cancellation_token=token)), token,
+            )
+            speculation.task.add_done_callback(lambda task, s=speculation: self._on_done(task, s))
+            self._pending[name] = speculation
+            self.stats.started += 1
+
+    async def _prompt(self, member: _Member, turns: Sequence[BaseChatMessage]) -> Optional[List[LLMMessage]]:
+        """The messages the member would send if it were asked to speak now, or None if that can't be known."""
+        agent = member.agent
+        context = agent.model_context
+        if isinstance(context, SummarizingChatCompletionContext):
+            # Its get_messages() may call the model to summarise; speculating would pay for that twice.
+            return None
+        # The agent receives the messages since its last turn, and adds them to its context before calling.
+        last = max((i for i, message in enumerate(turns) if message.source == agent.name), default=-1)
+        state = await context.save_state()
+        try:
+            for message in turns[last + 1:]:
+                await context.add_message(message.to_model_message())
+            history = await context.get_messages()
+        finally:
+            await context.load_state(state)
+        return model_call_messages(agent, member.client, history)
+
+    def claim(self, name: str, messages: Sequence[LLMMessage], kwargs: Dict[str, Any]) -> Optional[_Speculation]:
+        """
+        Takes a member's prefetched turn for its call, if the call asks for the same thing, and discards the
+        other members' turns.
+
+        Args:
+            name (str): The member making the call.
+            messages (Sequence[LLMMessage]): The call's messages.
+            kwargs (Dict[str, Any]): The call's other arguments.
+
+        Returns:
+            The prefetched turn, or None to make the call.
+        """
+        speculation = self._pending.pop(name, None)
+        self.cancel_all()
+        if speculation is None:
+            return None
+        if not speculation.matches(messages, kwargs):
+            self.stats.stale += 1
+            registry.inc("parliament_speculations_total", outcome="stale")
+            self._discard(speculation)
+            return None
+        return speculation
+
+    def record_hit(self, speculation: _Speculation, claimed: float) -> None:
+        """Records a used turn, and the time the member did not have to wait for it."""
+        finished = speculation.finished if speculation.finished is not None else time.perf_counter()
+        self.stats.hits += 1
+        self.stats.saved_seconds += max(min(claimed, finished) - speculation.started, 0.0)
+        registry.inc("parliament_speculations_total", outcome="hit")
+
+    def record_failure(self) -> None:
+        self.stats.failed += 1
+        registry.inc("parliament_speculations_total", outcome="failed")
+
+    def cancel_all(self) -> None:
+        """Discards every pending turn."""
+        pending = list(self._pending.values())
+        self._pending.clear()
+        for speculation in pending:
+            self.stats.misses += 1
+            registry.inc("parliament_speculations_total", outcome="miss")
+            self._discard(speculation)
+
+    async def close(self) -> None:
+        """Discards every pending turn and waits for the cancelled calls to end."""
+        self.cancel_all()
+        await asyncio.gather(*self._cancelled, return_exceptions=True)
+        self._cancelled.clear()
+
+    def _discard(self, speculation: _Speculation) -> None:
+        """Cancels a turn that won't be used, and counts its tokens as wasted."""
+        task = speculation.task
+        prompt_tokens = completion_tokens = 0
+        if not task.done():
+            speculation.token.cancel()
+            task.cancel()
+            self._cancelled.add(task)
+            task.add_done_callback(self._cancelled.discard)
+            prompt_tokens = speculation.prompt_tokens
+        elif not task.cancelled() and task.exception() is None:
+            usage = task.result().usage
+            prompt_tokens, completion_tokens = usage.prompt_tokens, usage.completion_tokens
+        self.stats.wasted_prompt_tokens += prompt_tokens
+        self.stats.wasted_completion_tokens += completion_tokens
+        registry.inc("parliament_speculative_wasted_tokens_total", prompt_tokens + completion_tokens)
+
+    @staticmethod
+    def _on_done(task: "asyncio.Task[CreateResult]", speculation: _Speculation) -> None:
+        speculation.finished = time.perf_counter()
+        if not task.cancelled():
+            # A failed speculative call is only a miss; retrieving its error keeps asyncio from logging it.
+            task.exception()
+
+
+class SpeculativeChatCompletionClient(DelegatingChatCompletionClient):
+    """A member's model client that answers from the member's prefetched turn when there is one."""
+
+    def __init__(self, inner: ChatCompletionClient, prefetcher: SpeculativePrefetcher, name: str):
+        """
+        Args:
+            inner (ChatCompletionClient): The member's client.
+            prefetcher (SpeculativePrefetcher): The prefetcher that starts the member's turns.
+            name (str): The member's name.
+        """
+        super().__init__(inner)
+        self.prefetcher = prefetcher
+        self.name = name
+
+    async def close(self) -> None:
+        # The inner client is shared through the AgentsFactory pool, which closes it.
+        pass
+
+    async def create(self, messages: Sequence[LLMMessage], **kwargs: Any) -> CreateResult:  # type: ignore[override]
+        speculation = self.prefetcher.claim(self.name, messages, kwargs)
+        if speculation is not None:
+            claimed = time.perf_counter()
+            cancellation_token: Optional[CancellationToken] = kwargs.get("cancellation_token")
+            if cancellation_token is not None:
+                cancellation_token.link_future(speculation.task)
+            try:
+                result = await speculation.task
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # The prefetched call failed; make it again, with the retries of the member's own call.
+                self.prefetcher.record_failure()
+            else:
+                self.prefetcher.record_hit(speculation, claimed)
+                return result
+        return await super().create(messages, **kwargs)
@@ -0,0 +1,84 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Optional, Sequence
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Modules that should only be imported once a client or exporter is actually requested.
+LAZY_MODULES = ['openai', 'autogen_ext.models.openai', 'opentelemetry.sdk', 'opentelemetry.instrumentation']
+
+# The entry points measured by default, with their import-time budget in seconds.
+DEFAULT_BUDGETS: Dict[str, float] = {
+    'debug_env': 0.5,
+    'personas_util': 0.5,
+    'agents_factory': 1.5,
+    'main': 2.5,
+    'batch_runner': 2.5,
+}
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [name for name in {lazy!r} if name in sys.modules]}}))
+"""
+
+
+def measure_import(module: str, repeat: int = 3) -> Dict[str, object]:
+    """
+    Imports a module in fresh interpreters and times it.
+
+    Args:
+        module (str): The module name, importable from src/.
+        repeat (int): The number of fresh interpreters to time.
+
+    Returns:
+        A dictionary with the median 'seconds', all 'samples', and the LAZY_MODULES that got 'loaded'.
+
+    Raises:
+        RuntimeError: If the import fails.
+    """
+    samples: List[float] = []
+    loaded: List[str] = []
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    for _ in range(repeat):
+        completed = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(module=module, lazy=LAZY_MODULES)],
+            cwd=SRC_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        if completed.returncode != 0:
+            raise RuntimeError(f"Importing {module} failed:\n{completed.stderr}")
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        samples.append(result["seconds"])
+        loaded = result["loaded"]
+    return {"seconds": statistics.median(samples), "samples": samples, "loaded": loaded}
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Prints the import time of each entry point and returns 1 if one is over budget or loads a lazy module."""
+    parser = argparse.ArgumentParser(description="Measure the import time of the CLI entry points.")
+    parser.add_argument('modules', nargs='*', help="Modules to measure. Defaults to the main entry points.")
+    parser.add_argument('--repeat', type=int, default=3, help="Fresh interpreters per module.")
+    args = parser.parse_args(argv)
+
+    failed = False
+    for module in args.modules or list(DEFAULT_BUDGETS):
+        result = measure_import(module, repeat=args.repeat)
+        budget = DEFAULT_BUDGETS.get(module)
+        over = budget is not None and result["seconds"] > budget  # type: ignore[operator]
+        failed = failed or over or bool(result["loaded"])
+        status = "OVER BUDGET" if over else "ok"
+        print(f"{module:<16} {result['seconds']:.3f}s (budget {budget}s) {status}  eager: {result['loaded'] or '-'}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
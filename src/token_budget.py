@@ -0,0 +1,300 @@
+import contextvars
+import logging
+from dataclasses import asdict, dataclass
+from typing import Any, AsyncGenerator, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+from autogen_agentchat.base import TerminatedException, TerminationCondition
+from autogen_agentchat.messages import BaseAgentEvent, BaseChatMessage, StopMessage
+from autogen_core import EVENT_LOGGER_NAME
+from autogen_core.logging import LLMCallEvent
+from autogen_core.models import ChatCompletionClient, CreateResult, LLMMessage, RequestUsage
+
+from client_wrappers import DelegatingChatCompletionClient
+
+# USD per one million (prompt, completion) tokens, keyed by provider. An optional third price is charged for
+# prompt tokens the provider served from its prompt cache; without it they cost the prompt price.
+Prices = Mapping[str, Tuple[float, ...]]
+
+
+def prices_from_settings(personas: Mapping[str, Any]) -> Dict[str, Tuple[float, ...]]:
+    """
+    Reads the `[settings.pricing]` table of the personas configuration.
+
+    Args:
+        personas (Mapping[str, Any]): The parsed configuration, as returned by PersonasUtil.get_all_personas().
+
+    Returns:
+        USD per million (prompt, completion[, cached prompt]) tokens for each provider listed.
+
+    Raises:
+        ValueError: If an entry is not a [prompt, completion] or [prompt, completion, cached prompt] list of numbers.
+    """
+    pricing = personas.get('settings', {}).get('pricing', {})
+    prices: Dict[str, Tuple[float, ...]] = {}
+    for provider, pair in pricing.items():
+        if not isinstance(pair, list) or len(pair) not in (2, 3):
+            raise ValueError(f"settings.pricing.{provider} must be a [prompt, completion] pair")
+        prices[provider] = tuple(float(price) for price in pair)
+    return prices
+
+
+def cached_prompt_tokens(response: Mapping[str, Any]) -> int:
+    """
+    Reads the prompt tokens a provider served from its prompt cache out of a raw response.
+
+    Args:
+        response (Mapping[str, Any]): The response as logged by the model client, e.g. an OpenAI ChatCompletion dump.
+
+    Returns:
+        OpenAI's `usage.prompt_tokens_details.cached_tokens`, or Anthropic's `usage.cache_read_input_tokens`, or 0.
+    """
+    usage = response.get('usage') or {}
+    details = usage.get('prompt_tokens_details') or {}
+    return int(details.get('cached_tokens') or usage.get('cache_read_input_tokens') or 0)
+
+
+# Collects the cached prompt tokens of the model call made in the current context.
+_cached_tokens_sink: contextvars.ContextVar[Optional[List[int]]] = contextvars.ContextVar(
+    '_cached_tokens_sink', default=None
+)
+
+
+class _CachedTokensHandler(logging.Handler):
+    """Picks the cached prompt tokens out of the LLMCallEvents AutoGen's model clients log.
+
+    CreateResult has no field for them, but the logged event carries the provider's full response. The handler
+    only sees the events the event logger lets through, so they are counted once it is enabled for INFO.
+    """
+
+    def emit(self, record: logging.LogRecord) -> None:
+        sink = _cached_tokens_sink.get()
+        if sink is not None and isinstance(record.msg, LLMCallEvent):
+            sink.append(cached_prompt_tokens(record.msg.kwargs.get('response') or {}))
+
+
+_cached_tokens_handler = _CachedTokensHandler()
+
+
+def _install_cached_tokens_handler() -> None:
+    logger = logging.getLogger(EVENT_LOGGER_NAME)
+    if _cached_tokens_handler not in logger.handlers:
+        logger.addHandler(_cached_tokens_handler)
+
+
+def track_prompt_cache() -> None:
+    """
+    Enables AutoGen's event logger for INFO, so the prompt tokens providers serve from their prompt caches are
+    counted. Without it they are reported as 0.
+
+    The events then also reach the handlers of the event logger and its parents; applications that configure
+    logging should call it only if those handlers drop or want the events.
+    """
+    logger = logging.getLogger(EVENT_LOGGER_NAME)
+    if not logger.isEnabledFor(logging.INFO):
+        logger.setLevel(logging.INFO)
+
+
+@dataclass
+class AgentUsage:
+    """The tokens and cost used by one agent (or the selector) in a session."""
+    provider: str = ""
+    calls: int = 0
+    cached_calls: int = 0
+    prompt_tokens: int = 0
+    cached_prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost: float = 0.0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+
+class SessionUsage:
+    """Per-agent token and cost accounting for one parliament session.
+
+    Fed by UsageTrackingChatCompletionClient, so it also covers the selector's calls, which never show up
+    in the team's messages.
+    """
+
+    def __init__(self, prices: Optional[Prices] = None):
+        """
+        Args:
+            prices (Optional[Prices]): USD per million prompt and completion tokens for each provider.
+                                       Providers without a price cost nothing.
+        """
+        self.prices: Dict[str, Tuple[float, ...]] = dict(prices or {})
+        self.agents: Dict[str, AgentUsage] = {}
+
+    def record(
+        self, agent: str, provider: str, usage: RequestUsage, cached: bool = False, cached_prompt_tokens: int = 0
+    ) -> None:
+        """
+        Adds one model call to an agent's totals. Cached responses count as calls but cost no tokens.
+
+        Args:
+            agent (str): The agent name.
+            provider (str): The provider the call went to.
+            usage (RequestUsage): The usage reported by the model client.
+            cached (bool): Whether the response came from a cache.
+            cached_prompt_tokens (int): The prompt tokens the provider served from its prompt cache.
+        """
+        entry = self.agents.setdefault(agent, AgentUsage(provider=provider))
+        entry.calls += 1
+        if cached:
+            entry.cached_calls += 1
+            return
+        cached_prompt_tokens = min(cached_prompt_tokens, usage.prompt_tokens)
+        entry.prompt_tokens += usage.prompt_tokens
+        entry.cached_prompt_tokens += cached_prompt_tokens
+        entry.completion_tokens += usage.completion_tokens
+        prompt_price, completion_price, *cached_price = self.prices.get(provider, (0.0, 0.0))
+        entry.cost += (
+            (usage.prompt_tokens - cached_prompt_tokens) * prompt_price
+            + cached_prompt_tokens * (cached_price[0] if cached_price else prompt_price)
+            + usage.completion_tokens * completion_price
+        ) / 1_000_000
+
+    def dump(self) -> Dict[str, Dict[str, Any]]:
+        """The per-agent totals, as JSON-serialisable data for load()."""
+        return {agent: asdict(entry) for agent, entry in self.agents.items()}
+
+    def load(self, data: Mapping[str, Mapping[str, Any]]) -> None:
+        """Adds the totals from dump() to this session's, e.g. what a resumed session spent before it stopped."""
+        for agent, fields in data.items():
+            restored = AgentUsage(**fields)
+            entry = self.agents.setdefault(agent, AgentUsage(provider=restored.provider))
+            entry.calls += restored.calls
+            entry.cached_calls += restored.cached_calls
+            entry.prompt_tokens += restored.prompt_tokens
+            entry.cached_prompt_tokens += restored.cached_prompt_tokens
+            entry.completion_tokens += restored.completion_tokens
+            entry.cost += restored.cost
+
+    @property
+    def total_tokens(self) -> int:
+        return sum(entry.total_tokens for entry in self.agents.values())
+
+    @property
+    def total_cost(self) -> float:
+        return sum(entry.cost for entry in self.agents.values())
+
+    @property
+    def prompt_cache_hit_rate(self) -> float:
+        """The share of prompt tokens the providers served from their prompt caches."""
+        prompt_tokens = sum(entry.prompt_tokens for entry in self.agents.values())
+        cached = sum(entry.cached_prompt_tokens for entry in self.agents.values())
+        return cached / prompt_tokens if prompt_tokens else 0.0
+
+    def report(self) -> str:
+        """
+        Builds a summary table of the session, most expensive agent first.
+
+        Returns:
+            The report text.
+        """
+        lines: List[str] = ["--- Token Usage ---"]
+        ranked = sorted(self.agents.items(), key=lambda item: (item[1].cost, item[1].total_tokens), reverse=True)
+        for agent, entry in ranked:
+            lines.append(
+                f"  - {agent} ({entry.provider}): {entry.calls} calls ({entry.cached_calls} cached), "
+                f"{entry.prompt_tokens} prompt ({entry.cached_prompt_tokens} from prompt cache) + "
+                f"{entry.completion_tokens} completion tokens, ${entry.cost:.4f}"
+            )
+        lines.append(f"  Total: {self.total_tokens} tokens, ${self.total_cost:.4f}, "
+                     f"{self.prompt_cache_hit_rate:.0%} of prompt tokens from provider prompt caches")
+        return "\n".join(lines)
+
+
+class UsageTrackingChatCompletionClient(DelegatingChatCompletionClient):
+    """A model client that reports the usage of every call to a SessionUsage under an agent's name.
+
+    The prompt tokens the provider served from its prompt cache are read from the LLMCallEvent the inner client
+    logs, which AutoGen's OpenAI-compatible clients only do for non-streaming calls, and only while the event
+    logger is enabled for INFO (see track_prompt_cache()).
+    """
+
+    def __init__(self, inner: ChatCompletionClient, usage: SessionUsage, agent: str, provider: str = ""):
+        """
+        Args:
+            inner (ChatCompletionClient): The client to forward calls to.
+            usage (SessionUsage): The session accounting to report to.
+            agent (str): The agent the calls are attributed to.
+            provider (str): The provider name used for pricing. Defaults to the inner client's
+                            `provider` attribute (set by routed clients), if any.
+        """
+        super().__init__(inner)
+        self.usage = usage
+        self.agent = agent
+        self.provider = provider or getattr(inner, 'provider', '')
+        _install_cached_tokens_handler()
+
+    async def close(self) -> None:
+        # The inner client is shared through the AgentsFactory pool, which closes it.
+        pass
+
+    async def create(self, messages: Sequence[LLMMessage], **kwargs: Any) -> CreateResult:  # type: ignore[override]
+        sink: List[int] = []
+        reset = _cached_tokens_sink.set(sink)
+        try:
+            result = await super().create(messages, **kwargs)
+        finally:
+            _cached_tokens_sink.reset(reset)
+        # A retried call logs an event per attempt; the last one is the response returned.
+        self.usage.record(
+            self.agent, self.provider, result.usage, cached=result.cached, cached_prompt_tokens=sink[-1] if sink else 0
+        )
+        return result
+
+    async def create_stream(  # type: ignore[override]
+        self, messages: Sequence[LLMMessage], **kwargs: Any
+    ) -> AsyncGenerator[Union[str, CreateResult], None]:
+        async for chunk in super().create_stream(messages, **kwargs):
+            if isinstance(chunk, CreateResult):
+                self.usage.record(self.agent, self.provider, chunk.usage, cached=chunk.cached)
+            yield chunk
+
+
+class TokenBudgetTermination(TerminationCondition):
+    """Stops the discussion once the session has used `max_total_tokens` tokens or `max_cost` USD."""
+
+    def __init__(self, usage: SessionUsage, max_total_tokens: Optional[int] = None, max_cost: Optional[float] = None):
+        """
+        Args:
+            usage (SessionUsage): The session accounting to check.
+            max_total_tokens (Optional[int]): The token budget, including the selector's calls.
+            max_cost (Optional[float]): The cost budget in USD.
+
+        Raises:
+            ValueError: If neither budget is given.
+        """
+        if max_total_tokens is None and max_cost is None:
+            raise ValueError("At least one of max_total_tokens or max_cost must be provided")
+        self.usage = usage
+        self.max_total_tokens = max_total_tokens
+        self.max_cost = max_cost
+        self._terminated = False
+
+    @property
+    def terminated(self) -> bool:
+        return self._terminated
+
+    def over_budget(self) -> bool:
+        """Whether the session has used up its budget."""
+        return (self.max_total_tokens is not None and self.usage.total_tokens >= self.max_total_tokens) or (
+            self.max_cost is not None and self.usage.total_cost >= self.max_cost
+        )
+
+    async def __call__(self, messages: Sequence[BaseAgentEvent | BaseChatMessage]) -> StopMessage | None:
+        if self._terminated:
+            raise TerminatedException("Termination condition has already been reached")
+        if not self.over_budget():
+            return None
+        self._terminated = True
+        return StopMessage(
+            content=f"Budget reached: {self.usage.total_tokens} tokens, ${self.usage.total_cost:.4f}.",
+            source="TokenBudgetTermination",
+        )
+
+    async def reset(self) -> None:
+        self._terminated = False
@@ -0,0 +1,220 @@
+import asyncio
+import functools
+import inspect
+import json
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+from autogen_core.tools import FunctionTool
+
+from metrics import registry
+from response_cache import LRUCacheStore
+
+
+@dataclass
+class ToolStats:
+    """How many tool calls the agents made, and how many of them a memoised result answered."""
+    calls: int = 0
+    hits: int = 0
+    errors: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.calls if self.calls else 0.0
+
+    def report(self) -> str:
+        """A one-line summary of the tool calls."""
+        return (
+            f"--- Tools ---\n{self.calls} tool calls, {self.hits} answered from memoised results "
+            f"({self.hit_rate:.0%}), {self.errors} failed."
+        )
+
+
+class ToolResultCache:
+    """Memoised tool results, keyed by tool name and arguments.
+
+    Calls with the same key that arrive while the first one is still running wait for its result instead of
+    calling the tool again, so members that ask at the same time still cause a single call. Failed calls are
+    not memoised.
+    """
+
+    def __init__(self, ttl_seconds: Optional[float] = None, max_entries: int = 1024, stats: Optional[ToolStats] = None):
+        """
+        Args:
+            ttl_seconds (Optional[float]): How long a result stays valid. None keeps results for the cache's lifetime.
+            max_entries (int): The maximum number of memoised results.
+            stats (Optional[ToolStats]): Where to count the calls and hits.
+        """
+        self._store = LRUCacheStore(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self._in_flight: Dict[str, "asyncio.Future[Any]"] = {}
+        self.stats = stats if stats is not None else ToolStats()
+
+    async def get_or_call(self, tool: str, key: str, call: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Returns the memoised result for a key, or awaits `call` and memoises its result.
+
+        Args:
+            tool (str): The tool's name, for the metrics.
+            key (str): The tool name and canonical arguments.
+            call (Callable[[], Awaitable[Any]]): Runs the tool.
+
+        Returns:
+            The tool's result.
+        """
+        self.stats.calls += 1
+        entry = self._store.get(key)
+        if entry is not None:
+            self.stats.hits += 1
+            registry.inc("parliament_tool_calls_total", tool=tool, result="hit")
+            return entry[0]
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            self.stats.hits += 1
+            registry.inc("parliament_tool_calls_total", tool=tool, result="hit")
+            return await asyncio.shield(in_flight)
+
+        future: "asyncio.Future[Any]" = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            result = await call()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            self.stats.errors += 1
+            registry.inc("parliament_tool_calls_total", tool=tool, result="error")
+            future.set_exception(e)
+            # Only waiters see the exception; retrieving it keeps the loop from logging it when there are none.
+            future.exception()
+            raise
+        else:
+            # Results are wrapped in a tuple, so a tool that returns None is still memoised.
+            self._store.set(key, (result,))  # type: ignore[arg-type]
+            registry.inc("parliament_tool_calls_total", tool=tool, result="miss")
+            future.set_result(result)
+            return result
+        finally:
+            del self._in_flight[key]
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+
+@dataclass
+class _RegisteredTool:
+    func: Callable[..., Any]
+    name: str
+    description: str
+    memoize: bool
+
+
+class ToolRegistry:
+    """The tools the parliament members can call.
+
+    Tools are plain functions, registered once and attached to the agents of each session by create_tools().
+    AssistantAgent already runs the tool calls of one model response concurrently; the registry adds the
+    memoisation that keeps members from repeating each other's lookups. By default each session gets a fresh
+    cache, so results are shared by its members but never outlive it. With `ttl_seconds`, one cache is shared
+    by every session, and results are reused across sessions until they expire.
+    """
+
+    def __init__(self, ttl_seconds: Optional[float] = None, max_entries: int = 1024):
+        """
+        Args:
+            ttl_seconds (Optional[float]): How long results are shared across sessions. None memoises per session.
+            max_entries (int): The maximum number of memoised results per cache.
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.stats = ToolStats()
+        self._tools: Dict[str, _RegisteredTool] = {}
+        self._shared: Optional[ToolResultCache] = (
+            ToolResultCache(ttl_seconds, max_entries, self.stats) if ttl_seconds is not None else None
+        )
+
+    def register(
+        self,
+        func: Callable[..., Any],
+        name: Optional[str] = None,
+        description: Optional[str] = None,
+        memoize: bool = True,
+    ) -> Callable[..., Any]:
+        """
+        Registers a function as a tool. Can be used as a decorator.
+
+        Args:
+            func (Callable[..., Any]): The tool, sync or async, with type-annotated arguments.
+            name (Optional[str]): The tool name the model sees. Defaults to the function's name.
+            description (Optional[str]): What the tool does. Defaults to the function's docstring.
+            memoize (bool): Whether results are memoised. Turn it off for tools with side effects.
+
+        Returns:
+            The function, unchanged.
+
+        Raises:
+            ValueError: If a tool with the same name is already registered.
+        """
+        tool_name = name or func.__name__
+        if tool_name in self._tools:
+            raise ValueError(f"Tool '{tool_name}' is already registered")
+        self._tools[tool_name] = _RegisteredTool(
+            func, tool_name, description or inspect.getdoc(func) or tool_name, memoize
+        )
+        return func
+
+    @property
+    def names(self) -> List[str]:
+        return list(self._tools)
+
+    def __len__(self) -> int:
+        return len(self._tools)
+
+    def session_cache(self) -> ToolResultCache:
+        """The cache for a new session: the shared one with a TTL, otherwise a fresh one."""
+        if self._shared is not None:
+            return self._shared
+        return ToolResultCache(max_entries=self.max_entries, stats=self.stats)
+
+    def create_tools(
+        self, cache: Optional[ToolResultCache] = None, names: Optional[Sequence[str]] = None
+    ) -> List[FunctionTool]:
+        """
+        Creates the tools for the agents of one session.
+
+        Args:
+            cache (Optional[ToolResultCache]): Where to memoise results. Defaults to session_cache().
+            names (Optional[Sequence[str]]): The tools to create. None creates all of them.
+
+        Returns:
+            One FunctionTool per tool, all memoising into the same cache.
+
+        Raises:
+            KeyError: If a name is not registered.
+        """
+        cache = cache if cache is not None else self.session_cache()
+        selected = [self._tools[name] for name in names] if names is not None else list(self._tools.values())
+        return [FunctionTool(_memoized(tool, cache), tool.description, name=tool.name) for tool in selected]
+
+
+def _memoized(tool: _RegisteredTool, cache: ToolResultCache) -> Callable[..., Awaitable[Any]]:
+    """Wraps a tool in an async function with the same signature that memoises into `cache`."""
+    signature = inspect.signature(tool.func)
+
+    async def call_tool(*args: Any, **kwargs: Any) -> Any:
+        if inspect.iscoroutinefunction(tool.func):
+            return await tool.func(*args, **kwargs)
+        # Sync tools run in a thread, as FunctionTool would run them, so they don't block the other calls.
+        return await asyncio.to_thread(tool.func, *args, **kwargs)
+
+    @functools.wraps(tool.func)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        if not tool.memoize:
+            return await call_tool(*args, **kwargs)
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        # The token differs per call, but not what the call returns.
+        bound.arguments.pop("cancellation_token", None)
+        key = f"{tool.name}:{json.dumps(bound.arguments, sort_keys=True, default=str)}"
+        return await cache.get_or_call(tool.name, key, lambda: call_tool(*args, **kwargs))
+
+    return wrapper
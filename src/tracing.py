@@ -0,0 +1,177 @@
+import os
+import time
+from typing import TYPE_CHECKING, Any, AsyncGenerator, Dict, Optional, Sequence, Union
+
+from opentelemetry import trace
+from autogen_core.models import ChatCompletionClient, CreateResult, LLMMessage
+
+from client_wrappers import DelegatingChatCompletionClient
+
+if TYPE_CHECKING:
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SpanExporter
+
+# 'off': no tracing at all. 'console': every span printed synchronously (development only).
+# 'batch': console output through a background batching processor. 'file': batched JSONL spans in a file.
+# 'otlp': batched OTLP/HTTP export, e.g. to a local collector.
+TRACING_MODES = ['off', 'console', 'batch', 'file', 'otlp']
+
+tracer = trace.get_tracer(__name__)
+
+
+def _create_otlp_exporter(endpoint: Optional[str]) -> "SpanExporter":
+    try:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter  # type: ignore
+    except ImportError as e:
+        raise ImportError(
+            "Tracing mode 'otlp' needs the opentelemetry-exporter-otlp-proto-http package."
+        ) from e
+    return OTLPSpanExporter(endpoint=endpoint) if endpoint else OTLPSpanExporter()
+
+
+def setup_tracing(
+    mode: str = 'console',
+    sample_ratio: float = 1.0,
+    file_path: str = 'traces.jsonl',
+    otlp_endpoint: Optional[str] = None,
+    instrument_openai: bool = True,
+) -> Optional["TracerProvider"]:
+    """
+    Installs the global tracer provider for a tracing mode.
+
+    The OpenTelemetry SDK and the OpenAI instrumentation are only imported here, so 'off' costs nothing.
+
+    Args:
+        mode (str): One of TRACING_MODES.
+        sample_ratio (float): The fraction of traces to keep, between 0 and 1. Child spans follow their parent.
+        file_path (str): The JSONL file used by the 'file' mode.
+        otlp_endpoint (Optional[str]): The OTLP/HTTP traces endpoint used by the 'otlp' mode, e.g.
+                                       'http://localhost:4318/v1/traces'. Defaults to the exporter's default.
+        instrument_openai (bool): Whether to trace the OpenAI SDK calls made by the model clients.
+
+    Returns:
+        The installed TracerProvider, or None in 'off' mode.
+
+    Raises:
+        ValueError: If the mode is unknown or the ratio is out of range.
+    """
+    if mode not in TRACING_MODES:
+        raise ValueError(f"Unknown tracing mode: {mode}. Expected one of {TRACING_MODES}")
+    if not 0.0 <= sample_ratio <= 1.0:
+        raise ValueError(f"sample_ratio must be between 0 and 1, got {sample_ratio}")
+    if mode == 'off':
+        return None
+
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter, SimpleSpanProcessor
+    from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+    tracer_provider = TracerProvider(sampler=ParentBased(TraceIdRatioBased(sample_ratio)))
+    if mode == 'console':
+        tracer_provider.add_span_processor(SimpleSpanProcessor(ConsoleSpanExporter()))
+    elif mode == 'batch':
+        tracer_provider.add_span_processor(BatchSpanProcessor(ConsoleSpanExporter()))
+    elif mode == 'file':
+        from span_exporters import JsonLinesSpanExporter
+        tracer_provider.add_span_processor(BatchSpanProcessor(JsonLinesSpanExporter(file_path)))
+    else:
+        tracer_provider.add_span_processor(BatchSpanProcessor(_create_otlp_exporter(otlp_endpoint)))
+    trace.set_tracer_provider(tracer_provider)
+
+    if instrument_openai:
+        from opentelemetry.instrumentation.openai_v2 import OpenAIInstrumentor  # type: ignore
+        OpenAIInstrumentor().instrument(tracer_provider=tracer_provider)
+    return tracer_provider
+
+
+def setup_tracing_from_env(default_mode: str = 'console') -> Optional["TracerProvider"]:
+    """
+    Installs tracing as configured by the TRACING_MODE, TRACING_SAMPLE_RATIO, TRACING_FILE and
+    OTEL_EXPORTER_OTLP_TRACES_ENDPOINT environment variables.
+
+    Args:
+        default_mode (str): The mode used when TRACING_MODE is not set.
+
+    Returns:
+        The installed TracerProvider, or None in 'off' mode.
+    """
+    return setup_tracing(
+        mode=os.getenv("TRACING_MODE", default_mode),
+        sample_ratio=float(os.getenv("TRACING_SAMPLE_RATIO", "1.0")),
+        file_path=os.getenv("TRACING_FILE", "traces.jsonl"),
+        otlp_endpoint=os.getenv("OTEL_EXPORTER_OTLP_TRACES_ENDPOINT"),
+    )
+
+
+class TurnTracer:
+    """Records one 'parliament.turn' span per speaker turn, from the end of the previous turn to this one."""
+
+    def __init__(self, topic: str):
+        """
+        Args:
+            topic (str): The session topic, added to every span.
+        """
+        self.topic = topic
+        self.turn = 0
+        self._last_turn_end = time.time_ns()
+
+    def record(self, msg: Any) -> None:
+        """
+        Records the turn that produced a message.
+
+        Args:
+            msg (Any): A message or event yielded by the group chat. Messages without a source are ignored.
+        """
+        source = getattr(msg, 'source', None)
+        if source is None or source == "user":
+            return
+        now = time.time_ns()
+        attributes: Dict[str, Any] = {
+            "parliament.topic": self.topic,
+            "parliament.turn": self.turn,
+            "parliament.speaker": source,
+            "parliament.message_type": type(msg).__name__,
+        }
+        usage = getattr(msg, 'models_usage', None)
+        if usage is not None:
+            attributes["gen_ai.usage.input_tokens"] = usage.prompt_tokens
+            attributes["gen_ai.usage.output_tokens"] = usage.completion_tokens
+        span = tracer.start_span("parliament.turn", start_time=self._last_turn_end, attributes=attributes)
+        span.end(end_time=now)
+        self._last_turn_end = now
+        self.turn += 1
+
+
+class TracingChatCompletionClient(DelegatingChatCompletionClient):
+    """A model client that wraps every call in a span, e.g. 'parliament.selector_decision'."""
+
+    def __init__(self, inner: ChatCompletionClient, span_name: str, attributes: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            inner (ChatCompletionClient): The client to forward calls to.
+            span_name (str): The name of the span created for each call.
+            attributes (Optional[Dict[str, Any]]): Attributes added to every span.
+        """
+        super().__init__(inner)
+        self.span_name = span_name
+        self.attributes = dict(attributes or {})
+
+    async def close(self) -> None:
+        # The inner client is shared through the AgentsFactory pool, which closes it.
+        pass
+
+    async def create(self, messages: Sequence[LLMMessage], **kwargs: Any) -> CreateResult:  # type: ignore[override]
+        with tracer.start_as_current_span(self.span_name, attributes=self.attributes) as span:
+            result = await super().create(messages, **kwargs)
+            span.set_attribute("gen_ai.usage.input_tokens", result.usage.prompt_tokens)
+            span.set_attribute("gen_ai.usage.output_tokens", result.usage.completion_tokens)
+            if isinstance(result.content, str):
+                span.set_attribute("parliament.response_preview", result.content.strip()[:64])
+            return result
+
+    async def create_stream(  # type: ignore[override]
+        self, messages: Sequence[LLMMessage], **kwargs: Any
+    ) -> AsyncGenerator[Union[str, CreateResult], None]:
+        with tracer.start_as_current_span(self.span_name, attributes=self.attributes):
+            async for chunk in super().create_stream(messages, **kwargs):
+                yield chunk
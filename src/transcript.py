@@ -0,0 +1,361 @@
+import argparse
+import gzip
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import IO, Any, Callable, Dict, Iterator, List, Mapping, Optional, Sequence
+
+from script_writer import format_turn
+from session_store import COMPLETED, RUNNING, topic_key
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS transcripts (
+    session_id TEXT PRIMARY KEY,
+    topic TEXT NOT NULL,
+    topic_key TEXT NOT NULL,
+    path TEXT NOT NULL,
+    status TEXT NOT NULL,
+    turns INTEGER NOT NULL DEFAULT 0,
+    prompt_tokens INTEGER NOT NULL DEFAULT 0,
+    completion_tokens INTEGER NOT NULL DEFAULT 0,
+    started_at REAL NOT NULL,
+    ended_at REAL
+);
+CREATE INDEX IF NOT EXISTS transcripts_by_topic ON transcripts (topic_key, started_at);
+CREATE INDEX IF NOT EXISTS transcripts_by_start ON transcripts (started_at);
+CREATE TABLE IF NOT EXISTS speakers (
+    speaker TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    turns INTEGER NOT NULL,
+    PRIMARY KEY (speaker, session_id)
+);
+"""
+
+
+def _open_text(path: str, mode: str) -> IO[str]:
+    """Opens a transcript file, gzip-compressed if its name ends in '.gz'."""
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")  # type: ignore[return-value]
+    return open(path, mode, encoding="utf-8")
+
+
+def render_script(turns: Sequence[Mapping[str, Any]]) -> str:
+    """
+    Renders transcript turns as the "source: content" text script.
+
+    Args:
+        turns (Sequence[Mapping[str, Any]]): Turn records, as returned by read_transcript().
+
+    Returns:
+        The script, as ScriptWriter would have written it.
+    """
+    return "".join(f"{turn['speaker']}: {turn['content']}\n\n" for turn in turns)
+
+
+def read_transcript(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Reads a transcript file.
+
+    Args:
+        path (str): The transcript, compressed or not.
+
+    Yields:
+        The session header first, then one record per turn. A transcript cut short by a crash, or still being
+        written, yields the records read so far; a line cut short is skipped.
+    """
+    with _open_text(path, "r") as f:
+        try:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+        except (EOFError, gzip.BadGzipFile):
+            # A gzip stream without its end-of-stream marker: everything flushed before it was read.
+            return
+
+
+@dataclass
+class TranscriptRecord:
+    """One indexed transcript."""
+    session_id: str
+    topic: str
+    path: str
+    status: str
+    turns: int
+    prompt_tokens: int
+    completion_tokens: int
+    started_at: float
+    ended_at: Optional[float]
+
+
+class TranscriptWriter:
+    """Appends one compact JSON record per speaker turn to a session's transcript.
+
+    Each record carries the turn index, speaker, timestamp, provider, latency (the time since the previous
+    turn ended) and token counts next to the content. Every turn is flushed as it is written; for compressed
+    transcripts that is a zlib sync flush, which keeps the compression dictionary, so a crash loses at most
+    the turn being written.
+    """
+
+    def __init__(
+        self, store: "TranscriptStore", session_id: str, path: str, provider_of: Optional[Callable[[str], str]]
+    ):
+        self.store = store
+        self.session_id = session_id
+        self.path = path
+        self.provider_of = provider_of
+        self.turns = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.speaker_turns: Dict[str, int] = {}
+        self._file: Optional[IO[str]] = None
+        self._last_turn_end = time.time()
+
+    def open(self, header: Mapping[str, Any]) -> "TranscriptWriter":
+        """Creates the transcript file and writes the session header."""
+        self._file = _open_text(self.path, "w")
+        self._write_line(header)
+        self._last_turn_end = header["started_at"]
+        return self
+
+    def write(self, msg: Any) -> bool:
+        """
+        Writes one message if it is a speaker turn.
+
+        Args:
+            msg (Any): A message or event yielded by the group chat.
+
+        Returns:
+            True if the message was written, False if it was filtered out.
+
+        Raises:
+            RuntimeError: If the writer is closed.
+        """
+        if self._file is None:
+            raise RuntimeError("TranscriptWriter is not open")
+        if format_turn(msg) is None:
+            return False
+        now = time.time()
+        record: Dict[str, Any] = {
+            "turn": self.turns,
+            "speaker": msg.source,
+            "ts": round(now, 3),
+            "latency_ms": round((now - self._last_turn_end) * 1000, 1),
+        }
+        provider = self.provider_of(msg.source) if self.provider_of is not None else None
+        if provider:
+            record["provider"] = provider
+        usage = getattr(msg, 'models_usage', None)
+        if usage is not None:
+            record["prompt_tokens"] = usage.prompt_tokens
+            record["completion_tokens"] = usage.completion_tokens
+            self.prompt_tokens += usage.prompt_tokens
+            self.completion_tokens += usage.completion_tokens
+        record["content"] = msg.content
+        self._write_line(record)
+        self._last_turn_end = now
+        self.speaker_turns[msg.source] = self.speaker_turns.get(msg.source, 0) + 1
+        self.turns += 1
+        return True
+
+    def close(self, status: str = COMPLETED) -> None:
+        """Closes the transcript and records its totals in the index."""
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        self.store._finish(self, status)
+
+    def _write_line(self, record: Mapping[str, Any]) -> None:
+        assert self._file is not None
+        self._file.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+        # For gzip files this ends in GzipFile.flush(), a Z_SYNC_FLUSH.
+        self._file.flush()
+
+
+class TranscriptStore:
+    """A directory of structured session transcripts with a SQLite index.
+
+    Every session gets its own JSONL file, gzip-compressed by default: a header line with the session id,
+    topic, members and start time, then one line per turn. The index records each transcript's topic, status,
+    totals and speakers, so sessions are found by topic or speaker without reading any transcript, and the
+    text script is rendered from the transcript only when it is asked for. Several processes can share a store.
+    """
+
+    def __init__(self, directory: str = "transcripts", compress: bool = True):
+        """
+        Args:
+            directory (str): Where the transcripts and index.sqlite are kept. Created if missing.
+            compress (bool): Whether new transcripts are gzip-compressed.
+        """
+        self.directory = directory
+        self.compress = compress
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        # Worker processes write to the same index; wait for their transactions rather than failing.
+        self._conn = sqlite3.connect(os.path.join(directory, "index.sqlite"), timeout=30, check_same_thread=False)
+        with self._conn:
+            self._conn.executescript(_SCHEMA)
+
+    def start(
+        self, topic: str, members: Sequence[str] = (), provider_of: Optional[Callable[[str], str]] = None
+    ) -> TranscriptWriter:
+        """
+        Starts the transcript of a new session.
+
+        Args:
+            topic (str): The topic.
+            members (Sequence[str]): The participant names, recorded in the header.
+            provider_of (Optional[Callable[[str], str]]): Returns a speaker's provider, looked up at every turn,
+                                                          e.g. from SessionUsage. None leaves it out.
+
+        Returns:
+            The open writer. Close it to record the session's totals.
+        """
+        session_id = uuid.uuid4().hex
+        path = os.path.join(self.directory, f"{session_id}.jsonl" + (".gz" if self.compress else ""))
+        started_at = time.time()
+        writer = TranscriptWriter(self, session_id, path, provider_of)
+        writer.open({"session_id": session_id, "topic": topic, "members": list(members), "started_at": started_at})
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO transcripts (session_id, topic, topic_key, path, status, started_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (session_id, topic, topic_key(topic), os.path.basename(path), RUNNING, started_at),
+            )
+        return writer
+
+    def _finish(self, writer: TranscriptWriter, status: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE transcripts SET status = ?, turns = ?, prompt_tokens = ?, completion_tokens = ?, "
+                "ended_at = ? WHERE session_id = ?",
+                (status, writer.turns, writer.prompt_tokens, writer.completion_tokens, time.time(), writer.session_id),
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO speakers (speaker, session_id, turns) VALUES (?, ?, ?)",
+                [(speaker, writer.session_id, turns) for speaker, turns in writer.speaker_turns.items()],
+            )
+
+    def find(
+        self,
+        topic: Optional[str] = None,
+        speaker: Optional[str] = None,
+        status: Optional[str] = None,
+        limit: int = 50,
+    ) -> List[TranscriptRecord]:
+        """
+        Queries the index, most recent first.
+
+        Args:
+            topic (Optional[str]): Only sessions on this topic, compared after normalisation.
+            speaker (Optional[str]): Only sessions in which this member spoke.
+            status (Optional[str]): Only sessions with this status.
+            limit (int): The maximum number of records.
+
+        Returns:
+            The matching transcripts.
+        """
+        conditions: List[str] = []
+        params: List[Any] = []
+        if topic is not None:
+            conditions.append("t.topic_key = ?")
+            params.append(topic_key(topic))
+        if speaker is not None:
+            conditions.append("t.session_id IN (SELECT session_id FROM speakers WHERE speaker = ?)")
+            params.append(speaker)
+        if status is not None:
+            conditions.append("t.status = ?")
+            params.append(status)
+        where = "WHERE " + " AND ".join(conditions) + " " if conditions else ""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT t.session_id, t.topic, t.path, t.status, t.turns, t.prompt_tokens, t.completion_tokens, "
+                "t.started_at, t.ended_at FROM transcripts t " + where + "ORDER BY t.started_at DESC LIMIT ?",
+                params + [limit],
+            ).fetchall()
+        return [TranscriptRecord(*row) for row in rows]
+
+    def get(self, session_id: str) -> Optional[TranscriptRecord]:
+        """Returns a transcript's index record, or None if it does not exist."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT session_id, topic, path, status, turns, prompt_tokens, completion_tokens, started_at, "
+                "ended_at FROM transcripts WHERE session_id = ?",
+                (session_id,),
+            ).fetchone()
+        return TranscriptRecord(*row) if row is not None else None
+
+    def turns(self, session_id: str, speaker: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Reads a session's turns.
+
+        Args:
+            session_id (str): The session.
+            speaker (Optional[str]): Only this member's turns.
+
+        Returns:
+            The turn records, in order.
+
+        Raises:
+            KeyError: If the session is not in the index.
+        """
+        record = self.get(session_id)
+        if record is None:
+            raise KeyError(f"Unknown session: {session_id}")
+        records = read_transcript(os.path.join(self.directory, record.path))
+        next(records, None)  # The header.
+        return [turn for turn in records if speaker is None or turn.get("speaker") == speaker]
+
+    def render(self, session_id: str) -> str:
+        """Renders a session's text script from its transcript."""
+        return render_script(self.turns(session_id))
+
+    def close(self) -> None:
+        """Closes the index connection."""
+        self._conn.close()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Query stored parliament transcripts and render their scripts.")
+    parser.add_argument('--store', default='transcripts', help="The transcript directory.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    find = commands.add_parser('list', help="List sessions, most recent first.")
+    find.add_argument('--topic', default=None, help="Only sessions on this topic.")
+    find.add_argument('--speaker', default=None, help="Only sessions in which this member spoke.")
+    find.add_argument('--status', default=None, help="Only sessions with this status.")
+    find.add_argument('--limit', type=int, default=50, help="The maximum number of sessions listed.")
+    render = commands.add_parser('render', help="Render a session's text script.")
+    render.add_argument('session_id', help="The session to render.")
+    render.add_argument('-o', '--output', default=None, help="Write the script to this file instead of stdout.")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Runs the transcript CLI."""
+    args = build_parser().parse_args(argv)
+    store = TranscriptStore(args.store)
+    try:
+        if args.command == 'list':
+            for record in store.find(args.topic, args.speaker, args.status, args.limit):
+                started = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(record.started_at))
+                print(f"{record.session_id}  {started}  {record.status:<9}  {record.turns:>3} turns  "
+                      f"{record.prompt_tokens + record.completion_tokens:>7} tokens  {record.topic}")
+        else:
+            script = store.render(args.session_id)
+            if args.output is None:
+                print(script, end="")
+            else:
+                with open(args.output, "w", encoding="utf-8") as f:
+                    f.write(script)
+    finally:
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,233 @@
+import asyncio
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, List, Optional, TextIO, Tuple
+
+from autogen_core import CancellationToken
+from autogen_core.models import ChatCompletionClient, SystemMessage, UserMessage
+
+from script_writer import format_turn
+
+DEFAULT_CHUNK_TOKENS = 1024
+
+_TRANSLATE_REQUEST = (
+    "Translate the following script lines. Keep each speaker name and the colon after it as they are, "
+    "and reply with the translated lines only.\n\n"
+)
+
+
+def translated_script_path(script_path: str, suffix: str = "translated") -> str:
+    """
+    The translated script's path next to a script, e.g. 'pub_script.translated.txt' for 'pub_script.txt'.
+
+    Args:
+        script_path (str): The script file.
+        suffix (str): Inserted before the extension.
+
+    Returns:
+        The path of the translated script.
+    """
+    root, ext = os.path.splitext(script_path)
+    return f"{root}.{suffix}{ext or '.txt'}"
+
+
+@dataclass
+class TranslationStats:
+    """What the translation stage of a session did, and how much of its time the debate hid."""
+    turns: int = 0
+    chunks: int = 0
+    failed_chunks: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    translate_seconds: float = 0.0
+    tail_seconds: float = 0.0
+
+    def report(self) -> str:
+        """A summary of the translated turns and the translation time left after the debate."""
+        hidden = max(self.translate_seconds - self.tail_seconds, 0.0)
+        return (
+            "--- Translation ---\n"
+            f"Translated {self.turns} turns in {self.chunks} chunks ({self.failed_chunks} failed), "
+            f"{self.prompt_tokens + self.completion_tokens} tokens; {hidden:.1f}s of {self.translate_seconds:.1f}s "
+            f"overlapped the debate, {self.tail_seconds:.1f}s after it."
+        )
+
+
+class TranslationPipeline:
+    """Translates a script turn by turn while the debate that produces it is still running.
+
+    Finished turns are queued with submit(). A background task takes whatever has queued up, as many turns as
+    fit in `max_chunk_tokens`, translates them in one call and appends the result to the translated script, in
+    order. While the translator keeps up, each turn goes out alone as soon as it is spoken; when it falls
+    behind, the backlog goes out in larger chunks and fewer calls. Either way only the last chunk is left to
+    translate when the debate ends.
+
+    A chunk whose translation fails is written untranslated, so a translator outage never fails the session.
+    """
+
+    def __init__(
+        self,
+        model_client: ChatCompletionClient,
+        instructions: str,
+        output_path: str,
+        max_chunk_tokens: int = DEFAULT_CHUNK_TOKENS,
+        stats: Optional[TranslationStats] = None,
+        cancellation_token: Optional[CancellationToken] = None,
+    ):
+        """
+        Args:
+            model_client (ChatCompletionClient): The translator's model client.
+            instructions (str): The translator's system message.
+            output_path (str): The translated script file. It is truncated when the pipeline starts, unless
+                               it is started to append.
+            max_chunk_tokens (int): The most script tokens sent in one call. Capped to half of what the
+                                    model's context leaves after the instructions, to leave room for the reply,
+                                    when the model's context size is known.
+            stats (Optional[TranslationStats]): Where to record the chunks, tokens and timings.
+            cancellation_token (Optional[CancellationToken]): The session's token, passed to every call.
+
+        Raises:
+            ValueError: If max_chunk_tokens is less than one.
+        """
+        if max_chunk_tokens < 1:
+            raise ValueError(f"max_chunk_tokens must be at least 1, got {max_chunk_tokens}")
+        self.model_client = model_client
+        self.output_path = output_path
+        self.stats = stats if stats is not None else TranslationStats()
+        self.cancellation_token = cancellation_token
+        self._system = SystemMessage(content=instructions)
+        self.max_chunk_tokens = max_chunk_tokens
+        try:
+            available = model_client.remaining_tokens(
+                [self._system, UserMessage(content=_TRANSLATE_REQUEST, source="user")]
+            )
+        except KeyError:
+            # AutoGen only knows the context size of the models it lists, not e.g. Grok or a renamed Azure deployment.
+            pass
+        else:
+            self.max_chunk_tokens = max(min(max_chunk_tokens, available // 2), 1)
+        self._queue: "asyncio.Queue[Optional[str]]" = asyncio.Queue()
+        self._pending: Optional[str] = None
+        self._file: Optional[TextIO] = None
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    def start(self, append: bool = False) -> "TranslationPipeline":
+        """
+        Opens the translated script and starts translating in the background.
+
+        Args:
+            append (bool): Whether to add to the translated script instead of truncating it, e.g. when a
+                           resumed session's earlier turns are already translated there.
+        """
+        self._file = open(self.output_path, "a" if append else "w", encoding="utf-8")
+        self._task = asyncio.ensure_future(self._run())
+        return self
+
+    def submit(self, msg: Any) -> bool:
+        """
+        Queues one message for translation if it is a speaker turn.
+
+        Args:
+            msg (Any): A message or event yielded by the group chat.
+
+        Returns:
+            True if the message was queued, False if it was filtered out.
+
+        Raises:
+            RuntimeError: If the pipeline is not started.
+        """
+        if self._task is None:
+            raise RuntimeError("TranslationPipeline is not started")
+        line = format_turn(msg)
+        if line is None:
+            return False
+        self._queue.put_nowait(line)
+        self.stats.turns += 1
+        return True
+
+    async def finish(self) -> None:
+        """Translates the turns still queued, then closes the translated script."""
+        if self._task is None:
+            return
+        start = time.perf_counter()
+        self._queue.put_nowait(None)
+        try:
+            await self._task
+        finally:
+            self.stats.tail_seconds += time.perf_counter() - start
+            self._close()
+
+    async def cancel(self) -> None:
+        """Stops translating and closes the translated script, dropping the turns still queued."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._close()
+
+    def _close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._task = None
+
+    def _tokens(self, line: str) -> int:
+        return self.model_client.count_tokens([UserMessage(content=line, source="user")])
+
+    async def _next_chunk(self) -> Tuple[List[str], bool]:
+        """Waits for the next turn, then adds the queued turns that fit. Returns the chunk and whether it is the last."""
+        first = self._pending if self._pending is not None else await self._queue.get()
+        self._pending = None
+        if first is None:
+            return [], True
+        chunk = [first]
+        size = self._tokens(first)
+        while not self._queue.empty():
+            line = self._queue.get_nowait()
+            if line is None:
+                return chunk, True
+            tokens = self._tokens(line)
+            if size + tokens > self.max_chunk_tokens:
+                self._pending = line
+                break
+            chunk.append(line)
+            size += tokens
+        return chunk, False
+
+    async def _translate(self, chunk: List[str]) -> str:
+        text = "".join(chunk)
+        start = time.perf_counter()
+        try:
+            result = await self.model_client.create(
+                [self._system, UserMessage(content=_TRANSLATE_REQUEST + text, source="user")],
+                cancellation_token=self.cancellation_token,
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.stats.failed_chunks += 1
+            print(f"Warning: Could not translate {len(chunk)} turns, writing them untranslated: {e}")
+            return text
+        finally:
+            self.stats.chunks += 1
+            self.stats.translate_seconds += time.perf_counter() - start
+        self.stats.prompt_tokens += result.usage.prompt_tokens
+        self.stats.completion_tokens += result.usage.completion_tokens
+        content = result.content if isinstance(result.content, str) else str(result.content)
+        return content.rstrip() + "\n\n"
+
+    async def _run(self) -> None:
+        done = False
+        while not done:
+            chunk, done = await self._next_chunk()
+            if not chunk:
+                continue
+            translated = await self._translate(chunk)
+            assert self._file is not None
+            self._file.write(translated)
+            self._file.flush()
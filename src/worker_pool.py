@@ -0,0 +1,249 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import queue
+import signal
+import time
+import traceback
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, List, Sequence, Set, Tuple
+
+from batch_runner import SessionOutcome, create_runner, script_path
+from metrics import MetricsExporters
+from parliament_benchmark import percentile
+from token_budget import track_prompt_cache
+from tracing import setup_tracing
+
+# How often workers re-check the stop event while the topic queue is empty, and how often the parent
+# checks for dead workers while no results arrive.
+_POLL_SECONDS = 0.2
+
+
+@dataclass
+class WorkerMetrics:
+    """The throughput and session latency of one worker process."""
+    worker_id: int
+    pid: int
+    sessions: int = 0
+    failed: int = 0
+    seconds: float = 0.0
+    sessions_per_second: float = 0.0
+    latency_p50: float = 0.0
+    latency_p95: float = 0.0
+    total_tokens: int = 0
+    cost: float = 0.0
+    crashed: bool = False
+
+
+def _worker_metrics(worker_id: int, outcomes: Sequence[SessionOutcome], seconds: float) -> WorkerMetrics:
+    durations = [outcome.duration_seconds for outcome in outcomes]
+    return WorkerMetrics(
+        worker_id=worker_id,
+        pid=os.getpid(),
+        sessions=len(outcomes),
+        failed=sum(1 for outcome in outcomes if outcome.error),
+        seconds=seconds,
+        sessions_per_second=len(outcomes) / seconds if seconds > 0 else 0.0,
+        latency_p50=percentile(durations, 50),
+        latency_p95=percentile(durations, 95),
+        total_tokens=sum(outcome.total_tokens for outcome in outcomes),
+        cost=sum(outcome.cost for outcome in outcomes),
+    )
+
+
+async def _serve(worker_id: int, args: argparse.Namespace, workers: int, topics: Any, results: Any, stop: Any) -> None:
+    """Runs topics from the queue until it is exhausted or the pool is stopping."""
+    runner = create_runner(args, workers)
+    # Every worker has its own registry, so each exports on its own port and file.
+    metrics_file = None
+    if args.metrics_file:
+        root, ext = os.path.splitext(args.metrics_file)
+        metrics_file = f"{root}.worker{worker_id}{ext}"
+    exporters = MetricsExporters(
+        args.metrics_port + worker_id if args.metrics_port is not None else None, metrics_file, args.metrics_interval
+    )
+    await exporters.start()
+    loop = asyncio.get_running_loop()
+    outcomes: List[SessionOutcome] = []
+
+    async def consume() -> None:
+        while not stop.is_set():
+            try:
+                item = await loop.run_in_executor(None, topics.get, True, _POLL_SECONDS)
+            except queue.Empty:
+                continue
+            if item is None:
+                # Put the end marker back for the worker's other consumers and the other workers.
+                topics.put(None)
+                return
+            index, topic = item
+            results.put(('started', worker_id, index))
+            outcome = await runner.run_one(index, topic)
+            outcomes.append(outcome)
+            results.put(('outcome', worker_id, asdict(outcome)))
+
+    os.makedirs(runner.output_dir, exist_ok=True)
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*(consume() for _ in range(runner.concurrency)))
+    finally:
+        await runner.close()
+        await exporters.close()
+    results.put(('done', worker_id, asdict(_worker_metrics(worker_id, outcomes, time.perf_counter() - start))))
+
+
+def _worker_main(worker_id: int, args: argparse.Namespace, workers: int, topics: Any, results: Any, stop: Any) -> None:
+    """The entry point of a worker process."""
+    # Ctrl-C reaches the whole process group; the parent turns it into a graceful stop.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    track_prompt_cache()
+    if args.tracing != 'off':
+        root, ext = os.path.splitext(args.trace_file)
+        setup_tracing(
+            args.tracing,
+            sample_ratio=args.trace_sample_ratio,
+            file_path=f"{root}.worker{worker_id}{ext}",
+            otlp_endpoint=os.getenv("OTEL_EXPORTER_OTLP_TRACES_ENDPOINT"),
+        )
+    try:
+        asyncio.run(_serve(worker_id, args, workers, topics, results, stop))
+    except Exception:
+        results.put(('error', worker_id, traceback.format_exc()))
+        raise
+
+
+def run_worker_pool(
+    topics: Sequence[str],
+    args: argparse.Namespace,
+    workers: int,
+    worker_target: Callable[..., None] = _worker_main,
+) -> Tuple[List[SessionOutcome], List[WorkerMetrics]]:
+    """
+    Runs a batch of topics on a pool of worker processes, writing every script into one output directory.
+
+    Workers pull topics from a shared queue, so a slow topic does not hold up a fixed shard. Each worker builds
+    its own BatchRunner from the CLI arguments, with its own pooled model clients and cached personas, and runs
+    up to `args.concurrency` sessions at once. Rate limits are split evenly between the workers.
+
+    When a worker crashes, or on Ctrl-C, the pool stops handing out topics and waits for the sessions that are
+    running to finish; a second Ctrl-C terminates the workers. Sessions lost with a crashed worker, and topics
+    that never ran, are reported as failed outcomes. A summary.json with every outcome and the worker metrics
+    is written to the output directory.
+
+    Args:
+        topics (Sequence[str]): The topics, in order.
+        args (argparse.Namespace): The batch CLI arguments, as parsed by batch_runner.build_parser().
+        workers (int): The number of worker processes.
+        worker_target (Callable[..., None]): The worker entry point. Replaced in tests.
+
+    Returns:
+        The outcome of every topic, in topic order, and the metrics of every worker.
+
+    Raises:
+        ValueError: If workers is less than one.
+    """
+    if workers < 1:
+        raise ValueError(f"workers must be at least 1, got {workers}")
+    # Spawned workers do not inherit the parent's event loop, threads or open SQLite connections.
+    context = multiprocessing.get_context('spawn')
+    topic_queue = context.Queue()
+    results = context.Queue()
+    stop = context.Event()
+    for index, topic in enumerate(topics):
+        topic_queue.put((index, topic))
+    topic_queue.put(None)
+    # Topics left over after an early stop are dropped instead of blocking the parent's exit.
+    topic_queue.cancel_join_thread()
+
+    processes = {
+        worker_id: context.Process(
+            target=worker_target,
+            args=(worker_id, args, workers, topic_queue, results, stop),
+            name=f"parliament-worker-{worker_id}",
+        )
+        for worker_id in range(workers)
+    }
+    for process in processes.values():
+        process.start()
+
+    outcomes: Dict[int, SessionOutcome] = {}
+    metrics: Dict[int, WorkerMetrics] = {}
+    in_flight: Dict[int, Set[int]] = {worker_id: set() for worker_id in processes}
+    errors: Dict[int, str] = {}
+    running = set(processes)
+
+    def lose_worker(worker_id: int) -> None:
+        process = processes[worker_id]
+        reason = errors.get(worker_id) or f"exit code {process.exitcode}"
+        print(f"Worker {worker_id} crashed ({reason.strip().splitlines()[-1]}), stopping the pool.")
+        stop.set()
+        for index in in_flight[worker_id]:
+            outcomes[index] = SessionOutcome(
+                index=index,
+                topic=topics[index],
+                output_path=script_path(args.output_dir, index, topics[index]),
+                duration_seconds=0.0,
+                error=f"Worker {worker_id} crashed",
+            )
+        metrics[worker_id] = WorkerMetrics(worker_id=worker_id, pid=process.pid or 0, crashed=True)
+        running.discard(worker_id)
+
+    try:
+        while running:
+            try:
+                kind, worker_id, payload = results.get(timeout=_POLL_SECONDS)
+            except queue.Empty:
+                for worker_id in list(running):
+                    if not processes[worker_id].is_alive():
+                        lose_worker(worker_id)
+                continue
+            except KeyboardInterrupt:
+                if stop.is_set():
+                    raise
+                print("Stopping after the running sessions, press Ctrl-C again to abort them.")
+                stop.set()
+                continue
+            if kind == 'started':
+                in_flight[worker_id].add(payload)
+            elif kind == 'outcome':
+                outcome = SessionOutcome(**payload)
+                outcomes[outcome.index] = outcome
+                in_flight[worker_id].discard(outcome.index)
+            elif kind == 'error':
+                errors[worker_id] = payload
+            elif kind == 'done':
+                metrics[worker_id] = WorkerMetrics(**payload)
+                running.discard(worker_id)
+    except KeyboardInterrupt:
+        for process in processes.values():
+            process.terminate()
+    finally:
+        for process in processes.values():
+            process.join(timeout=10)
+            if process.is_alive():
+                process.kill()
+
+    for index, topic in enumerate(topics):
+        if index not in outcomes:
+            outcomes[index] = SessionOutcome(
+                index=index,
+                topic=topic,
+                output_path=script_path(args.output_dir, index, topic),
+                duration_seconds=0.0,
+                error="Not run: the worker pool stopped early",
+            )
+    ordered = [outcomes[index] for index in range(len(topics))]
+    worker_metrics = [metrics[worker_id] for worker_id in sorted(metrics)]
+    os.makedirs(args.output_dir, exist_ok=True)
+    with open(os.path.join(args.output_dir, 'summary.json'), 'w', encoding='utf-8') as f:
+        json.dump(
+            {
+                "sessions": [asdict(outcome) for outcome in ordered],
+                "workers": [asdict(worker) for worker in worker_metrics],
+            },
+            f,
+            indent=2,
+        )
+    return ordered, worker_metrics
@@ -0,0 +1,84 @@
+import asyncio
+import gc
+import os
+import unittest
+from unittest import mock
+
+from agents_factory import AgentsFactory
+
+OPENAI_ENV = {"OPENAI_API_KEY": "sk-test"}
+AZURE_ENV = {
+    "AZURE_API_KEY": "azure-key",
+    "AZURE_API_VERSION": "2024-06-01",
+    "AZURE_API_ENDPOINT": "https://example.openai.azure.com",
+    "AZURE_DEPLOYMENT_NAME": "gpt-4o",
+}
+
+
+class TestAgentsFactoryPool(unittest.IsolatedAsyncioTestCase):
+
+    async def test_same_config_reuses_client(self):
+        with mock.patch.dict(os.environ, OPENAI_ENV):
+            async with AgentsFactory() as factory:
+                first = factory.get_client("openai")
+                second = factory.get_client("openai")
+                self.assertIsNotNone(first)
+                self.assertIs(first, second)
+                self.assertEqual(factory.pool_size, 1)
+
+    async def test_changed_config_creates_new_client(self):
+        async with AgentsFactory() as factory:
+            with mock.patch.dict(os.environ, OPENAI_ENV):
+                first = factory.get_client("openai")
+            with mock.patch.dict(os.environ, {"OPENAI_API_KEY": "sk-other"}):
+                second = factory.get_client("openai")
+            self.assertIsNot(first, second)
+            self.assertEqual(factory.pool_size, 2)
+
+    async def test_pool_size_limit_evicts_least_recently_used(self):
+        with mock.patch.dict(os.environ, {**OPENAI_ENV, **AZURE_ENV}):
+            factory = AgentsFactory(max_pool_size=1)
+            openai_client = factory.get_client("openai")
+            factory.get_client("azure")
+            self.assertEqual(factory.pool_size, 1)
+            self.assertIsNot(factory.get_client("openai"), openai_client)
+            with mock.patch.object(openai_client, "close", new=mock.AsyncMock()) as close:
+                await factory.close()
+                close.assert_awaited_once()
+            self.assertEqual(factory.pool_size, 0)
+
+    async def test_evicted_clients_are_closed_once_unused(self):
+        with mock.patch.dict(os.environ, {**OPENAI_ENV, **AZURE_ENV}):
+            factory = AgentsFactory(max_pool_size=1)
+            provider_client = factory.get_client("openai")
+            while hasattr(provider_client, "inner"):
+                provider_client = provider_client.inner  # type: ignore[union-attr]
+            with mock.patch.object(provider_client, "close", new=mock.AsyncMock()) as close:
+                del provider_client
+                held = factory.get_client("azure")  # Evicts the openai client, which nobody holds.
+                gc.collect()
+                await asyncio.sleep(0)
+                close.assert_awaited_once()
+
+                factory.get_client("openai")  # Evicts the azure client, which is still held.
+                gc.collect()
+                await asyncio.sleep(0)
+                self.assertEqual(factory.pool_size, 1)
+                await factory.close()
+                self.assertIsNotNone(held)
+
+    def test_missing_config_returns_none(self):
+        with mock.patch.dict(os.environ, {}, clear=True):
+            self.assertIsNone(AgentsFactory().get_client("openai"))
+
+    def test_unknown_client_type(self):
+        with self.assertRaises(ValueError):
+            AgentsFactory().get_client("gemini")
+
+    def test_invalid_pool_size(self):
+        with self.assertRaises(ValueError):
+            AgentsFactory(max_pool_size=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
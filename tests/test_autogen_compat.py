@@ -0,0 +1,64 @@
+import os
+import unittest
+from importlib.metadata import version
+
+from autogen_agentchat.agents import AssistantAgent
+from autogen_core.models import CreateResult, ModelFamily
+from autogen_core.tools import FunctionTool
+from autogen_ext.models.replay import ReplayChatCompletionClient
+
+from autogen_compat import AUTOGEN_VERSION, check_agent, model_call_messages, model_call_tools
+
+REQUIREMENTS = os.path.join(os.path.dirname(__file__), '..', 'requirements.txt')
+
+
+class RecordingClient(ReplayChatCompletionClient):
+    """Replays answers and remembers the messages and tools of every call."""
+
+    def __init__(self):
+        super().__init__(["Cheers."], model_info={
+            "vision": False, "function_calling": True, "json_output": False,
+            "family": ModelFamily.UNKNOWN, "structured_output": False,
+        })
+        self.calls = []
+
+    async def create(self, messages, *, tools=(), **kwargs) -> CreateResult:  # type: ignore[override]
+        self.calls.append((list(messages), list(tools)))
+        return await super().create(messages, tools=tools, **kwargs)
+
+
+async def get_weather(city: str) -> str:
+    """Get weather for a given city"""
+    return f"The weather in {city} is sunny."
+
+
+class TestAutogenCompat(unittest.IsolatedAsyncioTestCase):
+    """Fails when an AutoGen upgrade changes how AssistantAgent builds its model calls."""
+
+    def test_installed_version_is_the_pinned_one(self):
+        self.assertEqual(version("autogen-agentchat"), AUTOGEN_VERSION)
+        with open(REQUIREMENTS, encoding="utf-8") as f:
+            self.assertIn(f"autogen-agentchat=={AUTOGEN_VERSION}", f.read().split())
+
+    async def test_builds_the_call_the_agent_makes(self):
+        client = RecordingClient()
+        agent = AssistantAgent(
+            "Avi", model_client=client, system_message="Be sarcastic.",
+            tools=[FunctionTool(get_weather, description="Get weather")], handoffs=["Shauli"],
+        )
+        check_agent(agent)
+        await agent.run(task="How is the weather?")
+
+        [(messages, tools)] = client.calls
+        history = await agent.model_context.get_messages()
+        self.assertEqual(model_call_messages(agent, client, history[:len(messages) - 1]), messages)
+        self.assertEqual(await model_call_tools(agent), tools)
+        self.assertEqual(len(tools), 2)
+
+    def test_missing_state_fails_loudly(self):
+        with self.assertRaises(RuntimeError):
+            check_agent(object())  # type: ignore[arg-type]
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from autogen_ext.models.replay import ReplayChatCompletionClient
+
+from batch_runner import BatchRunner, build_parser, create_runner, parse_rate_limits, read_topics, slugify
+from model_router import ModelRouter
+from personas_util import PersonasUtil
+
+CONFIG = """
+[shauli]
+name = "Shauli"
+instructions = "Shauli's instructions"
+description = "Group leader."
+
+[avi]
+name = "Avi"
+instructions = "Avi's instructions"
+description = "Sarcastic."
+
+[agents.scripter]
+name = "Scripter"
+instructions = "Pick the next speaker. Today's topic: {0}."
+"""
+
+
+class ReplayFactory:
+    """Returns replay clients that always answer "Avi", so the selector always picks Avi."""
+
+    def __init__(self):
+        self.router = ModelRouter()
+
+    def get_client(self, client_type: str = "grok"):
+        return ReplayChatCompletionClient(["Avi"] * 10)
+
+
+class TestBatchRunnerHelpers(unittest.TestCase):
+
+    def test_read_topics_skips_blanks_and_comments(self):
+        stream = io.StringIO("weather\n\n# ignored\n  politics  \n")
+        self.assertEqual(read_topics(stream), ["weather", "politics"])
+
+    def test_slugify(self):
+        self.assertEqual(slugify("The Middle East?!"), "the_middle_east")
+        self.assertEqual(slugify("???"), "topic")
+
+    def test_parse_rate_limits(self):
+        self.assertEqual(parse_rate_limits(["azure=60", "grok=1.5"]), {"azure": 60.0, "grok": 1.5})
+        with self.assertRaises(ValueError):
+            parse_rate_limits(["azure"])
+
+    def test_rate_limits_reach_the_factory_split_between_workers(self):
+        args = build_parser().parse_args(['-', '--rate-limit', 'azure=60', '--offline', '--config', 'missing.toml'])
+        runner = create_runner(args, workers=2)
+        self.assertEqual(runner.factory.resilience.rate_limits, {"azure": 30.0})
+
+    def test_invalid_concurrency(self):
+        with self.assertRaises(ValueError):
+            BatchRunner(concurrency=0, personas_util=PersonasUtil(config_path='missing.toml'))
+
+
+class TestBatchRunner(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        config_path = os.path.join(self.tmp_dir, 'config.toml')
+        with open(config_path, 'w', encoding='utf-8') as f:
+            f.write(CONFIG)
+        self.personas_util = PersonasUtil(config_path=config_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    async def test_runs_every_topic_and_writes_scripts(self):
+        output_dir = os.path.join(self.tmp_dir, 'out')
+        runner = BatchRunner(
+            output_dir=output_dir,
+            concurrency=2,
+            max_messages=3,
+            factory=ReplayFactory(),  # type: ignore
+            personas_util=self.personas_util,
+        )
+        outcomes = await runner.run(["weather", "politics", "food"])
+
+        self.assertEqual([outcome.topic for outcome in outcomes], ["weather", "politics", "food"])
+        for outcome in outcomes:
+            self.assertIsNone(outcome.error)
+            with open(outcome.output_path, encoding='utf-8') as f:
+                self.assertIn("Avi: Avi", f.read())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+import os
+import tempfile
+import unittest
+
+from autogen_core import CancellationToken
+from autogen_core.model_context import BufferedChatCompletionContext, UnboundedChatCompletionContext
+from autogen_core.models import AssistantMessage
+from autogen_ext.models.replay import ReplayChatCompletionClient
+
+from context_policy import (
+    SUMMARY_PROMPT,
+    ContextPolicy,
+    SummarizingChatCompletionContext,
+    TokenCappedChatCompletionContext,
+)
+from parliament import run_parliament_session
+from personas_util import PersonasUtil
+from speaker_selection import SelectionStats
+
+CONFIG = """
+[shauli]
+name = "Shauli"
+instructions = "Shauli's instructions"
+
+[avi]
+name = "Avi"
+instructions = "Avi's instructions"
+
+[agents.scripter]
+name = "Scripter"
+instructions = "Pick the next speaker. Today's topic: {0}."
+"""
+
+
+def turn(index: int):
+    return AssistantMessage(content=f"message number {index}", source=f"Agent{index % 3}")
+
+
+class TestSummarizingChatCompletionContext(unittest.IsolatedAsyncioTestCase):
+
+    async def test_older_messages_are_folded_into_summary_in_batches(self):
+        summarizer = ReplayChatCompletionClient(["first summary", "second summary"])
+        context = SummarizingChatCompletionContext(summarizer, window=2, summary_batch=3)
+        for index in range(4):
+            await context.add_message(turn(index))
+
+        # Two older messages are not yet a full batch, so nothing is summarised.
+        self.assertEqual(len(await context.get_messages()), 4)
+        self.assertEqual(len(summarizer.create_calls), 0)
+
+        await context.add_message(turn(4))
+        messages = await context.get_messages()
+        self.assertEqual(messages[0].content, "Summary of the earlier discussion: first summary")
+        self.assertEqual([m.content for m in messages[1:]], ["message number 3", "message number 4"])
+        self.assertEqual(len(summarizer.create_calls), 1)
+
+        # Reading again without new messages does not call the model again.
+        await context.get_messages()
+        self.assertEqual(len(summarizer.create_calls), 1)
+
+    async def test_summary_calls_use_the_cancellation_token(self):
+        summarizer = ReplayChatCompletionClient(["summary"])
+        token = CancellationToken()
+        context = SummarizingChatCompletionContext(summarizer, window=1, summary_batch=1, cancellation_token=token)
+        await context.add_message(turn(0))
+        await context.add_message(turn(1))
+        await context.get_messages()
+        self.assertIs(summarizer.create_calls[0]["cancellation_token"], token)
+
+    async def test_state_round_trip_keeps_summary(self):
+        context = SummarizingChatCompletionContext(ReplayChatCompletionClient(["summary"]), window=1, summary_batch=1)
+        await context.add_message(turn(0))
+        await context.add_message(turn(1))
+        await context.get_messages()
+
+        restored = SummarizingChatCompletionContext(ReplayChatCompletionClient([]), window=1, summary_batch=1)
+        await restored.load_state(await context.save_state())
+        self.assertEqual(await restored.get_messages(), await context.get_messages())
+
+
+class TestTokenCappedChatCompletionContext(unittest.IsolatedAsyncioTestCase):
+
+    async def test_drops_oldest_messages_over_limit(self):
+        context = TokenCappedChatCompletionContext(UnboundedChatCompletionContext(), ReplayChatCompletionClient([]), token_limit=6)
+        for index in range(5):
+            await context.add_message(turn(index))
+        messages = await context.get_messages()
+        # The replay client counts whitespace-separated words: three per message.
+        self.assertEqual([m.content for m in messages], ["message number 3", "message number 4"])
+
+
+class TestSessionContexts(unittest.IsolatedAsyncioTestCase):
+
+    async def test_selector_summaries_are_not_counted_as_decisions(self):
+        selector = ReplayChatCompletionClient(["Avi"] * 20)
+        members = ReplayChatCompletionClient(["Cheers."] * 20)
+        token = CancellationToken()
+        stats = SelectionStats()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            config_path = os.path.join(tmp_dir, 'config.toml')
+            with open(config_path, 'w', encoding='utf-8') as f:
+                f.write(CONFIG)
+            await run_parliament_session(
+                "weather",
+                PersonasUtil(config_path=config_path),
+                lambda client_type: selector if client_type == "azure" else members,
+                output_path=None,
+                cancellation_token=token,
+                max_messages=5,
+                context_policy=ContextPolicy('summary', window=1, summary_batch=1),
+                selection_stats=stats,
+            )
+        summary_prompt = SUMMARY_PROMPT.format(max_words=150)
+        summaries = [call for call in selector.create_calls if call["messages"][0].content == summary_prompt]
+        self.assertTrue(summaries)
+        self.assertTrue(all(call["cancellation_token"] is token for call in summaries))
+        self.assertEqual(stats.llm_calls, len(selector.create_calls) - len(summaries))
+
+
+class TestContextPolicy(unittest.TestCase):
+
+    def test_modes(self):
+        client = ReplayChatCompletionClient([])
+        self.assertIsNone(ContextPolicy().create(client))
+        self.assertIsInstance(ContextPolicy('window').create(client), BufferedChatCompletionContext)
+        self.assertIsInstance(ContextPolicy('summary').create(client), SummarizingChatCompletionContext)
+        self.assertIsInstance(ContextPolicy(token_limit=100).create(client), TokenCappedChatCompletionContext)
+        with self.assertRaises(ValueError):
+            ContextPolicy('everything')
+
+
+if __name__ == '__main__':
+    unittest.main()
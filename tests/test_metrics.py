@@ -0,0 +1,97 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+
+from autogen_core.models import UserMessage
+
+from metrics import MetricsChatCompletionClient, MetricsRegistry, MetricsServer, SnapshotWriter
+from mock_client import MockChatCompletionClient
+
+MESSAGES = [UserMessage(content="Hello", source="user")]
+
+
+class BrokenClient(MockChatCompletionClient):
+
+    async def create(self, messages, **kwargs):
+        raise ConnectionError("down")
+
+
+class TestMetricsRegistry(unittest.TestCase):
+
+    def test_prometheus_text(self):
+        metrics = MetricsRegistry(buckets=(0.1, 1.0))
+        metrics.inc("parliament_turns_total")
+        metrics.inc("parliament_sessions_total", status="completed")
+        metrics.add("parliament_sessions_in_flight", 2)
+        metrics.observe("parliament_model_call_seconds", 0.5, provider="azure")
+        text = metrics.render_prometheus()
+
+        self.assertIn("# TYPE parliament_turns_total counter\nparliament_turns_total 1\n", text)
+        self.assertIn('parliament_sessions_total{status="completed"} 1', text)
+        self.assertIn("parliament_sessions_in_flight 2", text)
+        self.assertIn('parliament_model_call_seconds_bucket{provider="azure",le="0.1"} 0', text)
+        self.assertIn('parliament_model_call_seconds_bucket{provider="azure",le="1"} 1', text)
+        self.assertIn('parliament_model_call_seconds_bucket{provider="azure",le="+Inf"} 1', text)
+        self.assertIn('parliament_model_call_seconds_count{provider="azure"} 1', text)
+
+    def test_snapshot(self):
+        metrics = MetricsRegistry(buckets=(0.1, 1.0))
+        for _ in range(3):
+            metrics.inc("parliament_turns_total")
+        metrics.observe("parliament_selector_decision_seconds", 0.05, method="heuristic")
+        snapshot = metrics.snapshot()
+
+        self.assertGreater(snapshot["rates"]["turns_per_second"], 0)
+        self.assertEqual(snapshot["counters"][0]["value"], 3)
+        self.assertEqual(snapshot["histograms"][0]["labels"], {"method": "heuristic"})
+        self.assertEqual(snapshot["histograms"][0]["p95"], 0.1)
+        json.dumps(snapshot)
+
+
+class TestMetricsExport(unittest.IsolatedAsyncioTestCase):
+
+    async def test_client_records_latency_tokens_and_errors(self):
+        metrics = MetricsRegistry()
+        await MetricsChatCompletionClient(MockChatCompletionClient(completion_tokens=4), "grok", metrics).create(MESSAGES)
+        with self.assertRaises(ConnectionError):
+            await MetricsChatCompletionClient(BrokenClient(), "grok", metrics).create(MESSAGES)
+
+        self.assertEqual(metrics.value("parliament_tokens_total", provider="grok", kind="completion"), 4)
+        self.assertEqual(metrics.value("parliament_model_calls_total", provider="grok", outcome="ok"), 1)
+        self.assertEqual(metrics.value("parliament_model_errors_total", provider="grok", error="ConnectionError"), 1)
+
+    async def test_server_serves_text_and_json(self):
+        metrics = MetricsRegistry()
+        metrics.inc("parliament_turns_total")
+        server = await MetricsServer(metrics, port=0).start()
+        try:
+            async def get(path):
+                reader, writer = await asyncio.open_connection('127.0.0.1', server.port)
+                writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+                response = await reader.read()
+                writer.close()
+                return response.decode()
+
+            self.assertIn("parliament_turns_total 1", await get("/metrics"))
+            body = (await get("/metrics.json")).split("\r\n\r\n", 1)[1]
+            self.assertEqual(json.loads(body)["counters"][0]["name"], "parliament_turns_total")
+            self.assertTrue((await get("/other")).startswith("HTTP/1.1 404"))
+        finally:
+            await server.close()
+
+    async def test_snapshot_writer(self):
+        metrics = MetricsRegistry()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'metrics.json')
+            writer = SnapshotWriter(path, interval=60, metrics=metrics).start()
+            await asyncio.sleep(0)
+            metrics.inc("parliament_turns_total")
+            await writer.close()
+            with open(path, encoding='utf-8') as f:
+                self.assertEqual(json.load(f)["counters"][0]["value"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from autogen_agentchat.agents import AssistantAgent
+from autogen_agentchat.messages import ToolCallExecutionEvent
+from autogen_core.models import CreateResult, UserMessage
+from autogen_core.tools import FunctionTool
+
+from agents_factory import AgentsFactory
+from mock_client import MockChatCompletionClient, load_recorded_responses
+
+MESSAGES = [UserMessage(content="who speaks next", source="user")]
+
+
+async def get_weather(city: str) -> str:
+    """Get weather for a given city"""
+    return f"The weather in {city} is sunny."
+
+
+class TestMockChatCompletionClient(unittest.IsolatedAsyncioTestCase):
+
+    async def test_synthetic_completions_are_seeded(self):
+        first = MockChatCompletionClient(speakers=["Avi", "Shauli"], completion_tokens=5, seed=7)
+        second = MockChatCompletionClient(speakers=["Avi", "Shauli"], completion_tokens=5, seed=7)
+        for _ in range(3):
+            result = await first.create(MESSAGES)
+            self.assertEqual(result.content, (await second.create(MESSAGES)).content)
+            assert isinstance(result.content, str)
+            self.assertIn(result.content.split()[0], ["Avi", "Shauli"])
+            self.assertEqual(result.usage.completion_tokens, 5)
+            self.assertEqual(result.usage.prompt_tokens, 3)
+        self.assertEqual(first.total_usage().completion_tokens, 15)
+        self.assertEqual(first.calls, 3)
+
+    async def test_recorded_responses_cycle(self):
+        client = MockChatCompletionClient(responses=["one", "two"])
+        contents = [(await client.create(MESSAGES)).content for _ in range(3)]
+        self.assertEqual(contents, ["one", "two", "one"])
+
+    async def test_stream_yields_words_then_result(self):
+        client = MockChatCompletionClient(responses=["hello there pub"])
+        chunks = [chunk async for chunk in client.create_stream(MESSAGES)]
+        self.assertEqual("".join(chunk for chunk in chunks[:-1] if isinstance(chunk, str)), "hello there pub")
+        self.assertIsInstance(chunks[-1], CreateResult)
+
+    async def test_latency(self):
+        client = MockChatCompletionClient(latency_ms=50)
+        start = time.perf_counter()
+        await client.create(MESSAGES)
+        self.assertGreaterEqual(time.perf_counter() - start, 0.045)
+
+    async def test_simulated_prompt_cache(self):
+        client = MockChatCompletionClient(cache_min_tokens=2, cache_block_tokens=1)
+        messages = [UserMessage(content="one two three", source="user")]
+        self.assertEqual(client._cached_prefix_tokens(messages), 0)
+        self.assertEqual(client._cached_prefix_tokens(messages + [UserMessage(content="four", source="user")]), 3)
+
+    async def test_prompt_cache_is_bounded(self):
+        client = MockChatCompletionClient(cache_min_tokens=1, cache_block_tokens=1, cache_max_blocks=3)
+        messages = [UserMessage(content="one two three four five", source="user")]
+        self.assertEqual(client._cached_prefix_tokens(messages), 0)
+        self.assertEqual(len(client._cached_prefixes), 3)
+        # Only the three longest prefixes are left, so the shared prefix "one two" is no longer cached.
+        self.assertEqual(client._cached_prefix_tokens([UserMessage(content="one two six", source="user")]), 0)
+
+    async def test_function_calling_calls_the_offered_tools(self):
+        client = MockChatCompletionClient(responses=["Sunny, as always."], function_calling=True)
+        agent = AssistantAgent(
+            "Avi", model_client=client, tools=[FunctionTool(get_weather, description="Get weather")],
+            reflect_on_tool_use=True,
+        )
+        result = await agent.run(task="How is the weather?")
+        [execution] = [message for message in result.messages if isinstance(message, ToolCallExecutionEvent)]
+        self.assertEqual(execution.content[0].content, "The weather in Tel Aviv is sunny.")
+        self.assertEqual(result.messages[-1].content, "Sunny, as always.")
+        self.assertEqual((client.calls, client.tool_calls), (2, 1))
+
+    async def test_without_function_calling_tools_are_ignored(self):
+        client = MockChatCompletionClient(responses=["Cheers"])
+        result = await client.create(MESSAGES, tools=[FunctionTool(get_weather, description="Get weather")])
+        self.assertEqual(result.content, "Cheers")
+        self.assertFalse(client.model_info["function_calling"])
+
+    def test_invalid_settings(self):
+        with self.assertRaises(ValueError):
+            MockChatCompletionClient(latency_ms=-1)
+        with self.assertRaises(ValueError):
+            MockChatCompletionClient(completion_tokens=0)
+
+    def test_load_recorded_responses_from_script_jsonl(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'script.jsonl')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(json.dumps({"turn": 0, "source": "Avi", "content": "Cheers"}) + "\n")
+                f.write("not json\n")
+                f.write(json.dumps({"turn": 1, "source": "Shauli", "content": "Yalla"}) + "\n")
+            self.assertEqual(load_recorded_responses(path), ["Cheers", "Yalla"])
+
+
+class TestAgentsFactoryMock(unittest.IsolatedAsyncioTestCase):
+
+    async def test_mock_client_type(self):
+        with mock.patch.dict(os.environ, {"MOCK_COMPLETION_TOKENS": "3", "MOCK_SPEAKERS": "Avi"}):
+            async with AgentsFactory() as factory:
+                client = factory.get_client("mock")
+                # Pooled clients are wrapped: resilience, then metrics, then the mock.
+                self.assertIsInstance(client.inner.inner, MockChatCompletionClient)  # type: ignore[union-attr]
+                self.assertIs(client, factory.get_client("mock"))
+                assert client is not None
+                result = await client.create(MESSAGES)
+                self.assertEqual(result.usage.completion_tokens, 3)
+                assert isinstance(result.content, str)
+                self.assertTrue(result.content.startswith("Avi "))
+
+    async def test_offline_serves_every_provider_from_mocks(self):
+        with mock.patch.dict(os.environ, {}, clear=True):
+            async with AgentsFactory(offline=True, mock_settings={"latency_ms": "1"}) as factory:
+                clients = [factory.get_client(provider) for provider in ("azure", "grok", "openai")]
+                for client in clients:
+                    self.assertIsInstance(client.inner.inner, MockChatCompletionClient)  # type: ignore[union-attr]
+                    self.assertEqual(client.inner.inner.latency_ms, 1.0)  # type: ignore[union-attr]
+                self.assertEqual(len({id(client) for client in clients}), 3)
+                self.assertIsNotNone(factory.get_client("auto"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import asyncio
+import unittest
+from unittest import mock
+
+from autogen_core.models import UserMessage
+from autogen_ext.models.replay import ReplayChatCompletionClient
+
+from agents_factory import AgentsFactory
+from model_router import ModelRouter, ProviderStats, RoutedChatCompletionClient
+from resilience import CircuitOpenError, ResilienceSettings
+
+
+class StatusError(Exception):
+
+    def __init__(self, status_code: int):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+class FailingClient(ReplayChatCompletionClient):
+
+    def __init__(self, *args, status_code: int = 429, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.status_code = status_code
+
+    async def create(self, *args, **kwargs):  # type: ignore[override]
+        raise StatusError(self.status_code)
+
+
+class HangingClient(ReplayChatCompletionClient):
+
+    async def create(self, *args, **kwargs):  # type: ignore[override]
+        await asyncio.sleep(10)
+
+
+class TestProviderStats(unittest.TestCase):
+
+    def test_rolling_window(self):
+        stats = ProviderStats(window=2)
+        stats.record(1.0, ok=False)
+        stats.record(2.0, ok=True, completion_tokens=10)
+        stats.record(4.0, ok=True, completion_tokens=20)
+        self.assertEqual(stats.calls, 2)
+        self.assertEqual(stats.error_rate, 0.0)
+        self.assertEqual(stats.mean_latency, 3.0)
+        self.assertEqual(stats.tokens_per_second, 5.0)
+
+
+class TestModelRouter(unittest.TestCase):
+
+    def test_prefers_fast_healthy_provider(self):
+        router = ModelRouter()
+        for _ in range(10):
+            router.record("grok", 0.5, ok=True)
+            router.record("azure", 5.0, ok=False)
+        with mock.patch("model_router.random.choices", side_effect=lambda providers, weights: [providers[weights.index(max(weights))]]):
+            self.assertEqual(router.rank(["azure", "grok"]), ["grok", "azure"])
+        self.assertGreater(router.score("grok"), router.score("azure"))  # type: ignore
+
+    def test_unseen_provider_gets_best_known_score(self):
+        router = ModelRouter()
+        router.record("grok", 1.0, ok=True)
+        self.assertEqual(router._weights(["grok", "openai"]), [1.0, 1.0])
+
+    def test_resilient_clients_own_the_timeouts(self):
+        self.assertIsNone(AgentsFactory(offline=True).router.timeout)
+        self.assertEqual(AgentsFactory(resilience=ResilienceSettings(enabled=False, timeout=5.0)).router.timeout, 5.0)
+
+    def test_route_skips_unconfigured_providers(self):
+        router = ModelRouter()
+        replay = ReplayChatCompletionClient(["ok"])
+        routed = router.route(lambda provider: replay if provider == "azure" else None)
+        self.assertIsNotNone(routed)
+        self.assertEqual(routed.provider, "azure")  # type: ignore
+        self.assertIsNone(router.route(lambda provider: None))
+
+
+class TestRoutedChatCompletionClient(unittest.IsolatedAsyncioTestCase):
+
+    async def test_fails_over_on_error(self):
+        router = ModelRouter()
+        client = RoutedChatCompletionClient(router, [("grok", FailingClient([])), ("azure", ReplayChatCompletionClient(["fine"]))])
+        with self.assertLogs("model_router", level="WARNING") as logs:
+            result = await client.create([UserMessage(content="Hi", source="user")])
+        self.assertEqual(result.content, "fine")
+        self.assertIn("failing over", logs.output[0])
+        self.assertEqual(router.stats["grok"].error_rate, 1.0)
+        self.assertEqual(router.stats["azure"].error_rate, 0.0)
+
+    async def test_permanent_errors_do_not_fail_over(self):
+        fallback = ReplayChatCompletionClient(["fine"])
+        fallback.create = mock.AsyncMock()  # type: ignore[method-assign]
+        client = RoutedChatCompletionClient(ModelRouter(), [("grok", FailingClient([], status_code=400)), ("azure", fallback)])
+        with self.assertRaises(StatusError):
+            await client.create([UserMessage(content="Hi", source="user")])
+        fallback.create.assert_not_called()
+
+    async def test_fails_over_on_open_circuit(self):
+        open_circuit = FailingClient([])
+        open_circuit.create = mock.AsyncMock(side_effect=CircuitOpenError("open"))  # type: ignore[method-assign]
+        client = RoutedChatCompletionClient(ModelRouter(), [("grok", open_circuit), ("azure", ReplayChatCompletionClient(["fine"]))])
+        with self.assertLogs("model_router", level="WARNING"):
+            result = await client.create([UserMessage(content="Hi", source="user")])
+        self.assertEqual(result.content, "fine")
+
+    async def test_fails_over_on_timeout(self):
+        router = ModelRouter(timeout=0.01)
+        client = RoutedChatCompletionClient(router, [("grok", HangingClient([])), ("openai", ReplayChatCompletionClient(["fine"]))])
+        result = await client.create([UserMessage(content="Hi", source="user")])
+        self.assertEqual(result.content, "fine")
+
+    async def test_raises_when_every_provider_fails(self):
+        client = RoutedChatCompletionClient(ModelRouter(), [("grok", FailingClient([]))])
+        with self.assertLogs("model_router", level="WARNING"), self.assertRaises(StatusError):
+            await client.create([UserMessage(content="Hi", source="user")])
+
+
+if __name__ == '__main__':
+    unittest.main()
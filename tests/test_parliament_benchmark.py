@@ -0,0 +1,63 @@
+import os
+import tempfile
+import unittest
+
+from parliament_benchmark import BenchmarkResult, find_regressions, percentile, run_benchmark, write_member_config
+from personas_util import PersonasUtil
+
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), '..', 'src', 'config.toml')
+
+
+def make_result(sessions_per_second: float, peak_memory_kb: float) -> BenchmarkResult:
+    return BenchmarkResult(
+        members=2, max_messages=5, selection='llm', sessions=1, seconds=1.0,
+        sessions_per_second=sessions_per_second, selector_calls=4, selector_tokens=100, selector_overhead=0.1, turn_p50_ms=1.0, turn_p95_ms=2.0, turn_p99_ms=3.0,
+        peak_memory_kb=peak_memory_kb,
+    )
+
+
+class TestBenchmarkHelpers(unittest.TestCase):
+
+    def test_percentile(self):
+        self.assertEqual(percentile([], 50), 0.0)
+        self.assertEqual(percentile([3.0, 1.0, 2.0, 4.0], 50), 2.0)
+        self.assertEqual(percentile([3.0, 1.0, 2.0, 4.0], 99), 4.0)
+
+    def test_write_member_config(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'config.toml')
+            write_member_config(CONFIG_PATH, 3, path)
+            members = PersonasUtil(config_path=path).get_parliament_members()
+            self.assertEqual(list(members), ['shauli', 'amatzia', 'karakov'])
+            with self.assertRaises(ValueError):
+                write_member_config(CONFIG_PATH, 1, path)
+
+    def test_find_regressions(self):
+        baseline = [{"members": 2, "max_messages": 5, "sessions_per_second": 10.0, "peak_memory_kb": 100.0}]
+        self.assertEqual(find_regressions([make_result(8.0, 120.0)], baseline, tolerance=0.3), [])
+        regressions = find_regressions([make_result(5.0, 200.0)], baseline, tolerance=0.3)
+        self.assertEqual(len(regressions), 2)
+        self.assertEqual(find_regressions([make_result(1.0, 1.0)], [], tolerance=0.3), [])
+
+
+class TestRunBenchmark(unittest.IsolatedAsyncioTestCase):
+
+    async def test_offline_sessions_are_measured(self):
+        result = await run_benchmark(CONFIG_PATH, member_count=2, max_messages=4, sessions=2, concurrency=2)
+        self.assertEqual(result.sessions, 2)
+        # The task message does not go through the selector; every later message does, exactly once.
+        self.assertEqual(result.selector_calls, 2 * 3)
+        self.assertGreater(result.sessions_per_second, 0)
+        self.assertGreater(result.peak_memory_kb, 0)
+        self.assertLessEqual(result.turn_p50_ms, result.turn_p99_ms)
+
+    async def test_heuristic_selection_skips_the_selector_model(self):
+        result = await run_benchmark(
+            CONFIG_PATH, member_count=3, max_messages=4, selection='round_robin', sessions=1, concurrency=1
+        )
+        self.assertEqual(result.selector_calls, 0)
+        self.assertEqual(result.selector_tokens, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,9 @@
 import unittest
 import os
-from src.personas_util import PersonasUtil
+import tempfile
+from unittest import mock
+import personas_util as personas_util_module
+from personas_util import PersonaConfigError, PersonasUtil
 
 class TestPersonasUtil(unittest.TestCase):
 
@@ -88,5 +91,64 @@ instructions = "Scripter's instructions"
         persona = self.personas_util.get_persona('non_existent')
         self.assertEqual(persona, {})
 
+class TestPersonasRegistry(unittest.TestCase):
+
+    def setUp(self):
+        personas_util_module.clear_cache()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.config_path = os.path.join(self.tmp_dir.name, 'config.toml')
+        self._write('[avi]\nname = "Avi"\nrole = "Unemployed"\ninstructions = "Avi\'s instructions"\n')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+        personas_util_module.clear_cache()
+
+    def _write(self, content):
+        with open(self.config_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        # Make sure the modification time changes even on coarse-grained filesystems.
+        stat = os.stat(self.config_path)
+        os.utime(self.config_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    def test_file_is_parsed_once_per_path(self):
+        with mock.patch.object(personas_util_module.toml, 'load', wraps=personas_util_module.toml.load) as load:
+            PersonasUtil(config_path=self.config_path).get_parliament_members()
+            PersonasUtil(config_path=self.config_path).get_persona('avi')
+            self.assertEqual(load.call_count, 1)
+
+    def test_reloads_when_file_changes(self):
+        personas_util = PersonasUtil(config_path=self.config_path)
+        self.assertEqual(list(personas_util.get_parliament_members()), ['avi'])
+        self._write('[avi]\nname = "Avi"\ninstructions = "New"\n\n[shauli]\nname = "Shauli"\ninstructions = "S"\n')
+        self.assertEqual(sorted(personas_util.get_parliament_members()), ['avi', 'shauli'])
+        self.assertEqual(personas_util.get_persona('avi')['instructions'], "New")
+
+    def test_getters_return_copies(self):
+        personas_util = PersonasUtil(config_path=self.config_path)
+        personas_util.get_persona('avi')['instructions'] = "Changed"
+        personas_util.get_parliament_members()['avi']['name'] = "Changed"
+        personas_util.get_members_by_role('Unemployed').clear()
+        other = PersonasUtil(config_path=self.config_path)
+        self.assertEqual(other.get_persona('avi')['instructions'], "Avi's instructions")
+        self.assertEqual(other.get_parliament_members()['avi']['name'], "Avi")
+        self.assertEqual(list(other.get_members_by_role('Unemployed')), ['avi'])
+
+    def test_members_by_role(self):
+        personas_util = PersonasUtil(config_path=self.config_path)
+        self.assertEqual(list(personas_util.get_members_by_role('Unemployed')), ['avi'])
+        self.assertEqual(personas_util.get_members_by_role('Dentist'), {})
+
+    def test_invalid_schema_is_rejected_up_front(self):
+        self._write('[avi]\nname = "Avi"\n')
+        with self.assertRaises(PersonaConfigError):
+            PersonasUtil(config_path=self.config_path)
+
+    def test_broken_edit_keeps_previous_personas(self):
+        personas_util = PersonasUtil(config_path=self.config_path)
+        self._write('[avi]\nname = "Avi"\n')
+        self.assertEqual(personas_util.get_persona('avi')['instructions'], "Avi's instructions")
+        self._write('[avi\nname = ')
+        self.assertEqual(personas_util.get_persona('avi')['instructions'], "Avi's instructions")
+
 if __name__ == '__main__':
     unittest.main()
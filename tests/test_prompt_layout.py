@@ -0,0 +1,32 @@
+import unittest
+
+from prompt_layout import build_selector_prompt, split_topic_lines
+
+SCRIPTER = """You moderate the pub.
+Today's topic: {0}.
+Keep it {light}."""
+
+
+class TestPromptLayout(unittest.TestCase):
+
+    def test_split_topic_lines(self):
+        persona, topic = split_topic_lines(SCRIPTER, "beer")
+        self.assertEqual(persona, "You moderate the pub.\nKeep it {light}.")
+        self.assertEqual(topic, "Today's topic: beer.")
+        self.assertEqual(split_topic_lines("No placeholder.", "beer")[1], "Today's topic: beer.")
+
+    def test_selector_prompt_is_prefix_stable(self):
+        beer = build_selector_prompt(SCRIPTER, "beer")
+        weather = build_selector_prompt(SCRIPTER, "weather")
+        shared = beer[:beer.index("beer")]
+        self.assertTrue(weather.startswith(shared))
+        self.assertIn("{roles}", shared)
+
+        prompt = beer.format(roles="Avi: Sarcastic.", participants="['Avi']", history="Avi: hi")
+        positions = [prompt.index(part) for part in ("You moderate", "Avi: Sarcastic.", "beer", "Avi: hi", "['Avi']")]
+        self.assertEqual(positions, sorted(positions))
+        self.assertIn("Keep it {light}.", prompt)
+
+
+if __name__ == '__main__':
+    unittest.main()
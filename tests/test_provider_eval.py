@@ -0,0 +1,173 @@
+import io
+import os
+import tempfile
+import time
+import unittest
+from contextlib import redirect_stdout
+from unittest.mock import patch
+
+from agents_factory import AgentsFactory
+from mock_client import MockChatCompletionClient
+from parliament import build_parliament_agents
+from personas_util import PersonasUtil
+from provider_eval import EvalResult, evaluate_providers, main, parse_score, update_leaderboard
+from provider_leaderboard import ProviderLeaderboard
+
+CONFIG = """
+[shauli]
+name = "Shauli"
+instructions = "Shauli's instructions"
+description = "Group leader."
+
+[avi]
+name = "Avi"
+instructions = "Avi's instructions"
+description = "Sarcastic."
+
+[agents.scripter]
+name = "Scripter"
+instructions = "Pick the next speaker. Today's topic: {0}."
+"""
+
+
+class FailingClient(MockChatCompletionClient):
+
+    async def create(self, messages, **kwargs):
+        raise ConnectionError("down")
+
+
+class TestProviderEval(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.config_path = os.path.join(self.tmp_dir.name, 'config.toml')
+        with open(self.config_path, 'w', encoding='utf-8') as f:
+            f.write(CONFIG)
+        self.personas_util = PersonasUtil(config_path=self.config_path, auto_reload=False)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    async def test_fans_out_to_every_provider_at_once(self):
+        async with AgentsFactory(offline=True, mock_settings={"latency_ms": "200"}) as factory:
+            loop_start = time.perf_counter()
+            results = await evaluate_providers("weather", self.personas_util, factory.get_client, rounds=2)
+            elapsed = time.perf_counter() - loop_start
+
+        self.assertEqual(len(results), 2 * 3 * 2)
+        self.assertEqual({(r.persona, r.provider) for r in results},
+                         {(p, c) for p in ("Shauli", "Avi") for c in ("grok", "azure", "openai")})
+        self.assertTrue(all(r.error is None and r.output and r.completion_tokens > 0 for r in results))
+        # Twelve 200ms calls in parallel take about as long as one.
+        self.assertLess(elapsed, 1.0)
+
+    async def test_failures_and_judge_scores_are_recorded(self):
+        clients = {"grok": MockChatCompletionClient(), "azure": FailingClient()}
+        judge = MockChatCompletionClient(responses=["Score: 7"])
+
+        results = await evaluate_providers(
+            "weather", self.personas_util, clients.get, providers=["grok", "azure", "openai"], judge=judge
+        )
+
+        by_provider = {(r.persona, r.provider): r for r in results}
+        self.assertEqual(len(results), 4)
+        self.assertEqual(by_provider["Avi", "grok"].score, 7.0)
+        self.assertIn("ConnectionError", by_provider["Avi", "azure"].error)
+        self.assertIsNone(by_provider["Avi", "azure"].score)
+
+    async def test_invalid_rounds(self):
+        with self.assertRaises(ValueError):
+            await evaluate_providers("weather", self.personas_util, lambda provider: None, rounds=0)
+
+    def test_parse_score(self):
+        self.assertEqual(parse_score("8"), 8.0)
+        self.assertEqual(parse_score("I'd say 12 out of 10"), 10.0)
+        self.assertIsNone(parse_score("great"))
+
+    async def test_cli_writes_the_leaderboard(self):
+        leaderboard_path = os.path.join(self.tmp_dir.name, 'leaderboard.json')
+        results_path = os.path.join(self.tmp_dir.name, 'results.jsonl')
+        with redirect_stdout(io.StringIO()):
+            await main(['weather', '--config', self.config_path, '--offline', '--leaderboard', leaderboard_path,
+                        '--results', results_path, '--providers', 'grok', 'openai'])
+
+        leaderboard = ProviderLeaderboard.load(leaderboard_path)
+        self.assertEqual(set(leaderboard.entries), {"Shauli", "Avi"})
+        self.assertEqual(set(leaderboard.ranking("Avi")), {"grok", "openai"})
+        with open(results_path, encoding='utf-8') as f:
+            self.assertEqual(len(f.readlines()), 4)
+
+
+class TestProviderLeaderboard(unittest.TestCase):
+
+    def setUp(self):
+        self.leaderboard = ProviderLeaderboard()
+        update_leaderboard(self.leaderboard, [
+            EvalResult("Avi", "grok", 0, 2.0, score=6.0),
+            EvalResult("Avi", "azure", 0, 1.0, score=8.0),
+            EvalResult("Avi", "openai", 0, 0.5, error="TimeoutError"),
+            EvalResult("Shauli", "grok", 0, 2.0),
+            EvalResult("Shauli", "openai", 0, 0.5),
+        ])
+
+    def test_ranking_prefers_score_then_latency(self):
+        self.assertEqual(self.leaderboard.ranking("Avi"), ["azure", "grok"])
+        self.assertEqual(self.leaderboard.ranking("Shauli"), ["openai", "grok"])
+        self.assertEqual(self.leaderboard.best("Avi", available=["grok", "openai"]), "grok")
+        self.assertEqual(dict(self.leaderboard.assignments(["Avi", "Shauli", "Moshe"])),
+                         {"Avi": "azure", "Shauli": "openai"})
+
+    def test_unjudged_providers_are_ranked_by_latency_only(self):
+        update_leaderboard(self.leaderboard, [
+            EvalResult("Hektor", "grok", 0, 2.0, score=6.0),
+            EvalResult("Hektor", "azure", 0, 3.0, score=8.0),
+            EvalResult("Hektor", "openai", 0, 1.0),
+        ])
+        # openai was never judged: it is faster than both, not worse than both.
+        self.assertEqual(self.leaderboard.ranking("Hektor"), ["openai", "azure", "grok"])
+        self.assertEqual(self.leaderboard.ranking("Hektor", available=["grok", "openai"]), ["openai", "grok"])
+
+    def test_frequent_failures_rank_last(self):
+        for _ in range(3):
+            self.leaderboard.score("Avi", "azure").add(0.0, error=True)
+        self.assertEqual(self.leaderboard.ranking("Avi"), ["grok", "azure"])
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'leaderboard.json')
+            self.assertEqual(ProviderLeaderboard.load(path).entries, {})
+            self.leaderboard.save(path)
+            loaded = ProviderLeaderboard.load(path)
+        self.assertEqual(loaded.entries, self.leaderboard.entries)
+        self.assertIn("azure", loaded.report())
+
+    def test_factory_assigns_members_their_best_configured_provider(self):
+        factory = AgentsFactory(offline=True, leaderboard=self.leaderboard)
+        self.assertEqual(factory.member_client_types(["Avi", "Shauli"]), {"Avi": "azure", "Shauli": "openai"})
+        self.assertEqual(AgentsFactory(offline=True).member_client_types(["Avi"]), {})
+
+    def test_factory_assigns_providers_without_building_clients(self):
+        factory = AgentsFactory(leaderboard=self.leaderboard)
+        env = {"GROK_DEPLOYMENT_NAME": "grok-3", "GROK_ENDPOINT": "https://grok.test", "AZURE_API_KEY": "test",
+               "OPENAI_API_KEY": "test"}
+        output = io.StringIO()
+        with patch.dict(os.environ, env, clear=True), redirect_stdout(output):
+            self.assertEqual(factory.member_client_types(["Avi", "Shauli"]), {"Avi": "grok", "Shauli": "openai"})
+        self.assertEqual(factory.pool_size, 0)
+        self.assertEqual(output.getvalue(), "")
+
+    def test_members_use_their_assigned_client(self):
+        members = {"avi": {"name": "Avi", "instructions": "Avi's instructions"},
+                   "shauli": {"name": "Shauli", "instructions": "Shauli's instructions"}}
+        requested = []
+
+        def client_provider(client_type):
+            requested.append(client_type)
+            return MockChatCompletionClient()
+
+        build_parliament_agents(members, client_provider, member_client_types={"Avi": "azure"})
+        self.assertEqual(requested, ["azure", "auto"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,208 @@
+import asyncio
+import os
+import time
+import unittest
+from unittest import mock
+
+from autogen_core import CancellationToken
+from autogen_core.models import UserMessage
+
+from agents_factory import AgentsFactory
+from metrics import MetricsChatCompletionClient
+from mock_client import MockChatCompletionClient
+from resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    ProviderGuard,
+    ResilienceSettings,
+    ResilientChatCompletionClient,
+    deadline_scope,
+    is_retryable,
+)
+
+MESSAGES = [UserMessage(content="hello", source="user")]
+
+
+class StatusError(Exception):
+
+    def __init__(self, status_code: int):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+class FlakyClient(MockChatCompletionClient):
+    """Fails with the given errors, in order, then answers."""
+
+    def __init__(self, errors, **kwargs):
+        super().__init__(responses=["ok"], **kwargs)
+        self.errors = list(errors)
+        self.attempts = 0
+
+    async def create(self, *args, **kwargs):  # type: ignore[override]
+        self.attempts += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return await super().create(*args, **kwargs)
+
+
+class HangingClient(MockChatCompletionClient):
+
+    async def create(self, *args, **kwargs):  # type: ignore[override]
+        await asyncio.sleep(10)
+
+
+def make_client(inner, **settings):
+    settings.setdefault("backoff_base", 0.001)
+    return ResilientChatCompletionClient(inner, ProviderGuard("azure", ResilienceSettings(**settings)), seed=0)
+
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def test_opens_and_half_opens(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+        self.assertFalse(breaker.record_failure())
+        self.assertTrue(breaker.record_failure())
+        self.assertEqual(breaker.state, 'open')
+        self.assertFalse(breaker.allow())
+        time.sleep(0.06)
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())  # Only one trial call at a time.
+        breaker.record_success()
+        self.assertEqual(breaker.state, 'closed')
+
+    def test_is_retryable(self):
+        self.assertTrue(is_retryable(StatusError(429)))
+        self.assertTrue(is_retryable(StatusError(503)))
+        self.assertTrue(is_retryable(asyncio.TimeoutError()))
+        self.assertFalse(is_retryable(StatusError(400)))
+        self.assertFalse(is_retryable(ValueError("bad request")))
+
+
+class TestResilientClient(unittest.IsolatedAsyncioTestCase):
+
+    async def test_retries_transient_errors(self):
+        inner = FlakyClient([StatusError(429), StatusError(502)])
+        client = make_client(inner)
+        result = await client.create(MESSAGES)
+        self.assertEqual(result.content, "ok")
+        self.assertEqual(inner.attempts, 3)
+        counters = client.guard.counters
+        self.assertEqual((counters.calls, counters.successes, counters.failures, counters.retries), (1, 1, 2, 2))
+
+    async def test_permanent_errors_are_not_retried(self):
+        inner = FlakyClient([StatusError(400)])
+        client = make_client(inner)
+        with self.assertRaises(StatusError):
+            await client.create(MESSAGES)
+        self.assertEqual(inner.attempts, 1)
+        self.assertEqual(client.guard.breaker.consecutive_failures, 0)
+
+    async def test_timeout(self):
+        client = make_client(HangingClient(), timeout=0.05, max_retries=1)
+        with self.assertRaises(asyncio.TimeoutError):
+            await client.create(MESSAGES)
+        self.assertEqual(client.guard.counters.timeouts, 2)
+
+    async def test_open_circuit_fails_fast(self):
+        client = make_client(FlakyClient([StatusError(503)] * 3), max_retries=0, failure_threshold=2)
+        for _ in range(2):
+            with self.assertRaises(StatusError):
+                await client.create(MESSAGES)
+        with self.assertRaises(CircuitOpenError):
+            await client.create(MESSAGES)
+        snapshot = client.guard.snapshot()
+        self.assertEqual((snapshot["rejected"], snapshot["circuit_opens"], snapshot["circuit"]), (1, 1, 'open'))
+
+    async def test_permanent_error_on_the_trial_call_releases_it(self):
+        inner = FlakyClient([StatusError(503), StatusError(400)])
+        client = make_client(inner, max_retries=0, failure_threshold=1, reset_timeout=0.05)
+        with self.assertRaises(StatusError):
+            await client.create(MESSAGES)
+        await asyncio.sleep(0.06)
+        with self.assertRaises(StatusError):
+            await client.create(MESSAGES)  # The half-open trial call.
+        self.assertEqual(client.guard.breaker.state, 'half_open')
+
+        result = await client.create(MESSAGES)
+        self.assertEqual(result.content, "ok")
+        self.assertEqual(client.guard.breaker.state, 'closed')
+        self.assertEqual(client.guard.counters.rejected, 0)
+
+    async def test_bounded_concurrency(self):
+        guard = ProviderGuard("azure", ResilienceSettings(max_concurrency=2))
+        clients = [ResilientChatCompletionClient(MockChatCompletionClient(latency_ms=20), guard) for _ in range(5)]
+        await asyncio.gather(*(client.create(MESSAGES) for client in clients))
+        self.assertEqual(guard.counters.max_in_flight, 2)
+        self.assertEqual(guard.counters.in_flight, 0)
+
+    async def test_deadline_shortens_timeout_and_cancels_token(self):
+        client = make_client(HangingClient(), timeout=10, max_retries=3)
+        token = CancellationToken()
+        start = time.monotonic()
+        with deadline_scope(0.05, token):
+            with self.assertRaises(asyncio.TimeoutError):
+                await client.create(MESSAGES)
+        self.assertLess(time.monotonic() - start, 1.0)
+        self.assertTrue(token.is_cancelled())
+
+    async def test_stream_retries_before_first_chunk(self):
+        inner = FlakyClient([StatusError(429)])
+        inner.create_stream = mock.MagicMock(side_effect=[  # type: ignore[method-assign]
+            self._failing_stream(), MockChatCompletionClient(responses=["ok"]).create_stream(MESSAGES)
+        ])
+        client = make_client(inner)
+        chunks = [chunk async for chunk in client.create_stream(MESSAGES)]
+        self.assertEqual(chunks[0], "ok")
+        self.assertEqual(client.guard.counters.retries, 1)
+
+    async def test_stream_attempts_time_out(self):
+        inner = MockChatCompletionClient()
+        inner.create_stream = mock.MagicMock(side_effect=[  # type: ignore[method-assign]
+            self._hanging_stream(), MockChatCompletionClient(responses=["ok"]).create_stream(MESSAGES)
+        ])
+        client = make_client(inner, timeout=0.05)
+        start = time.monotonic()
+        chunks = [chunk async for chunk in client.create_stream(MESSAGES)]
+        self.assertLess(time.monotonic() - start, 1.0)
+        self.assertEqual(chunks[0], "ok")
+        self.assertEqual((client.guard.counters.timeouts, client.guard.counters.retries), (1, 1))
+
+    async def test_stream_timeout_excludes_the_callers_time(self):
+        client = make_client(MockChatCompletionClient(responses=["a b c d"]), timeout=0.05)
+        chunks = []
+        async for chunk in client.create_stream(MESSAGES):
+            chunks.append(chunk)
+            await asyncio.sleep(0.03)
+        self.assertEqual(client.guard.counters.timeouts, 0)
+        self.assertGreater(len(chunks), 2)
+
+    async def _hanging_stream(self):
+        await asyncio.sleep(10)
+        yield "never"  # pragma: no cover
+
+    async def _failing_stream(self):
+        raise StatusError(429)
+        yield  # pragma: no cover
+
+
+class TestAgentsFactoryResilience(unittest.IsolatedAsyncioTestCase):
+
+    async def test_factory_wraps_clients_per_provider(self):
+        with mock.patch.dict(os.environ, {}, clear=True):
+            async with AgentsFactory(offline=True) as factory:
+                client = factory.get_client("azure")
+                self.assertIsInstance(client, ResilientChatCompletionClient)
+                assert client is not None
+                await client.create(MESSAGES)
+                self.assertEqual(factory.resilience_snapshot()["azure"]["successes"], 1)
+
+    async def test_disabled(self):
+        async with AgentsFactory(resilience=ResilienceSettings(enabled=False)) as factory:
+            client = factory.get_client("mock")
+            self.assertIsInstance(client, MetricsChatCompletionClient)
+            self.assertIsInstance(client.inner, MockChatCompletionClient)  # type: ignore[union-attr]
+            self.assertEqual(factory.resilience_snapshot(), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from autogen_core.models import CreateResult, RequestUsage, UserMessage
+from autogen_ext.models.replay import ReplayChatCompletionClient
+
+from agents_factory import AgentsFactory
+from response_cache import CachedChatCompletionClient, LRUCacheStore, SQLiteCacheStore, make_cache_key
+
+
+def make_result(content: str) -> CreateResult:
+    return CreateResult(finish_reason="stop", content=content, usage=RequestUsage(prompt_tokens=3, completion_tokens=1), cached=False)
+
+
+class TestLRUCacheStore(unittest.TestCase):
+
+    def test_evicts_least_recently_used(self):
+        store = LRUCacheStore(max_entries=2)
+        store.set("a", make_result("a"))
+        store.set("b", make_result("b"))
+        store.get("a")
+        store.set("c", make_result("c"))
+        self.assertIsNone(store.get("b"))
+        self.assertIsNotNone(store.get("a"))
+        self.assertEqual(len(store), 2)
+
+    def test_expires_after_ttl(self):
+        store = LRUCacheStore(ttl_seconds=10)
+        with mock.patch("response_cache.time.time", return_value=100.0):
+            store.set("a", make_result("a"))
+        with mock.patch("response_cache.time.time", return_value=105.0):
+            self.assertIsNotNone(store.get("a"))
+        with mock.patch("response_cache.time.time", return_value=111.0):
+            self.assertIsNone(store.get("a"))
+
+
+class TestSQLiteCacheStore(unittest.TestCase):
+
+    def test_round_trip_survives_reopen(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "cache.sqlite")
+            store = SQLiteCacheStore(path)
+            store.set("a", make_result("hello"))
+            store.close()
+
+            reopened = SQLiteCacheStore(path)
+            self.assertEqual(reopened.get("a").content, "hello")  # type: ignore
+            self.assertIsNone(reopened.get("missing"))
+            reopened.close()
+
+
+class TestCachedChatCompletionClient(unittest.IsolatedAsyncioTestCase):
+
+    async def test_second_identical_request_is_a_hit(self):
+        inner = ReplayChatCompletionClient(["first", "second"])
+        client = CachedChatCompletionClient(inner, LRUCacheStore(), "grok:model")
+        messages = [UserMessage(content="Hi", source="user")]
+
+        first = await client.create(messages)
+        second = await client.create(messages)
+
+        self.assertEqual(first.content, "first")
+        self.assertEqual(second.content, "first")
+        self.assertTrue(second.cached)
+        self.assertEqual((client.stats.hits, client.stats.misses), (1, 1))
+
+    async def test_stream_hit_replays_content(self):
+        client = CachedChatCompletionClient(ReplayChatCompletionClient(["streamed"]), LRUCacheStore(), "grok:model")
+        messages = [UserMessage(content="Hi", source="user")]
+        await client.create(messages)
+
+        chunks = [chunk async for chunk in client.create_stream(messages)]
+        self.assertEqual(chunks[0], "streamed")
+        self.assertTrue(chunks[-1].cached)  # type: ignore
+
+    def test_key_depends_on_namespace_and_sampling_params(self):
+        messages = [UserMessage(content="Hi", source="user")]
+        base = make_cache_key("grok:model", messages)
+        self.assertEqual(base, make_cache_key("grok:model", messages))
+        self.assertNotEqual(base, make_cache_key("azure:model", messages))
+        self.assertNotEqual(base, make_cache_key("grok:model", messages, extra_create_args={"temperature": 0.1}))
+        self.assertNotEqual(base, make_cache_key("grok:model", messages, tool_choice="none"))
+
+    async def test_factory_keeps_sampling_settings_apart(self):
+        env = {"GROK_DEPLOYMENT_NAME": "grok-3", "GROK_ENDPOINT": "https://example.com", "AZURE_API_KEY": "key"}
+        with mock.patch.dict(os.environ, env):
+            async with AgentsFactory(cache_store=LRUCacheStore()) as factory:
+                client = factory.get_client("grok")
+                self.assertEqual(client.namespace, "grok:grok-3:temperature=0.7")  # type: ignore[union-attr]
+
+
+if __name__ == '__main__':
+    unittest.main()
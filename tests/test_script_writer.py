@@ -0,0 +1,79 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+
+from autogen_agentchat.messages import TextMessage
+from autogen_core import FunctionCall
+from autogen_core.models import CreateResult, ModelFamily, RequestUsage
+from autogen_ext.models.replay import ReplayChatCompletionClient
+
+from parliament import build_parliament_agents
+from script_writer import ScriptWriter, format_turn
+from tool_registry import ToolRegistry
+
+
+class TestScriptWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.script_path = os.path.join(self.tmp_dir.name, 'script.txt')
+        self.jsonl_path = os.path.join(self.tmp_dir.name, 'script.jsonl')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_format_turn_skips_user_messages(self):
+        self.assertIsNone(format_turn(TextMessage(content="topic", source="user")))
+        self.assertEqual(format_turn(TextMessage(content="Hi", source="Avi")), "Avi: Hi\n\n")
+
+    def test_each_turn_is_on_disk_before_the_next_arrives(self):
+        with ScriptWriter(self.script_path, jsonl_path=self.jsonl_path) as writer:
+            self.assertFalse(writer.write(TextMessage(content="topic", source="user")))
+            self.assertTrue(writer.write(TextMessage(content="Hello", source="Shauli")))
+            with open(self.script_path, encoding='utf-8') as f:
+                self.assertEqual(f.read(), "Shauli: Hello\n\n")
+            writer.write(TextMessage(content="Whatever", source="Avi"))
+
+        with open(self.jsonl_path, encoding='utf-8') as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual([(r["turn"], r["source"], r["content"]) for r in records],
+                         [(0, "Shauli", "Hello"), (1, "Avi", "Whatever")])
+
+    def test_tool_calls_stay_out_of_the_script(self):
+        async def get_weather(city: str) -> str:
+            """Get weather for a given city"""
+            return f"The weather in {city} is sunny."
+
+        tools = ToolRegistry()
+        tools.register(get_weather)
+        call = FunctionCall(id="1", name="get_weather", arguments='{"city": "Haifa"}')
+        usage = RequestUsage(prompt_tokens=0, completion_tokens=0)
+        client = ReplayChatCompletionClient(
+            [CreateResult(finish_reason="function_calls", content=[call], usage=usage, cached=False), "Sunny."],
+            model_info={
+                "vision": False, "function_calling": True, "json_output": False,
+                "family": ModelFamily.UNKNOWN, "structured_output": False,
+            },
+        )
+        [agent] = build_parliament_agents(
+            {"shauli": {"name": "Shauli", "instructions": "Shauli's instructions"}},
+            lambda client_type: client, tools=tools.create_tools(),
+        )
+        result = asyncio.run(agent.run(task="How is the weather?"))
+        self.assertGreater(len(result.messages), 2)  # The tool call request and execution events.
+
+        with ScriptWriter(self.script_path) as writer:
+            for msg in result.messages:
+                writer.write(msg)
+        with open(self.script_path, encoding='utf-8') as f:
+            self.assertEqual(f.read(), "Shauli: Sunny.\n\n")
+
+    def test_write_requires_open(self):
+        with self.assertRaises(RuntimeError):
+            ScriptWriter(self.script_path).write(TextMessage(content="Hi", source="Avi"))
+
+
+if __name__ == '__main__':
+    unittest.main()
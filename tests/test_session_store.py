@@ -0,0 +1,212 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from autogen_agentchat.messages import TextMessage
+
+from mock_client import MockChatCompletionClient
+from parliament import run_parliament_session
+from personas_util import PersonasUtil
+from session_store import _SCHEMA, COMPLETED, FAILED, RUNNING, SessionStore, persona_set_key, topic_key
+from token_budget import SessionUsage
+from transcript import TranscriptStore
+
+CONFIG = """
+[shauli]
+name = "Shauli"
+instructions = "Shauli's instructions"
+description = "Group leader."
+
+[avi]
+name = "Avi"
+instructions = "Avi's instructions"
+description = "Sarcastic."
+
+[agents.scripter]
+name = "Scripter"
+instructions = "Pick the next speaker. Today's topic: {0}."
+"""
+
+
+class CrashingClient(MockChatCompletionClient):
+    """Fails every call after the first `healthy_calls`."""
+
+    def __init__(self, healthy_calls: int, **kwargs):
+        super().__init__(speakers=["Avi", "Shauli"], **kwargs)
+        self.healthy_calls = healthy_calls
+
+    async def create(self, *args, **kwargs):  # type: ignore[override]
+        if self.calls >= self.healthy_calls:
+            raise RuntimeError("provider went away")
+        return await super().create(*args, **kwargs)
+
+
+def usage_limit_after_crash(store):
+    """A token budget the failed session in the store has already used up."""
+    [failed] = store.find_sessions(status=FAILED)
+    restored = SessionUsage()
+    restored.load(store.load_usage(failed.session_id) or {})
+    return restored.total_tokens
+
+
+class TestSessionStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = SessionStore(os.path.join(self.tmp.name, 'sessions.sqlite'))
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def test_keys(self):
+        self.assertEqual(topic_key("  The   Weather "), "the weather")
+        self.assertEqual(persona_set_key(["Shauli", "avi", "Avi"]), "avi,shauli")
+
+    def test_checkpoint_and_index(self):
+        session_id = self.store.start_session("Weather", "avi,shauli", max_messages=5)
+        message = TextMessage(content="Cheers", source="Avi")
+        self.store.checkpoint(session_id, [message.dump()], {"agent_states": {}})
+        self.store.checkpoint(session_id, [message.dump()], {"agent_states": {"Avi": {}}})
+
+        record = self.store.get_session(session_id)
+        assert record is not None
+        self.assertEqual((record.status, record.message_count), (RUNNING, 2))
+        self.assertEqual(self.store.load_state(session_id), {"agent_states": {"Avi": {}}})
+        self.assertEqual([m["content"] for m in self.store.get_messages(session_id)], ["Cheers", "Cheers"])
+        # A running session is someone else's until it fails or goes stale.
+        self.assertIsNone(self.store.find_resumable("weather", "avi,shauli"))
+        self.store.finish(session_id, FAILED, "boom")
+        self.assertEqual(self.store.find_resumable("weather ", "avi,shauli").session_id, session_id)  # type: ignore[union-attr]
+        self.assertIsNone(self.store.find_resumable("weather", "avi"))
+
+        self.store.finish(session_id, COMPLETED, "done")
+        self.assertIsNone(self.store.find_resumable("weather", "avi,shauli"))
+        self.assertEqual([r.session_id for r in self.store.find_sessions(topic="WEATHER", status=COMPLETED)], [session_id])
+        self.assertEqual(self.store.find_sessions(persona_set="avi"), [])
+
+    def test_a_session_is_claimed_once(self):
+        session_id = self.store.start_session("weather", "avi,shauli", max_messages=5)
+        self.store.checkpoint(session_id, [], {}, usage={"Avi": {"provider": "grok", "completion_tokens": 7}})
+        self.store.finish(session_id, FAILED)
+        other = SessionStore(self.store.path)
+        try:
+            self.assertEqual(self.store.claim_resumable("weather", "avi,shauli").session_id, session_id)  # type: ignore[union-attr]
+            self.assertIsNone(other.claim_resumable("weather", "avi,shauli"))
+        finally:
+            other.close()
+        self.assertEqual(self.store.get_session(session_id).status, RUNNING)  # type: ignore[union-attr]
+        self.assertEqual(self.store.load_usage(session_id), {"Avi": {"provider": "grok", "completion_tokens": 7}})
+
+    def test_stale_running_sessions_are_resumable(self):
+        store = SessionStore(self.store.path, stale_after=0.0)
+        try:
+            session_id = store.start_session("weather", "avi,shauli", max_messages=5)
+            store.checkpoint(session_id, [], {})
+            self.assertEqual(store.claim_resumable("weather", "avi,shauli").session_id, session_id)  # type: ignore[union-attr]
+        finally:
+            store.close()
+
+    def test_stores_without_a_usage_column_are_upgraded(self):
+        path = os.path.join(self.tmp.name, 'old.sqlite')
+        conn = sqlite3.connect(path)
+        conn.executescript(_SCHEMA.replace("    usage TEXT,\n", ""))
+        conn.close()
+        store = SessionStore(path)
+        try:
+            session_id = store.start_session("weather", "avi", max_messages=5)
+            store.checkpoint(session_id, [], {}, usage={})
+            self.assertEqual(store.load_usage(session_id), {})
+        finally:
+            store.close()
+
+    def test_checkpoint_unknown_session(self):
+        with self.assertRaises(KeyError):
+            self.store.checkpoint("missing", [], {})
+
+
+class TestCheckpointedSession(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        config_path = os.path.join(self.tmp.name, 'config.toml')
+        with open(config_path, 'w', encoding='utf-8') as f:
+            f.write(CONFIG)
+        self.personas_util = PersonasUtil(config_path=config_path)
+        self.store = SessionStore(os.path.join(self.tmp.name, 'sessions.sqlite'))
+        self.script_path = os.path.join(self.tmp.name, 'script.txt')
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    async def run_session(self, client, max_messages=6, **kwargs):
+        return await run_parliament_session(
+            "weather", self.personas_util, lambda client_type: client,
+            output_path=self.script_path, max_messages=max_messages, session_store=self.store, **kwargs,
+        )
+
+    async def test_completed_session_is_indexed(self):
+        result = await self.run_session(MockChatCompletionClient(speakers=["Avi", "Shauli"]), max_messages=4)
+        assert result is not None
+        self.assertEqual((result.message_count, result.turns), (4, 3))
+        records = self.store.find_sessions(topic="weather", persona_set="avi,shauli", status=COMPLETED)
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0].message_count, 4)
+
+    async def test_crashed_session_resumes_from_last_turn(self):
+        # Each turn costs one selector call and one member call; crash during the third turn.
+        with self.assertRaises(RuntimeError):
+            await self.run_session(CrashingClient(healthy_calls=5))
+        failed = self.store.find_sessions(topic="weather", status=FAILED)
+        self.assertEqual(len(failed), 1)
+        self.assertEqual(failed[0].message_count, 3)
+
+        healthy = MockChatCompletionClient(speakers=["Avi", "Shauli"])
+        result = await self.run_session(healthy)
+        assert result is not None
+        self.assertEqual((result.message_count, result.turns), (6, 5))
+        # Only the three missing turns were paid for again.
+        self.assertEqual(healthy.calls, 6)
+        record = self.store.get_session(failed[0].session_id)
+        self.assertEqual(record.status, COMPLETED)  # type: ignore[union-attr]
+        with open(self.script_path, encoding='utf-8') as f:
+            self.assertEqual(f.read().count(": "), 5)
+
+    async def test_resume_keeps_the_usage_and_does_not_repeat_the_transcript(self):
+        transcripts = TranscriptStore(os.path.join(self.tmp.name, 'transcripts'))
+        self.addCleanup(transcripts.close)
+        with self.assertRaises(RuntimeError):
+            await self.run_session(CrashingClient(healthy_calls=5), usage=SessionUsage(), transcript_store=transcripts)
+
+        healthy = MockChatCompletionClient(speakers=["Avi", "Shauli"])
+        usage = SessionUsage()
+        await self.run_session(healthy, usage=usage, transcript_store=transcripts)
+
+        spent_now = healthy.total_usage().prompt_tokens + healthy.total_usage().completion_tokens
+        self.assertGreater(usage.total_tokens, spent_now)
+        resumed, crashed = transcripts.find(topic="weather")
+        self.assertEqual((crashed.turns, resumed.turns), (2, 3))
+
+    async def test_resumed_session_counts_earlier_spending_against_the_budget(self):
+        with self.assertRaises(RuntimeError):
+            await self.run_session(CrashingClient(healthy_calls=5), usage=SessionUsage())
+        healthy = MockChatCompletionClient(speakers=["Avi", "Shauli"])
+        usage = SessionUsage()
+        await self.run_session(healthy, usage=usage, max_total_tokens=usage_limit_after_crash(self.store))
+        # The budget was spent before the crash; the resumed run stops after its first turn.
+        self.assertEqual(healthy.calls, 2)
+
+    async def test_resume_can_be_disabled(self):
+        with self.assertRaises(RuntimeError):
+            await self.run_session(CrashingClient(healthy_calls=3))
+        await run_parliament_session(
+            "weather", self.personas_util, lambda client_type: MockChatCompletionClient(speakers=["Avi"]),
+            output_path=None, max_messages=3, session_store=self.store, resume=False,
+        )
+        self.assertEqual(len(self.store.find_sessions(topic="weather")), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
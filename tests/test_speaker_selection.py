@@ -0,0 +1,93 @@
+import unittest
+
+from autogen_agentchat.messages import TextMessage
+from autogen_core.models import UserMessage
+
+from mock_client import MockChatCompletionClient
+from speaker_selection import (
+    ClassifierSelector,
+    HybridSelector,
+    Participant,
+    RoundRobinSelector,
+    SelectionStats,
+    SelectionStatsChatCompletionClient,
+    SpeakerSelector,
+    WeightedSelector,
+    create_speaker_selector,
+)
+
+PARTICIPANTS = [
+    Participant("Shauli", "Group leader who loves football and beer.", "You talk about football all day."),
+    Participant("Avi", "Sarcastic taxi driver.", "You complain about traffic, taxis and the roads."),
+    Participant("Hektor", "Retired chef.", "You bring every topic back to cooking and recipes."),
+]
+
+
+def thread(*turns):
+    messages = [TextMessage(content="You are discussing today's topic: food.", source="user")]
+    messages += [TextMessage(content=content, source=source) for source, content in turns]
+    return messages
+
+
+class TestSpeakerSelectors(unittest.TestCase):
+
+    def test_selectors_must_implement_select(self):
+        with self.assertRaises(TypeError):
+            SpeakerSelector(PARTICIPANTS)  # type: ignore[abstract]
+
+    def test_round_robin(self):
+        selector = RoundRobinSelector(PARTICIPANTS)
+        self.assertEqual(selector(thread()), "Shauli")
+        self.assertEqual(selector(thread(("Shauli", "hi"))), "Avi")
+        self.assertEqual(selector(thread(("Shauli", "hi"), ("Hektor", "hello"))), "Shauli")
+
+    def test_weighted_never_repeats_the_last_speaker(self):
+        selector = WeightedSelector(PARTICIPANTS, seed=1)
+        for _ in range(20):
+            self.assertNotEqual(selector(thread(("Avi", "the traffic again"))), "Avi")
+
+    def test_classifier_follows_the_vocabulary(self):
+        selector = ClassifierSelector(PARTICIPANTS)
+        self.assertEqual(selector(thread(("Shauli", "who has a good recipe for cooking fish?"))), "Hektor")
+        self.assertEqual(selector(thread(("Hektor", "the traffic and the roads are terrible"))), "Avi")
+
+    def test_classifier_picks_the_member_addressed_by_name(self):
+        selector = ClassifierSelector(PARTICIPANTS)
+        probabilities = selector.probabilities(thread(("Hektor", "Shauli, what do you think about recipes?")))
+        self.assertEqual(probabilities["Shauli"], 1.0)
+
+    def test_hybrid_defers_to_the_model_when_unsure(self):
+        selector = HybridSelector(PARTICIPANTS, margin=0.99)
+        self.assertIsNone(selector(thread(("Shauli", "well"))))
+        self.assertEqual(selector(thread(("Hektor", "Avi, say something"))), "Avi")
+
+    def test_stats_record_picks_and_estimated_savings(self):
+        stats = SelectionStats()
+        selector = create_speaker_selector(
+            'round_robin', PARTICIPANTS, stats, MockChatCompletionClient(), "Pick one of {participants}.\n{history}"
+        )
+        assert selector is not None
+        selector(thread(("Shauli", "hi there")))
+        self.assertEqual(stats.heuristic_picks, 1)
+        self.assertGreater(stats.estimated_tokens_saved, 0)
+        self.assertIn("Saved: 1 selector calls", stats.report())
+
+    def test_create_speaker_selector(self):
+        self.assertIsNone(create_speaker_selector('llm', PARTICIPANTS))
+        self.assertIsInstance(create_speaker_selector('hybrid', PARTICIPANTS), HybridSelector)
+        with self.assertRaises(ValueError):
+            create_speaker_selector('telepathy', PARTICIPANTS)
+
+
+class TestSelectionStatsClient(unittest.IsolatedAsyncioTestCase):
+
+    async def test_records_selector_calls(self):
+        stats = SelectionStats()
+        client = SelectionStatsChatCompletionClient(MockChatCompletionClient(completion_tokens=2), stats)
+        await client.create([UserMessage(content="pick someone", source="user")])
+        self.assertEqual(stats.llm_calls, 1)
+        self.assertEqual(stats.llm_tokens, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
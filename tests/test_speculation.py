@@ -0,0 +1,121 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from autogen_agentchat.messages import TextMessage
+from autogen_core.models import SystemMessage, UserMessage
+
+from mock_client import MockChatCompletionClient
+from parliament import build_parliament_agents, run_parliament_session
+from personas_util import PersonasUtil
+from speculation import SpeculationStats, SpeculativePrefetcher
+
+CONFIG = """
+[shauli]
+name = "Shauli"
+instructions = "Shauli's instructions"
+description = "Group leader."
+
+[avi]
+name = "Avi"
+instructions = "Avi's instructions"
+description = "Sarcastic."
+
+[agents.scripter]
+name = "Scripter"
+instructions = "Pick the next speaker. Today's topic: {0}."
+"""
+
+MEMBERS = {
+    "shauli": {"name": "Shauli", "instructions": "Shauli's instructions", "description": "Group leader."},
+    "avi": {"name": "Avi", "instructions": "Avi's instructions", "description": "Sarcastic."},
+}
+
+
+class TestSpeculativePrefetcher(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def build(self, client, candidates=1):
+        prefetcher = SpeculativePrefetcher(candidates)
+        agents = build_parliament_agents(MEMBERS, lambda client_type: client, prefetcher=prefetcher)
+        return prefetcher, {agent.name: agent for agent in agents}
+
+    async def test_session_uses_the_prefetched_turns(self):
+        config_path = os.path.join(self.tmp_dir, 'config.toml')
+        with open(config_path, 'w', encoding='utf-8') as f:
+            f.write(CONFIG)
+        client = MockChatCompletionClient(speakers=["Shauli", "Avi"], latency_ms=20)
+        stats = SpeculationStats()
+
+        # With both members speculated on, the chosen speaker's turn is always among them.
+        result = await run_parliament_session(
+            "weather",
+            PersonasUtil(config_path=config_path, auto_reload=False),
+            lambda client_type: client,
+            output_path=os.path.join(self.tmp_dir, 'pub_script.txt'),
+            max_messages=5,
+            speculate=2,
+            speculation_stats=stats,
+        )
+
+        self.assertEqual((result.message_count, result.turns), (5, 4))
+        self.assertEqual(stats.rounds, 4)
+        self.assertEqual((stats.hits, stats.stale, stats.failed), (4, 0, 0))
+        self.assertEqual(stats.misses, 4)
+        self.assertGreater(stats.saved_seconds, 0.0)
+        self.assertGreater(stats.wasted_prompt_tokens, 0)
+
+    async def test_losing_turns_are_cancelled_in_flight(self):
+        client = MockChatCompletionClient(latency_ms=10_000)
+        prefetcher, agents = self.build(client, candidates=2)
+        task = TextMessage(content="You are discussing today's topic: weather.", source="user")
+
+        await prefetcher.prefetch([task])
+        pending = dict(prefetcher._pending)
+        self.assertEqual(set(pending), {"Shauli", "Avi"})
+        # Avi is chosen, but asks for something else than was prefetched.
+        self.assertIsNone(prefetcher.claim("Avi", [UserMessage(content="other", source="user")], {}))
+        await prefetcher.close()
+
+        self.assertTrue(all(speculation.task.cancelled() for speculation in pending.values()))
+        self.assertEqual((prefetcher.stats.misses, prefetcher.stats.stale), (1, 1))
+        self.assertEqual(client.calls, 0)
+        self.assertEqual(prefetcher.stats.wasted_prompt_tokens, sum(s.prompt_tokens for s in pending.values()))
+
+    async def test_prefetched_prompt_is_the_agents_prompt(self):
+        prefetcher, agents = self.build(MockChatCompletionClient(latency_ms=10_000))
+        task = TextMessage(content="You are discussing today's topic: weather.", source="user")
+        reply = TextMessage(content="Avi, it's sunny.", source="Shauli")
+
+        await prefetcher.prefetch([task, reply])
+
+        self.assertEqual(list(prefetcher._pending), ["Avi"])
+        self.assertEqual(prefetcher._pending["Avi"].messages, [
+            SystemMessage(content="Avi's instructions"),
+            UserMessage(content=task.content, source="user"),
+            UserMessage(content=reply.content, source="Shauli"),
+        ])
+        # Computing the prompt leaves the agent's own context untouched.
+        self.assertEqual(await agents["Avi"].model_context.get_messages(), [])
+        await prefetcher.close()
+
+    def test_predict_follows_the_speaker_order_so_far(self):
+        prefetcher, _ = self.build(MockChatCompletionClient())
+        thread = [TextMessage(content="start", source="user")]
+        for source in ["Avi", "Shauli", "Avi"]:
+            thread.append(TextMessage(content="blah", source=source))
+        self.assertEqual(prefetcher.predict(thread), ["Shauli"])
+
+    def test_invalid_candidates(self):
+        with self.assertRaises(ValueError):
+            SpeculativePrefetcher(0)
+
+
+if __name__ == '__main__':
+    unittest.main()
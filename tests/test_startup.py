@@ -0,0 +1,16 @@
+import unittest
+
+from startup_benchmark import measure_import
+
+# Import times depend on the machine, so the budgets are checked by running startup_benchmark.py, not here.
+
+
+class TestStartup(unittest.TestCase):
+
+    def test_main_does_not_load_providers_or_tracing_sdk(self):
+        # A fresh interpreter: the other tests have loaded the provider SDKs into this one.
+        self.assertEqual(measure_import("main", repeat=1)["loaded"], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
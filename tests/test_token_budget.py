@@ -0,0 +1,134 @@
+import logging
+import os
+import tempfile
+import unittest
+
+from autogen_core import EVENT_LOGGER_NAME
+from autogen_core.models import RequestUsage, UserMessage
+from autogen_ext.models.replay import ReplayChatCompletionClient
+
+from mock_client import MockChatCompletionClient
+from parliament import run_parliament_session
+from personas_util import PersonasUtil
+from token_budget import (
+    SessionUsage,
+    TokenBudgetTermination,
+    UsageTrackingChatCompletionClient,
+    prices_from_settings,
+    track_prompt_cache,
+)
+
+CONFIG = """
+[shauli]
+name = "Shauli"
+instructions = "Shauli's instructions"
+
+[avi]
+name = "Avi"
+instructions = "Avi's instructions"
+
+[agents.scripter]
+name = "Scripter"
+instructions = "Pick the next speaker. Today's topic: {0}."
+"""
+
+
+def make_replay(responses):
+    client = ReplayChatCompletionClient(responses)
+    # Replay clients mark their results as cached by default, which the accounting does not bill.
+    client.set_cached_bool_value(False)
+    return client
+
+
+class TestSessionUsage(unittest.TestCase):
+
+    def test_cost_and_report(self):
+        usage = SessionUsage({"openai": (30.0, 60.0)})
+        usage.record("Avi", "openai", RequestUsage(prompt_tokens=1000, completion_tokens=500))
+        usage.record("Avi", "openai", RequestUsage(prompt_tokens=1000, completion_tokens=500), cached=True)
+        usage.record("selector", "azure", RequestUsage(prompt_tokens=200, completion_tokens=1))
+
+        self.assertEqual(usage.agents["Avi"].calls, 2)
+        self.assertEqual(usage.agents["Avi"].cached_calls, 1)
+        self.assertEqual(usage.total_tokens, 1701)
+        self.assertAlmostEqual(usage.total_cost, 0.06)
+        report = usage.report()
+        self.assertLess(report.index("Avi"), report.index("selector"))
+
+    def test_cached_prompt_tokens_use_the_cached_price(self):
+        usage = SessionUsage({"openai": (2.0, 8.0, 0.5)})
+        usage.record("Avi", "openai", RequestUsage(prompt_tokens=1000, completion_tokens=0), cached_prompt_tokens=800)
+
+        self.assertEqual(usage.agents["Avi"].cached_prompt_tokens, 800)
+        self.assertAlmostEqual(usage.total_cost, (200 * 2.0 + 800 * 0.5) / 1_000_000)
+        self.assertAlmostEqual(usage.prompt_cache_hit_rate, 0.8)
+        self.assertIn("80% of prompt tokens from provider prompt caches", usage.report())
+
+    def test_prices_from_settings(self):
+        self.assertEqual(prices_from_settings({"settings": {"pricing": {"openai": [30, 60]}}}), {"openai": (30.0, 60.0)})
+        self.assertEqual(
+            prices_from_settings({"settings": {"pricing": {"openai": [2, 8, 0.5]}}}), {"openai": (2.0, 8.0, 0.5)}
+        )
+        self.assertEqual(prices_from_settings({}), {})
+        with self.assertRaises(ValueError):
+            prices_from_settings({"settings": {"pricing": {"openai": 30}}})
+
+    def test_budget_requires_a_limit(self):
+        with self.assertRaises(ValueError):
+            TokenBudgetTermination(SessionUsage())
+
+
+class TestUsageTracking(unittest.IsolatedAsyncioTestCase):
+
+    async def test_records_calls_under_agent_name(self):
+        usage = SessionUsage()
+        client = UsageTrackingChatCompletionClient(make_replay(["hello world"]), usage, "Avi", "grok")
+        await client.create([UserMessage(content="Hi", source="user")])
+        self.assertEqual(usage.agents["Avi"].calls, 1)
+        self.assertEqual(usage.agents["Avi"].provider, "grok")
+        self.assertGreater(usage.agents["Avi"].total_tokens, 0)
+
+    async def test_reads_provider_prompt_cache_hits_from_logged_usage(self):
+        logger = logging.getLogger(EVENT_LOGGER_NAME)
+        self.addCleanup(logger.setLevel, logger.level)
+        track_prompt_cache()
+        usage = SessionUsage()
+        inner = MockChatCompletionClient(cache_min_tokens=4, cache_block_tokens=2)
+        client = UsageTrackingChatCompletionClient(inner, usage, "Avi", "grok")
+        prefix = [UserMessage(content="a fixed persona prefix that never changes", source="user")]
+        await client.create(prefix + [UserMessage(content="first turn", source="user")])
+        await client.create(prefix + [UserMessage(content="second turn", source="user")])
+
+        # The 7-word shared prefix is cached in blocks of two from four words up.
+        self.assertEqual(usage.agents["Avi"].cached_prompt_tokens, 6)
+
+    async def test_leaves_the_event_logger_level_alone(self):
+        logger = logging.getLogger(EVENT_LOGGER_NAME)
+        level = logger.level
+        client = UsageTrackingChatCompletionClient(MockChatCompletionClient(), SessionUsage(), "Avi", "grok")
+        await client.create([UserMessage(content="Hi", source="user")])
+        self.assertEqual(logger.level, level)
+
+    async def test_budget_stops_session_early(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            config_path = os.path.join(tmp_dir, 'config.toml')
+            with open(config_path, 'w', encoding='utf-8') as f:
+                f.write(CONFIG)
+            usage = SessionUsage()
+            result = await run_parliament_session(
+                "weather",
+                PersonasUtil(config_path=config_path),
+                lambda client_type: make_replay(["Avi"] * 20),
+                output_path=None,
+                max_messages=20,
+                usage=usage,
+                max_total_tokens=1,
+            )
+        assert result is not None
+        self.assertIn("Budget reached", result.stop_reason or "")
+        self.assertLess(result.message_count, 20)
+        self.assertIn("selector", usage.agents)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import asyncio
+import unittest
+
+from autogen_core import CancellationToken, FunctionCall
+from autogen_core.models import CreateResult, ModelFamily, RequestUsage
+from autogen_ext.models.replay import ReplayChatCompletionClient
+
+from mock_client import MockChatCompletionClient
+from parliament import build_parliament_agents
+from tool_registry import ToolRegistry
+
+MEMBERS = {
+    "shauli": {"name": "Shauli", "instructions": "Shauli's instructions", "description": "Group leader."},
+    "avi": {"name": "Avi", "instructions": "Avi's instructions", "description": "Sarcastic."},
+}
+
+
+class WeatherService:
+    """A slow weather lookup that counts its calls."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def get_weather(self, city: str) -> str:
+        """Get weather for a given city"""
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return f"The weather in {city} is sunny."
+
+
+class TestToolRegistry(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.service = WeatherService()
+        self.tool_registry = ToolRegistry()
+        self.tool_registry.register(self.service.get_weather)
+
+    async def test_concurrent_lookups_of_a_city_cause_one_call(self):
+        # Five members get the tool of the same session, and all ask at once.
+        cache = self.tool_registry.session_cache()
+        tools = [self.tool_registry.create_tools(cache)[0] for _ in range(5)]
+        results = await asyncio.gather(
+            *(tool.run_json({"city": "Tel Aviv"}, CancellationToken()) for tool in tools)
+        )
+
+        self.assertEqual(self.service.calls, 1)
+        self.assertEqual(set(results), {"The weather in Tel Aviv is sunny."})
+        self.assertEqual((self.tool_registry.stats.calls, self.tool_registry.stats.hits), (5, 4))
+
+    async def test_sessions_do_not_share_results_without_ttl(self):
+        for _ in range(2):
+            tool = self.tool_registry.create_tools()[0]
+            await tool.run_json({"city": "Haifa"}, CancellationToken())
+            await tool.run_json({"city": "Haifa"}, CancellationToken())
+        self.assertEqual(self.service.calls, 2)
+
+    async def test_ttl_shares_results_across_sessions(self):
+        tool_registry = ToolRegistry(ttl_seconds=60)
+        tool_registry.register(self.service.get_weather)
+        for _ in range(2):
+            await tool_registry.create_tools()[0].run_json({"city": "Eilat"}, CancellationToken())
+        self.assertEqual(self.service.calls, 1)
+
+    async def test_failed_calls_are_not_memoised(self):
+        attempts = []
+
+        def flaky(city: str) -> str:
+            """Fails the first time."""
+            attempts.append(city)
+            if len(attempts) == 1:
+                raise ConnectionError("weather service is down")
+            return "rainy"
+
+        tool_registry = ToolRegistry()
+        tool_registry.register(flaky)
+        tool = tool_registry.create_tools()[0]
+        with self.assertRaises(ConnectionError):
+            await tool.run_json({"city": "Eilat"}, CancellationToken())
+        self.assertEqual(await tool.run_json({"city": "Eilat"}, CancellationToken()), "rainy")
+        self.assertEqual(tool_registry.stats.errors, 1)
+
+    def test_duplicate_names_are_rejected(self):
+        with self.assertRaises(ValueError):
+            self.tool_registry.register(self.service.get_weather)
+
+    def test_tool_schema_follows_the_function(self):
+        tool = self.tool_registry.create_tools()[0]
+        self.assertEqual(tool.name, "get_weather")
+        self.assertEqual(tool.description, "Get weather for a given city")
+        self.assertEqual(list(tool.schema["parameters"]["properties"]), ["city"])
+
+    async def test_agents_run_one_response_tool_calls_once_per_city(self):
+        calls = [
+            FunctionCall(id=str(i), name="get_weather", arguments=f'{{"city": "{city}"}}')
+            for i, city in enumerate(["Tel Aviv", "Tel Aviv", "Haifa"])
+        ]
+        usage = RequestUsage(prompt_tokens=0, completion_tokens=0)
+        client = ReplayChatCompletionClient(
+            [CreateResult(finish_reason="function_calls", content=calls, usage=usage, cached=False), "Sunny everywhere."],
+            model_info={
+                "vision": False, "function_calling": True, "json_output": False,
+                "family": ModelFamily.UNKNOWN, "structured_output": False,
+            },
+        )
+        agent = build_parliament_agents(
+            {"shauli": MEMBERS["shauli"]}, lambda client_type: client, tools=self.tool_registry.create_tools()
+        )[0]
+
+        result = await agent.run(task="How is the weather?")
+
+        self.assertEqual(self.service.calls, 2)
+        self.assertEqual(result.messages[-1].content, "Sunny everywhere.")
+
+    def test_members_without_function_calling_get_no_tools(self):
+        agents = build_parliament_agents(
+            MEMBERS, lambda client_type: MockChatCompletionClient(), tools=self.tool_registry.create_tools()
+        )
+        self.assertEqual(len(agents), 2)
+        for agent in agents:
+            self.assertEqual(agent._tools, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import json
+import os
+import tempfile
+import unittest
+
+from autogen_agentchat.messages import TextMessage
+from autogen_core.models import UserMessage
+from autogen_ext.models.replay import ReplayChatCompletionClient
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+import tracing
+from span_exporters import JsonLinesSpanExporter
+from tracing import TracingChatCompletionClient, TurnTracer, setup_tracing
+
+
+class TestSetupTracing(unittest.TestCase):
+
+    def test_off_installs_nothing(self):
+        self.assertIsNone(setup_tracing('off'))
+
+    def test_rejects_unknown_mode_and_bad_ratio(self):
+        with self.assertRaises(ValueError):
+            setup_tracing('loud')
+        with self.assertRaises(ValueError):
+            setup_tracing('batch', sample_ratio=2.0)
+
+
+class TestJsonLinesSpanExporter(unittest.TestCase):
+
+    def test_writes_one_line_per_span(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'traces.jsonl')
+            provider = TracerProvider()
+            provider.add_span_processor(SimpleSpanProcessor(JsonLinesSpanExporter(path)))
+            test_tracer = provider.get_tracer(__name__)
+            with test_tracer.start_as_current_span("outer"):
+                with test_tracer.start_as_current_span("inner"):
+                    pass
+            provider.shutdown()
+            with open(path, encoding='utf-8') as f:
+                names = [json.loads(line)["name"] for line in f]
+        self.assertEqual(names, ["inner", "outer"])
+
+
+class TestParliamentSpans(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.exporter = InMemorySpanExporter()
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(self.exporter))
+        self._original_tracer = tracing.tracer
+        tracing.tracer = provider.get_tracer(__name__)  # type: ignore
+
+    def tearDown(self):
+        tracing.tracer = self._original_tracer
+
+    async def test_selector_decision_span(self):
+        client = TracingChatCompletionClient(ReplayChatCompletionClient(["Avi"]), "parliament.selector_decision")
+        await client.create([UserMessage(content="Who speaks next?", source="user")])
+        span = self.exporter.get_finished_spans()[0]
+        self.assertEqual(span.name, "parliament.selector_decision")
+        self.assertEqual(span.attributes["parliament.response_preview"], "Avi")  # type: ignore
+
+    def test_turn_spans(self):
+        turn_tracer = TurnTracer("weather")
+        turn_tracer.record(TextMessage(content="topic", source="user"))
+        turn_tracer.record(TextMessage(content="Hi", source="Shauli"))
+        turn_tracer.record(TextMessage(content="No", source="Avi"))
+        spans = self.exporter.get_finished_spans()
+        self.assertEqual([span.attributes["parliament.speaker"] for span in spans], ["Shauli", "Avi"])  # type: ignore
+        self.assertLessEqual(spans[0].end_time, spans[1].start_time)  # type: ignore
+
+
+if __name__ == '__main__':
+    unittest.main()
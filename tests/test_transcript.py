@@ -0,0 +1,150 @@
+import gzip
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+from autogen_agentchat.messages import TextMessage
+from autogen_core.models import RequestUsage
+
+from mock_client import MockChatCompletionClient
+from parliament import run_parliament_session
+from personas_util import PersonasUtil
+from session_store import COMPLETED, FAILED
+from token_budget import SessionUsage
+from transcript import TranscriptStore, main, read_transcript
+
+CONFIG = """
+[shauli]
+name = "Shauli"
+instructions = "Shauli's instructions"
+description = "Group leader."
+
+[avi]
+name = "Avi"
+instructions = "Avi's instructions"
+description = "Sarcastic."
+
+[agents.scripter]
+name = "Scripter"
+instructions = "Pick the next speaker. Today's topic: {0}."
+"""
+
+
+class TestTranscriptStore(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.directory = os.path.join(self.tmp_dir.name, 'transcripts')
+        self.store = TranscriptStore(self.directory)
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp_dir.cleanup()
+
+    def write_session(self, topic, turns, status=COMPLETED, store=None):
+        writer = (store or self.store).start(topic, ["Shauli", "Avi"], provider_of=lambda speaker: "grok")
+        writer.write(TextMessage(content=f"You are discussing today's topic: {topic}.", source="user"))
+        for speaker, content in turns:
+            usage = RequestUsage(prompt_tokens=10, completion_tokens=len(content.split()))
+            writer.write(TextMessage(content=content, source=speaker, models_usage=usage))
+        writer.close(status)
+        return writer.session_id
+
+    def test_turns_carry_timing_provider_and_tokens(self):
+        session_id = self.write_session("weather", [("Shauli", "Hello there"), ("Avi", "Whatever")])
+
+        path = os.path.join(self.directory, f"{session_id}.jsonl.gz")
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            self.assertEqual(len(f.readlines()), 3)
+        header, first, second = read_transcript(path)
+        self.assertEqual((header["session_id"], header["topic"], header["members"]), (session_id, "weather", ["Shauli", "Avi"]))
+        self.assertEqual((first["turn"], first["speaker"], first["provider"]), (0, "Shauli", "grok"))
+        self.assertEqual((first["prompt_tokens"], first["completion_tokens"]), (10, 2))
+        self.assertGreaterEqual(second["latency_ms"], 0.0)
+        self.assertGreaterEqual(second["ts"], first["ts"])
+
+        record = self.store.get(session_id)
+        self.assertEqual((record.status, record.turns, record.prompt_tokens, record.completion_tokens), (COMPLETED, 2, 20, 3))
+
+    def test_find_by_topic_and_speaker(self):
+        weather = self.write_session("Weather", [("Shauli", "Sunny"), ("Avi", "Rainy")])
+        food = self.write_session("food", [("Shauli", "Hummus")], status=FAILED)
+
+        self.assertEqual([r.session_id for r in self.store.find(topic="  weather ")], [weather])
+        self.assertEqual([r.session_id for r in self.store.find(speaker="Avi")], [weather])
+        self.assertEqual([r.session_id for r in self.store.find(speaker="Shauli")], [food, weather])
+        self.assertEqual([r.session_id for r in self.store.find(status=FAILED)], [food])
+        self.assertEqual(self.store.turns(weather, speaker="Avi")[0]["content"], "Rainy")
+
+    def test_render_script_on_demand(self):
+        session_id = self.write_session("weather", [("Shauli", "Hello"), ("Avi", "Whatever")])
+        self.assertEqual(self.store.render(session_id), "Shauli: Hello\n\nAvi: Whatever\n\n")
+
+        output = os.path.join(self.tmp_dir.name, 'script.txt')
+        main(['--store', self.directory, 'render', session_id, '-o', output])
+        with open(output, encoding='utf-8') as f:
+            self.assertEqual(f.read(), "Shauli: Hello\n\nAvi: Whatever\n\n")
+        stdout = io.StringIO()
+        with redirect_stdout(stdout):
+            main(['--store', self.directory, 'list', '--speaker', 'Avi'])
+        self.assertIn(session_id, stdout.getvalue())
+
+    def test_uncompressed_transcripts(self):
+        store = TranscriptStore(self.directory, compress=False)
+        session_id = self.write_session("weather", [("Avi", "Whatever")], store=store)
+        store.close()
+        self.assertTrue(os.path.exists(os.path.join(self.directory, f"{session_id}.jsonl")))
+        self.assertEqual(self.store.render(session_id), "Avi: Whatever\n\n")
+
+    def test_crashed_transcript_is_readable(self):
+        writer = self.store.start("weather", ["Shauli", "Avi"])
+        writer.write(TextMessage(content="Hello", source="Shauli"))
+        writer.write(TextMessage(content="Whatever", source="Avi"))
+        # The process dies here: the gzip stream never gets its end-of-stream marker.
+        with open(writer.path, 'rb') as f:
+            data = f.read()
+        crashed = os.path.join(self.tmp_dir.name, 'crashed.jsonl.gz')
+        with open(crashed, 'wb') as f:
+            f.write(data)
+
+        header, *turns = read_transcript(crashed)
+        self.assertEqual(header["session_id"], writer.session_id)
+        self.assertEqual([turn["content"] for turn in turns], ["Hello", "Whatever"])
+
+        with open(crashed, 'wb') as f:
+            f.write(data[:-3])
+        self.assertEqual(list(read_transcript(crashed))[0]["session_id"], writer.session_id)
+        writer.close()
+
+    def test_unknown_session(self):
+        with self.assertRaises(KeyError):
+            self.store.turns("missing")
+
+    async def test_session_writes_its_transcript(self):
+        config_path = os.path.join(self.tmp_dir.name, 'config.toml')
+        with open(config_path, 'w', encoding='utf-8') as f:
+            f.write(CONFIG)
+        client = MockChatCompletionClient(speakers=["Shauli", "Avi"], completion_tokens=5)
+
+        script_path = os.path.join(self.tmp_dir.name, 'pub_script.txt')
+        await run_parliament_session(
+            "weather",
+            PersonasUtil(config_path=config_path, auto_reload=False),
+            lambda client_type: client,
+            output_path=script_path,
+            max_messages=4,
+            usage=SessionUsage(),
+            transcript_store=self.store,
+        )
+
+        [record] = self.store.find(topic="weather")
+        self.assertEqual((record.status, record.turns), (COMPLETED, 3))
+        with open(script_path, encoding='utf-8') as f:
+            self.assertEqual(self.store.render(record.session_id), f.read())
+        self.assertGreater(record.completion_tokens, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import unittest
+
+from autogen_agentchat.messages import TextMessage
+from autogen_core.models import ModelFamily
+from autogen_ext.models.openai import OpenAIChatCompletionClient
+
+from mock_client import MockChatCompletionClient
+from parliament import run_parliament_session
+from personas_util import PersonasUtil
+from translation import DEFAULT_CHUNK_TOKENS, TranslationPipeline, TranslationStats, translated_script_path
+
+CONFIG = """
+[shauli]
+name = "Shauli"
+instructions = "Shauli's instructions"
+description = "Group leader."
+
+[avi]
+name = "Avi"
+instructions = "Avi's instructions"
+description = "Sarcastic."
+
+[translator]
+name = "Translator"
+instructions = "Translate to Hebrew."
+
+[agents.scripter]
+name = "Scripter"
+instructions = "Pick the next speaker. Today's topic: {0}."
+"""
+
+
+class FailingClient(MockChatCompletionClient):
+
+    async def create(self, messages, **kwargs):
+        raise ConnectionError("translator is down")
+
+
+class TestTranslationPipeline(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.output_path = os.path.join(self.tmp_dir, 'script.translated.txt')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_translated_script_path(self):
+        self.assertEqual(translated_script_path("out/pub_script.txt"), "out/pub_script.translated.txt")
+        self.assertEqual(translated_script_path("script", suffix="he"), "script.he.txt")
+
+    async def test_batches_the_backlog_by_token_limit(self):
+        client = MockChatCompletionClient(responses=["one", "two", "three"])
+        stats = TranslationStats()
+        # Each turn is three words ("Avi: word word"), so two turns fit in a chunk.
+        pipeline = TranslationPipeline(client, "Translate.", self.output_path, max_chunk_tokens=6, stats=stats).start()
+        for content in ["a b", "c d", "e f"]:
+            self.assertTrue(pipeline.submit(TextMessage(content=content, source="Avi")))
+        self.assertFalse(pipeline.submit(TextMessage(content="task", source="user")))
+        await pipeline.finish()
+
+        self.assertEqual((stats.turns, stats.chunks, client.calls), (3, 2, 2))
+        with open(self.output_path, encoding='utf-8') as f:
+            self.assertEqual(f.read(), "one\n\ntwo\n\n")
+
+    async def test_models_with_an_unknown_context_size_keep_the_chunk_limit(self):
+        # AutoGen has no token limit for Grok, so remaining_tokens() raises KeyError for it.
+        client = OpenAIChatCompletionClient(model="grok-3", api_key="test", model_info={
+            "vision": False, "function_calling": True, "json_output": True,
+            "family": ModelFamily.UNKNOWN, "structured_output": True,
+        })
+        self.addAsyncCleanup(client.close)
+        pipeline = TranslationPipeline(client, "Translate.", self.output_path)
+        self.assertEqual(pipeline.max_chunk_tokens, DEFAULT_CHUNK_TOKENS)
+
+    async def test_translates_each_turn_when_keeping_up(self):
+        client = MockChatCompletionClient(responses=["one", "two"])
+        pipeline = TranslationPipeline(client, "Translate.", self.output_path).start()
+        pipeline.submit(TextMessage(content="a b", source="Avi"))
+        await client_idle(client, 1)
+        pipeline.submit(TextMessage(content="c d", source="Shauli"))
+        await pipeline.finish()
+
+        self.assertEqual(pipeline.stats.chunks, 2)
+
+    async def test_failed_chunk_is_written_untranslated(self):
+        stats = TranslationStats()
+        pipeline = TranslationPipeline(FailingClient(), "Translate.", self.output_path, stats=stats).start()
+        pipeline.submit(TextMessage(content="hello", source="Avi"))
+        await pipeline.finish()
+
+        self.assertEqual(stats.failed_chunks, 1)
+        with open(self.output_path, encoding='utf-8') as f:
+            self.assertEqual(f.read(), "Avi: hello\n\n")
+
+    async def test_submit_requires_start(self):
+        pipeline = TranslationPipeline(MockChatCompletionClient(), "Translate.", self.output_path)
+        with self.assertRaises(RuntimeError):
+            pipeline.submit(TextMessage(content="hello", source="Avi"))
+
+    async def test_session_writes_translated_script(self):
+        config_path = os.path.join(self.tmp_dir, 'config.toml')
+        with open(config_path, 'w', encoding='utf-8') as f:
+            f.write(CONFIG)
+        client = MockChatCompletionClient(speakers=["Shauli", "Avi"], completion_tokens=5)
+        stats = TranslationStats()
+        script_path = os.path.join(self.tmp_dir, 'pub_script.txt')
+
+        await run_parliament_session(
+            "weather",
+            PersonasUtil(config_path=config_path, auto_reload=False),
+            lambda client_type: client,
+            output_path=script_path,
+            max_messages=4,
+            translation_path=translated_script_path(script_path),
+            translation_stats=stats,
+        )
+
+        self.assertEqual(stats.turns, 3)
+        self.assertGreaterEqual(stats.chunks, 1)
+        with open(translated_script_path(script_path), encoding='utf-8') as f:
+            self.assertTrue(f.read().strip())
+
+
+async def client_idle(client: MockChatCompletionClient, calls: int) -> None:
+    """Yields to the event loop until the client has answered `calls` times."""
+    while client.calls < calls:
+        await asyncio.sleep(0)
+
+
+if __name__ == '__main__':
+    unittest.main()
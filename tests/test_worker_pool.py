@@ -0,0 +1,93 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from batch_runner import build_parser
+from worker_pool import _worker_main, run_worker_pool
+
+CONFIG = """
+[shauli]
+name = "Shauli"
+instructions = "Shauli's instructions"
+description = "Group leader."
+
+[avi]
+name = "Avi"
+instructions = "Avi's instructions"
+description = "Sarcastic."
+
+[agents.scripter]
+name = "Scripter"
+instructions = "Pick the next speaker. Today's topic: {0}."
+"""
+
+
+def crash_first_worker(worker_id, args, workers, topics, results, stop):
+    """A worker entry point whose worker 0 dies in the middle of its first session."""
+    if worker_id == 0:
+        index, _ = topics.get()
+        results.put(('started', worker_id, index))
+        results.close()
+        results.join_thread()
+        os._exit(3)
+    _worker_main(worker_id, args, workers, topics, results, stop)
+
+
+class TestWorkerPool(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        config_path = os.path.join(self.tmp_dir, 'config.toml')
+        with open(config_path, 'w', encoding='utf-8') as f:
+            f.write(CONFIG)
+        self.output_dir = os.path.join(self.tmp_dir, 'out')
+        self.args = build_parser().parse_args(
+            ['-', '--offline', '--config', config_path, '--output-dir', self.output_dir, '--max-messages', '3',
+             '--concurrency', '2']
+        )
+        # Spawned workers inherit the environment; mock completions then only name members that take part.
+        patcher = mock.patch.dict(os.environ, {"MOCK_SPEAKERS": "Shauli,Avi"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_runs_topics_across_workers_into_one_directory(self):
+        topics = ["weather", "politics", "food", "football", "beer"]
+        outcomes, metrics = run_worker_pool(topics, self.args, workers=2)
+
+        self.assertEqual([outcome.topic for outcome in outcomes], topics)
+        for outcome in outcomes:
+            self.assertIsNone(outcome.error)
+            self.assertEqual(os.path.dirname(outcome.output_path), self.output_dir)
+            self.assertTrue(os.path.exists(outcome.output_path))
+        self.assertEqual([worker.worker_id for worker in metrics], [0, 1])
+        self.assertEqual(sum(worker.sessions for worker in metrics), len(topics))
+        with open(os.path.join(self.output_dir, 'summary.json'), encoding='utf-8') as f:
+            summary = json.load(f)
+        self.assertEqual(len(summary["sessions"]), len(topics))
+        self.assertEqual(len(summary["workers"]), 2)
+
+    def test_crashed_worker_stops_the_pool_and_reports_every_topic(self):
+        topics = [f"topic {i}" for i in range(6)]
+        outcomes, metrics = run_worker_pool(topics, self.args, workers=2, worker_target=crash_first_worker)
+
+        self.assertEqual([outcome.topic for outcome in outcomes], topics)
+        self.assertTrue(metrics[0].crashed)
+        self.assertFalse(metrics[1].crashed)
+        crashed = [outcome for outcome in outcomes if outcome.error == "Worker 0 crashed"]
+        self.assertEqual(len(crashed), 1)
+        completed = [outcome for outcome in outcomes if outcome.error is None]
+        self.assertEqual(len(completed), metrics[1].sessions)
+
+    def test_invalid_worker_count(self):
+        with self.assertRaises(ValueError):
+            run_worker_pool(["weather"], self.args, workers=0)
+
+
+if __name__ == '__main__':
+    unittest.main()